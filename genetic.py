@@ -1,6 +1,7 @@
-from password_fitness import get_password, get_normalised_fitness
-from genetic.algorithm import genetic_search
+from password_fitness import get_password, get_normalised_fitness, get_batch_normalised_fitness
+from genetic.algorithm import genetic_search, ENGINES
 import numpy as np
+import time
 from argparse import ArgumentParser
 
 
@@ -11,7 +12,8 @@ def run_genetic_algorithm(
     mutation_probability: float = 0.2,
     cross_over_probability: float = 0.8,
     max_number_of_generations: int = 100,
-    print_output: bool = False
+    print_output: bool = False,
+    engine: str = 'python'
 ):
     """
     Genetic algorithm implementation for question 3.1
@@ -19,6 +21,7 @@ def run_genetic_algorithm(
 
     # wrap fitness function for this password in lambda
     fitness_function = lambda pool: get_normalised_fitness(pool, student_password)
+    batch_fitness_function = lambda population: get_batch_normalised_fitness(population, student_password)
 
     # Example of how to get fitness values for a list of candidates
     top_result, pool, fitness_scores, number_of_generations = genetic_search(
@@ -28,12 +31,14 @@ def run_genetic_algorithm(
         mating_pool_size,
         mutation_probability,
         cross_over_probability,
-        max_number_of_generations
+        max_number_of_generations,
+        engine,
+        batch_fitness_function
     )
 
     # display results
     if print_output:
-        print('Running generic algorithm...')
+        print(f'Running generic algorithm with the [{engine}] engine...')
         print(f'Population size: {population_size}, mating pool size: {mating_pool_size}')
         print(f'Max number of generations: {max_number_of_generations}')
         print(f'Cross over probability: {cross_over_probability}')
@@ -130,18 +135,63 @@ def run_hyperparameter_test():
         print()
 
 
+def run_engine_benchmark(
+    population_sizes: tuple = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6),
+    number_of_generations: int = 3
+):
+    """
+    Compare the generations per second of each engine for several population sizes, with half of each
+    population in the mating pool
+    """
+    student_password = get_password('ab21020')
+    fitness_function = lambda pool: get_normalised_fitness(pool, student_password)
+    batch_fitness_function = lambda population: get_batch_normalised_fitness(population, student_password)
+
+    print(f'{"Population":>12}  {"Engine":>8}  {"Generations/sec":>16}')
+    for population_size in population_sizes:
+        for engine in ENGINES:
+            started = time.perf_counter()
+            top_result, pool, fitness_scores, generations = genetic_search(
+                fitness_function,
+                len(student_password),
+                population_size,
+                population_size // 2,
+                0.1,
+                0.8,
+                number_of_generations,
+                engine,
+                batch_fitness_function
+            )
+            # a search which finds the password stops during the generation it reports
+            generations = generations + 1 if top_result else generations
+            elapsed = time.perf_counter() - started
+            print(f'{population_size:>12}  {engine:>8}  {generations / elapsed:>16.3f}')
+
+
 def run_command_line():
     parser = ArgumentParser(
         prog='search.py',
         description='Search station data provided in a file with various algorithms'
     )
-    parser.add_argument('username', help='Username')
+    parser.add_argument('username', nargs='?', help='Username')
     parser.add_argument('-p', '--population_size', default='200', help='Population size')
     parser.add_argument('-m', '--mating_pool_size', default='100', help='Mating pool size')
     parser.add_argument('-a', '--mutation_probability', default='0.1', help='Mutation probability')
     parser.add_argument('-c', '--cross_over_probability', default='0.8', help='Cross over probability')
     parser.add_argument('-g', '--max_no_generations', default='100', help='Max number of generations')
+    parser.add_argument('-e', '--engine', default='python', choices=ENGINES, help='select engine')
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='compare generations per second of each engine for populations of 10^3 to 10^6'
+    )
     args = parser.parse_args()
+    if args.benchmark:
+        run_engine_benchmark()
+        return
+
+    if args.username is None:
+        parser.error('a username is required unless --benchmark is used')
 
     username = args.username
     population_size = int(args.population_size)
@@ -157,7 +207,8 @@ def run_command_line():
         mutation_probability,
         cross_over_probability,
         max_number_of_generations,
-        True
+        True,
+        args.engine
     )
 
 
@@ -4,6 +4,9 @@ from typing import Callable
 
 OPTIONS = string.digits + string.ascii_uppercase + "_"
 
+# engines genetic_search can run: 'python' holds passwords as strings, 'numpy' as a uint8 matrix
+ENGINES = ('python', 'numpy')
+
 
 def create_initial_pool(population_size: int, password_length: int) -> list:
     """
@@ -108,10 +111,13 @@ def genetic_search(
     mating_pool_size: int = 50,
     mutation_probability: float = 0.1,
     cross_over_probability: float = 0.8,
-    max_number_of_generations: int = 100
+    max_number_of_generations: int = 100,
+    engine: str = 'python',
+    batch_fitness_function: Callable = None
 ) -> tuple:
     """
-    Apply a genetic algorithm to search for a password of a given length.
+    Apply a genetic algorithm to search for a password of a given length.  The 'numpy' engine runs the same
+    algorithm on the whole population at once, see vectorised_genetic_search.
         Parameters:
             fitness_function (Callable): Function to call to determine fitness of an individual
             password_length (int): length of the password
@@ -121,6 +127,9 @@ def genetic_search(
             cross_over_probability (float): probability of crossing over one individual in the mating pool
             max_number_of_generations (int): maximum number of generations to run the algorithm before returning
                                              the best result
+            engine (str): 'python' or 'numpy'
+            batch_fitness_function (Callable): for the 'numpy' engine, function from an encoded population to a
+                                               vector of scores; fitness_function is adapted if not given
 
         Returns:
             (str, list, dict, int):
@@ -129,6 +138,23 @@ def genetic_search(
                 fitness scores for each individual in the pool,
                 total number of generations the algorithm ran for
     """
+    if engine not in ENGINES:
+        raise ValueError(f'Engine must be one of {", ".join(ENGINES)}, not {engine}')
+
+    if engine == 'numpy':
+        # imported here so that the python engine does not need numpy
+        from .vectorised import encoded_fitness, vectorised_genetic_search
+
+        return vectorised_genetic_search(
+            batch_fitness_function or encoded_fitness(fitness_function),
+            password_length,
+            population_size,
+            mating_pool_size,
+            mutation_probability,
+            cross_over_probability,
+            max_number_of_generations
+        )
+
     fitness_scores = dict()
     pool = create_initial_pool(population_size, password_length)
     for generation_counter in range(max_number_of_generations):
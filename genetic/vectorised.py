@@ -0,0 +1,177 @@
+import numpy as np
+from typing import Callable
+from .algorithm import OPTIONS
+
+# character codes of OPTIONS, indexed by the values stored in encoded populations
+OPTION_CODES = np.frombuffer(OPTIONS.encode('ascii'), dtype=np.uint8)
+
+
+def encode_passwords(passwords: list) -> np.ndarray:
+    """
+    Encode passwords as a matrix of positions in OPTIONS.
+        Parameters:
+            passwords (list[str]): passwords of the same length, using only characters in OPTIONS
+
+        Returns:
+            (np.ndarray): (number of passwords, password length) uint8 matrix
+    """
+    positions = np.zeros(256, dtype=np.uint8)
+    positions[OPTION_CODES] = np.arange(len(OPTIONS), dtype=np.uint8)
+    codes = np.frombuffer(''.join(passwords).encode('ascii'), dtype=np.uint8)
+
+    return positions[codes].reshape(len(passwords), -1)
+
+
+def decode_passwords(population: np.ndarray) -> list:
+    """
+    Decode a matrix of positions in OPTIONS to passwords.
+        Parameters:
+            population (np.ndarray): (number of passwords, password length) uint8 matrix
+
+        Returns:
+            (list[str]): passwords
+    """
+    rows = np.ascontiguousarray(OPTION_CODES[population])
+    return [row.decode('ascii') for row in rows.view(f'S{population.shape[1]}').ravel()]
+
+
+def encoded_fitness(fitness_function: Callable) -> Callable:
+    """
+    Adapt a fitness function over lists of passwords, returning a dict of scores, to encoded populations.
+    Each call decodes the population, so a fitness function which works on encoded populations directly is
+    much faster for large populations.
+        Parameters:
+            fitness_function (Callable): function from a list of passwords to a dict of scores by password
+
+        Returns:
+            (Callable): function from an encoded population to a vector of scores
+    """
+    def batch_fitness(population: np.ndarray) -> np.ndarray:
+        passwords = decode_passwords(population)
+        scores = fitness_function(passwords)
+        return np.fromiter((scores[password] for password in passwords), dtype=np.float64, count=len(passwords))
+
+    return batch_fitness
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, in no particular order, found by partition rather than a full sort.
+    """
+    if k >= len(scores):
+        return np.arange(len(scores))
+
+    return np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+
+
+def mutate_population(population: np.ndarray, mutation_probability: float, generator: np.random.Generator):
+    """
+    Mutate each character of every individual in a population, in place, with a given probability.
+        Parameters:
+            population           (np.ndarray):          encoded population
+            mutation_probability (float):               probability of mutating each character
+            generator            (np.random.Generator): source of random numbers
+    """
+    mask = generator.random(population.shape) < mutation_probability
+    population[mask] = generator.integers(0, len(OPTIONS), size=np.count_nonzero(mask), dtype=np.uint8)
+
+
+def cross_over_population(
+    mating_pool: np.ndarray,
+    cross_over_probability: float,
+    generator: np.random.Generator
+) -> np.ndarray:
+    """
+    Cross over every individual in a mating pool with another randomly selected individual with a given
+    probability, each at a single random point, as cross_over_pool does.
+        Parameters:
+            mating_pool            (np.ndarray):          encoded mating pool
+            cross_over_probability (float):               probability each individual is crossed over
+            generator              (np.random.Generator): source of random numbers
+
+        Returns:
+            (np.ndarray): encoded offspring
+    """
+    pool_size, password_length = mating_pool.shape
+    if pool_size < 2:
+        raise ValueError('Cross over pool size must be at least 2')
+
+    parents = np.flatnonzero(generator.random(pool_size) <= cross_over_probability)
+
+    # a mate other than the parent itself, and a cross over point from 1 to password length - 2
+    mates = (parents + generator.integers(1, pool_size, size=len(parents))) % pool_size
+    points = generator.integers(1, password_length - 1, size=len(parents))
+    from_first = np.arange(password_length) < points[:, np.newaxis]
+
+    return np.where(from_first, mating_pool[parents], mating_pool[mates])
+
+
+def vectorised_genetic_search(
+    batch_fitness_function: Callable,
+    password_length: int,
+    population_size: int = 100,
+    mating_pool_size: int = 50,
+    mutation_probability: float = 0.1,
+    cross_over_probability: float = 0.8,
+    max_number_of_generations: int = 100,
+    seed: int = None
+) -> tuple:
+    """
+    Apply a genetic algorithm to search for a password of a given length, as genetic_search does, with the
+    population held as an (individuals, password length) uint8 matrix of positions in OPTIONS.  Mutation and
+    cross over work on the whole matrix at once with random masks, and the fittest individuals are selected
+    by partition rather than by sorting.
+        Parameters:
+            batch_fitness_function (Callable): function from an encoded population to a vector of scores
+            password_length (int): length of the password
+            population_size (int): size of pool of individuals used for the search
+            mating_pool_size (int): subset of the pool to use for crossing-over individuals
+            mutation_probability (float): probability of mutating each character in the offspring of the mating pool
+            cross_over_probability (float): probability of crossing over one individual in the mating pool
+            max_number_of_generations (int): maximum number of generations to run the algorithm before returning
+                                             the best result
+            seed (int): seed for the random numbers, or None
+
+        Returns:
+            (str, list, dict, int):
+                most fit individual found,
+                current pool of passwords, most fit first,
+                fitness scores for each individual in the pool,
+                total number of generations the algorithm ran for
+    """
+    generator = np.random.default_rng(seed)
+    pool = generator.integers(0, len(OPTIONS), size=(population_size, password_length), dtype=np.uint8)
+    pool_scores = None
+    most_fit_individual = None
+    number_of_generations = max_number_of_generations
+    for generation_counter in range(max_number_of_generations):
+        # select most fit individuals for cross over
+        scores = batch_fitness_function(pool) if pool_scores is None else pool_scores
+        mating_pool = pool[top_k(scores, mating_pool_size)]
+
+        # cross over these individuals
+        offspring = cross_over_population(mating_pool, cross_over_probability, generator)
+        mutate_population(offspring, mutation_probability, generator)
+
+        # merge the most fit individuals with the offspring, keeping
+        # the most fit individuals from this pool
+        all_individuals = np.concatenate((mating_pool, offspring))
+        all_scores = batch_fitness_function(all_individuals)
+        selected = top_k(all_scores, population_size)
+        pool = all_individuals[selected]
+        pool_scores = all_scores[selected]
+        if pool_scores.max() >= 1:
+            number_of_generations = generation_counter
+            break
+
+    if pool_scores is None:
+        pool_scores = batch_fitness_function(pool)
+
+    # sort only the final pool, most fit first
+    order = np.argsort(-pool_scores, kind='stable')
+    passwords = decode_passwords(pool[order])
+    fitness_scores = dict(zip(passwords, pool_scores[order].tolist()))
+    if number_of_generations < max_number_of_generations:
+        most_fit_individual = passwords[0]
+
+    return most_fit_individual, passwords, fitness_scores, number_of_generations
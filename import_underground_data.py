@@ -1,40 +1,38 @@
-import pandas as pd
-
-df = pd.read_csv('tubedata.csv', header=None)
-df.head()
-
-from collections import defaultdict
-
-station_dict = defaultdict(list)
-zone_dict = defaultdict(set)
-
-# get data row by row
-for index, row in df.iterrows():
-
-    start_station = row[0]
-    end_station = row[1]
-    line = row[2]
-    act_cost = int(row[3])
-
-    zone1 = row[4]
-    zone2 = row[5]
-
-    # station dictionary of child station tuples (child_name, cost from parent to the child)
-    # {"Mile End": [("Stepney Green", 2), ("Wembley", 1)]}
-    station_list = station_dict[start_station]
-    station_list.append((end_station, act_cost, line))
-
-    # the following two lines add the other direction of the tube "step"
-    station_list = station_dict[end_station]
-    station_list.append((start_station, act_cost, line))
-
-    # we add the main zone
-    zone_dict[start_station].add(zone1)
-    # we add the secondary zone
-    if zone2 != "0":
-        zone_dict[start_station].add(zone2)
-        # if the secondary zone is not 0 it's the main zone for the ending station
-        zone_dict[end_station].add(zone2)
-    else:
-        # otherwise the main zone for the ending station is the same as for the starting station
-        zone_dict[end_station].add(zone1)
\ No newline at end of file
+import csv
+from search.graph import Graph
+
+
+def read_underground_data(path: str = 'tubedata.csv') -> list:
+    """
+    Read station data from a CSV file with one connection per row.
+        Parameters:
+            path (str): path to the CSV file
+
+        Returns:
+            (list[tuple[str, str, str, int, str, str]]): start station, end station, line, cost in minutes,
+                main zone and secondary zone ("0" if there is no secondary zone) for each row
+    """
+    rows = []
+    with open(path, newline='') as data_file:
+        # get data row by row
+        for row in csv.reader(data_file):
+            if not row:
+                continue
+
+            start_station, end_station, line, act_cost, zone1, zone2 = row
+            rows.append((start_station, end_station, line, int(act_cost), zone1, zone2))
+
+    return rows
+
+
+def import_underground_data(path: str = 'tubedata.csv') -> Graph:
+    """
+    Read station data from a CSV file and compile it to a graph.  Each connection is added in both
+    directions of the tube "step".
+        Parameters:
+            path (str): path to the CSV file
+
+        Returns:
+            (Graph): compiled graph
+    """
+    return Graph.from_rows(read_underground_data(path))
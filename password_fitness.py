@@ -1,6 +1,9 @@
 import math
 import hashlib
 import string
+import numpy as np
+# Characters a password can contain, in the order used to encode populations as arrays of positions
+from genetic.algorithm import OPTIONS
 
 
 def get_password(student_username, l=10):
@@ -26,16 +29,37 @@ def distance_function(string_one, string_two):
     return score
 
 
-# Upper bound of the distance value
-MAX_VALUE = distance_function('0000000000', '__________')
+# Upper bound of the distance value for passwords of a given length: the lowest and highest options differ
+# at every character
+def get_max_value(length):
+    return distance_function(OPTIONS[0] * length, OPTIONS[-1] * length)
+
+
+# Upper bound of the distance value for the default password length
+MAX_VALUE = get_max_value(10)
+
+# Distance between every pair of options, indexed by their positions in OPTIONS
+DISTANCE_TABLE = np.sqrt(np.abs(
+    np.subtract.outer(np.array([ord(option) for option in OPTIONS]), np.array([ord(option) for option in OPTIONS]))
+))
 
 
 # Compute normalised fitness for a list of candidate passwords
 def get_normalised_fitness(list_of_phrases, student_password):
     ordered_dict = dict()
     phrase_to_find = student_password
+    max_value = get_max_value(len(phrase_to_find))
     for phrase in list_of_phrases:
         # Return 1 when a candidate matches the true password (string distance between them is zero)
-        ordered_dict[phrase] = 1 - distance_function(phrase, phrase_to_find) / MAX_VALUE
+        ordered_dict[phrase] = 1 - distance_function(phrase, phrase_to_find) / max_value
     return ordered_dict
 
+
+# Compute normalised fitness for a population encoded as a (candidates, password length) array of positions
+# in OPTIONS, giving a vector with the same scores get_normalised_fitness gives each candidate
+def get_batch_normalised_fitness(population, student_password):
+    password_positions = np.array([OPTIONS.index(character) for character in student_password])
+    # Look up the distance of every character from the password's character at the same position and sum
+    distances = DISTANCE_TABLE[population, password_positions].sum(axis=1)
+    return 1 - distances / get_max_value(len(student_password))
+
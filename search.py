@@ -1,5 +1,11 @@
-from search.variants import variant_search, Algorithm
+from search.variants import variant_search, alternative_search, isochrone_search, pareto_search, Algorithm
+from search.stats import SearchStats
+from search.budget import SearchBudget
+from search.loader import get_graph, reload_graph
+from search.names import get_station_index
 from argparse import ArgumentParser
+import json
+import os
 
 
 def print_output(path: list, cost: int, explored_nodes: int):
@@ -9,6 +15,209 @@ def print_output(path: list, cost: int, explored_nodes: int):
     print('Path found:               ', path)
 
 
+def print_stats(stats: SearchStats, output_format: str):
+    print()
+    if output_format == 'json':
+        print(json.dumps(stats.to_dict()))
+    else:
+        for line in stats.format():
+            print(line)
+
+
+def print_anytime(start: str, goal: str, line_change_cost: int, budget: SearchBudget):
+    """
+    Print each cheaper route as the anytime search finds it, then the best route found.
+    """
+    # imported here so that other searches do not pay for importing the anytime search
+    from search.variants import anytime_search
+
+    best = None
+    for route in anytime_search(start, goal, line_change_cost, budget):
+        progress = f'after [{budget.elapsed() * 1000:.1f}] ms and [{budget.expansions}] expansions'
+        if best is not None and route[1] == best[1]:
+            print(f'Proved route costing [{route[1]}] is the cheapest {progress}')
+        else:
+            print(f'Found route costing [{route[1]}] {progress}')
+        best = route
+
+    if best is None:
+        print('Failed to complete search: [Search budget exhausted before a route was found]')
+        return
+
+    (path, cost, explored_nodes, optimal) = best
+    print_output(path, cost, explored_nodes)
+    print('Optimal:                  ', 'yes' if optimal else 'not proven; search budget exhausted')
+
+
+def resolve_stations(names: list) -> list:
+    """
+    Resolve station names as typed to the names in the data, before any search runs, printing any which
+    differ.
+    """
+    graph = get_graph()
+    index = get_station_index(graph)
+    resolved = []
+    for name in names:
+        station_name = graph.station_names[index.resolve(name)]
+        if station_name != name:
+            print(f'Resolved [{name}] to [{station_name}]')
+        resolved.append(station_name)
+
+    return resolved
+
+
+def print_completions(prefix: str):
+    """
+    Print the station names starting with a prefix.
+    """
+    for name in get_station_index(get_graph()).complete(prefix):
+        print(name)
+
+
+def print_pareto(routes: list):
+    for (index, (path, minutes, changes)) in enumerate(routes, 1):
+        print()
+        print(f'Route {index}')
+        print('Journey time (minutes):   ', minutes)
+        print('Line changes:             ', changes)
+        print('Path found:               ', path)
+
+
+def print_isochrone(reached: dict, show_origins: bool):
+    print()
+    print('Minutes  Station  (previous station)' + ('  [nearest origin]' if show_origins else ''))
+    for (station, (cost, predecessor, origin)) in reached.items():
+        line = f'{cost:>7}  {station}'
+        if predecessor is not None:
+            line += f'  ({predecessor})'
+        if show_origins:
+            line += f'  [{origin}]'
+        print(line)
+    print()
+    print('Number of stations reached:', len(reached))
+
+
+def print_alternatives(routes: list):
+    for (index, (path, cost)) in enumerate(routes, 1):
+        print()
+        print(f'Route {index}')
+        print('Path cost (minutes):      ', cost)
+        print('Path found:               ', path)
+
+
+def run_batch(path: str, algorithm: Algorithm, line_change_cost: int, workers: int):
+    """
+    Search every pair in a file, or every pair of stations if no file is given, printing results
+    as they are found.
+    """
+    # imported here so that single searches do not pay for importing multiprocessing
+    from search.batch import batch_search, read_pairs
+    from search.parallel import all_pairs, parallel_batch_search, parallel_all_pairs_search
+
+    try:
+        if path is None and workers > 1:
+            results = parallel_all_pairs_search(algorithm, line_change_cost, workers)
+        elif path is None:
+            results = batch_search(all_pairs(), algorithm, line_change_cost)
+        elif workers > 1:
+            results = parallel_batch_search(read_pairs(path), algorithm, line_change_cost, workers)
+        else:
+            results = batch_search(read_pairs(path), algorithm, line_change_cost)
+
+        for result in results:
+            print(json.dumps(result._asdict()))
+    except FileNotFoundError as file_not_found_error:
+        print(f'Failed to load data: [{file_not_found_error}]')
+
+
+def print_scaling(algorithm: Algorithm, line_change_cost: int, max_workers: int):
+    """
+    Print the wall-clock time of an --all-pairs search with 1, 2, 4, ... up to 'max_workers' workers.
+    """
+    # imported here so that single searches do not pay for importing multiprocessing
+    from search.parallel import measure_scaling, scaling_worker_counts
+
+    print(f'Searching all pairs with algorithm [{algorithm.name}] on [{os.cpu_count()}] CPUs...')
+    print(f'{"Workers":>8}  {"Pairs":>10}  {"Seconds":>9}  {"Speedup":>8}')
+    for measurement in measure_scaling(scaling_worker_counts(max_workers), algorithm, line_change_cost):
+        print(
+            f'{measurement["workers"]:>8}  {measurement["pairs"]:>10}  {measurement["seconds"]:>9.2f}  '
+            f'{measurement["speedup"]:>8.2f}'
+        )
+
+
+def build_route_table(line_change_cost: int):
+    """
+    Build and save the table of cheapest routes between all pairs of stations.
+    """
+    # imported here so that searches do not pay for importing numpy
+    from search.loader import get_graph
+    from search.table import build_table, save_table, get_table_path
+
+    graph = get_graph()
+    print(f'Building route table for line change cost [{line_change_cost}]...')
+    save_table(graph, build_table(graph, line_change_cost))
+    print(f'Saved to [{get_table_path(graph, line_change_cost)}]')
+
+
+def run_benchmark_suite(sample_size: int, seed: int, output_path: str, baseline_path: str, algorithm_names: str):
+    """
+    Benchmark every algorithm, or those named, and setting, write the results as JSON and, given an earlier
+    run, compare with it.
+    """
+    # imported here so that searches do not pay for importing the benchmark's dependencies
+    from search.benchmark import run_benchmark, write_benchmark, compare_benchmarks
+
+    algorithms = None
+    if algorithm_names is not None:
+        algorithms = [Algorithm.from_string(name) for name in algorithm_names.split(',')]
+
+    results = run_benchmark(sample_size, seed, algorithms)
+    write_benchmark(results, output_path)
+    if baseline_path is not None:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        print()
+        print(f'Comparison with [{baseline_path}]:')
+        if baseline['graph_fingerprint'] != results['graph_fingerprint'] or baseline['pairs'] != results['pairs']:
+            print('Warning: the runs searched different data or pairs')
+        for comparison in compare_benchmarks(baseline, results):
+            print(json.dumps(comparison))
+
+
+def generate_synthetic_network(scale: float, seed: int, output_path: str):
+    """
+    Generate a synthetic network and write it as a network file, which --data can then search.
+    """
+    # imported here so that searches do not pay for importing the generator
+    from search.network import NETWORK_EXTENSION, write_network
+    from search.synthetic import generate_network
+
+    output_path = output_path or f'synthetic-{scale:g}x{NETWORK_EXTENSION}'
+    print(f'Generating network at scale [{scale:g}] with seed [{seed}]...')
+    graph = generate_network(scale, seed)
+    write_network(graph, output_path)
+    print(
+        f'Saved [{graph.station_count}] stations, [{len(graph.line_names)}] lines and [{len(graph.neighbours)}] '
+        f'connections to [{output_path}]'
+    )
+
+
+def run_routing_service(host: str, port: int, socket_path: str, workers: int):
+    """
+    Run the routing service until interrupted.
+    """
+    # imported here so that single searches do not pay for importing asyncio
+    from search.service import run_service
+
+    print(f'Serving on [{socket_path or f"{host}:{port}"}]...')
+    try:
+        run_service(host, port, socket_path, workers)
+    except KeyboardInterrupt:
+        print('Stopped')
+
+
 def run_search():
     """
     Parse command line arguments and search based on those values.
@@ -19,13 +228,21 @@ def run_search():
         prog='search.py',
         description='Search station data provided in a file with various algorithms'
     )
-    parser.add_argument('start', help='Start station')
-    parser.add_argument('goal', help='Goal station')
+    parser.add_argument('start', nargs='?', help='Start station')
+    parser.add_argument('goal', nargs='?', help='Goal station')
     parser.add_argument(
         '-a',
         '--algorithm',
         default='BreadthFirst',
-        choices=['BreadthFirst', 'DepthFirst', 'UniformCost', 'BestFirst'],
+        choices=[
+            'BreadthFirst',
+            'DepthFirst',
+            'UniformCost',
+            'BestFirst',
+            'AStar',
+            'ContractionHierarchy',
+            'AnytimeAStar'
+        ],
         help='select algorithm'
     )
     parser.add_argument(
@@ -40,7 +257,169 @@ def run_search():
         action='store_true',
         help='reverse the order of nodes when adding to the queue'
     )
+    parser.add_argument(
+        '-b',
+        '--bidirectional',
+        action='store_true',
+        help='search from the start and the goal at once; UniformCost and AStar only'
+    )
+    parser.add_argument(
+        '--stats',
+        nargs='?',
+        const='text',
+        choices=['text', 'json'],
+        help='print counts of nodes expanded and pushed, the peak frontier size and time spent per phase'
+    )
+    parser.add_argument(
+        '--deadline',
+        metavar='MS',
+        help='stop searching after MS milliseconds; AnytimeAStar then prints the best route found so far'
+    )
+    parser.add_argument(
+        '--max-expansions',
+        metavar='N',
+        help='stop searching after expanding N nodes; AnytimeAStar then prints the best route found so far'
+    )
+    parser.add_argument(
+        '--alternatives',
+        metavar='K',
+        help='find the K cheapest routes which do not visit a station twice, ranked as UniformCost would rank them'
+    )
+    parser.add_argument(
+        '--pareto',
+        action='store_true',
+        help='find every route trading journey time against line changes, in one search'
+    )
+    parser.add_argument(
+        '--within',
+        metavar='MINUTES',
+        help='list every station reachable from the start station within MINUTES, with its cost and previous station'
+    )
+    parser.add_argument(
+        '--origin',
+        metavar='STATION',
+        action='append',
+        help='another origin for --within, which then gives the nearest origin of each station; may be repeated'
+    )
+    parser.add_argument(
+        '--complete',
+        metavar='PREFIX',
+        help='list station names starting with PREFIX, ignoring case and punctuation'
+    )
+    parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='search every (start, goal) pair in a CSV or JSONL file and write one JSON result per line'
+    )
+    parser.add_argument(
+        '--all-pairs',
+        action='store_true',
+        help='search every pair of stations and write one JSON result per line'
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        default='1',
+        help='number of worker processes for --batch, --all-pairs and --serve'
+    )
+    parser.add_argument(
+        '--scaling',
+        action='store_true',
+        help='time --all-pairs with 1, 2, 4, ... workers, up to --workers if more than 1 or else the number of CPUs'
+    )
+    parser.add_argument(
+        '-t',
+        '--table',
+        action='store_true',
+        help='answer UniformCost, AStar and ContractionHierarchy searches from the table of cheapest routes, if built'
+    )
+    parser.add_argument(
+        '--build-table',
+        action='store_true',
+        help='build and save the table of cheapest routes for the line change cost'
+    )
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='time every algorithm with several line change costs and reverse settings and write JSON results'
+    )
+    parser.add_argument('--sample', default='200', help='number of station pairs for --benchmark; 0 for every pair')
+    parser.add_argument('--seed', default='0', help='seed for the sample of station pairs or the generated network')
+    parser.add_argument('--output', metavar='FILE', help='file to write --benchmark results or --generate network to')
+    parser.add_argument('--compare', metavar='FILE', help='earlier --benchmark results to compare with')
+    parser.add_argument(
+        '--algorithms',
+        metavar='NAMES',
+        help='comma-separated algorithms for --benchmark, e.g. UniformCost,AStar; all of them if not given'
+    )
+    parser.add_argument(
+        '--generate',
+        metavar='SCALE',
+        help='generate a synthetic network SCALE times the size of the data, e.g. 10, 100 or 1000, and save it'
+    )
+    parser.add_argument(
+        '--data',
+        metavar='FILE',
+        help='CSV data file or generated .network file to search instead of tubedata.csv'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='answer newline-delimited JSON queries over a socket, keeping the graph loaded'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='address for --serve to listen on')
+    parser.add_argument('--port', default='8765', help='TCP port for --serve to listen on')
+    parser.add_argument('--socket', metavar='PATH', help='Unix socket for --serve to listen on instead of a TCP port')
     args = parser.parse_args()
+    if args.generate is not None:
+        generate_synthetic_network(float(args.generate), int(args.seed), args.output)
+        return
+
+    if args.data is not None:
+        reload_graph(args.data)
+
+    if args.complete is not None:
+        print_completions(args.complete)
+        return
+
+    if args.serve:
+        run_routing_service(args.host, int(args.port), args.socket, int(args.workers))
+        return
+
+    if args.scaling:
+        workers = int(args.workers)
+        print_scaling(
+            Algorithm.from_string(args.algorithm),
+            int(args.line_change_cost),
+            workers if workers > 1 else os.cpu_count()
+        )
+        return
+
+    if args.benchmark:
+        run_benchmark_suite(int(args.sample), int(args.seed), args.output, args.compare, args.algorithms)
+        return
+
+    if args.build_table:
+        build_route_table(int(args.line_change_cost))
+        return
+
+    if args.within is not None:
+        if args.start is None:
+            parser.error('a start station is required with --within')
+
+        try:
+            origins = resolve_stations([args.start] + (args.origin or []))
+            print(f'Finding stations within [{args.within}] minutes of [{", ".join(origins)}]...')
+            print_isochrone(isochrone_search(origins, int(args.within), int(args.line_change_cost)), len(origins) > 1)
+        except ValueError as value_error:
+            print(f'Failed to complete search: [{value_error}]')
+        return
+
+    if args.batch is None and not args.all_pairs and (args.start is None or args.goal is None):
+        parser.error(
+            'start and goal stations are required unless --within, --complete, --batch, --all-pairs, '
+            '--build-table, --benchmark, --generate or --serve is used'
+        )
 
     # parse command line arguments
     start = args.start
@@ -48,17 +427,73 @@ def run_search():
     algorithm = Algorithm.from_string(args.algorithm)
     line_change_cost = int(args.line_change_cost)
     reverse = bool(args.reverse)
+    bidirectional = bool(args.bidirectional)
+    stats = SearchStats() if args.stats is not None else None
+    if stats is not None and (args.table or args.alternatives is not None or args.pareto):
+        parser.error('--stats is not available with --table, --alternatives or --pareto')
+    budget = SearchBudget(
+        None if args.deadline is None else float(args.deadline) / 1000,
+        None if args.max_expansions is None else int(args.max_expansions)
+    )
+
+    if args.batch is not None or args.all_pairs:
+        run_batch(args.batch, algorithm, line_change_cost, int(args.workers))
+        return
+
+    try:
+        (start, goal) = resolve_stations([start, goal])
+    except ValueError as value_error:
+        print(f'Failed to complete search: [{value_error}]')
+        return
 
     # Print search request to user
     print('Performing search...')
-    print(f'From [{start}] to [{goal}] using algorithm [{args.algorithm}]')
+    if args.pareto:
+        # the Pareto search runs its own search, whatever the algorithm selected
+        print(f'From [{start}] to [{goal}] using a Pareto search over journey time and line changes')
+    else:
+        print(f'From [{start}] to [{goal}] using algorithm [{args.algorithm}]')
     if line_change_cost > 0:
         print(f'Line change cost: [{line_change_cost}]')
+    if bidirectional:
+        print('Searching from both ends')
+    if args.alternatives is not None:
+        print(f'Finding up to [{args.alternatives}] alternative routes')
+    if args.pareto:
+        print('Finding the quickest route for each number of line changes')
 
     # perform search and print results
     try:
-        path, cost, explored_nodes = variant_search(start, goal, algorithm, reverse, line_change_cost)
+        if args.alternatives is not None:
+            print_alternatives(alternative_search(start, goal, int(args.alternatives), line_change_cost))
+            return
+
+        if args.pareto:
+            print_pareto(pareto_search(start, goal))
+            return
+
+        if algorithm == Algorithm.AnytimeAStar and not args.table and not bidirectional and stats is None:
+            print_anytime(start, goal, line_change_cost, budget)
+            return
+
+        if args.table:
+            # imported here so that other searches do not pay for importing numpy
+            from search.table import table_search
+            path, cost, explored_nodes = table_search(start, goal, algorithm, reverse, line_change_cost)
+        else:
+            path, cost, explored_nodes = variant_search(
+                start,
+                goal,
+                algorithm,
+                reverse,
+                line_change_cost,
+                bidirectional,
+                stats,
+                budget
+            )
         print_output(path, cost, explored_nodes)
+        if stats is not None:
+            print_stats(stats, args.stats)
     except ValueError as value_error:
         print(f'Failed to complete search: [{value_error}]')
     except FileNotFoundError as file_not_found_error:
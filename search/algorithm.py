@@ -1,105 +1,171 @@
+from time import perf_counter
 from typing import Callable
+from .budget import SearchBudget
 from .state import SearchState
-from import_underground_data import station_dict, zone_dict
+from .state_graph import StateGraph
+from .stats import SearchStats
 
 
-def expand_children(node: SearchState) -> list:
+def expand_children(state_graph: StateGraph, node: SearchState) -> range:
     """
-    Utility function which fetches the list of child nodes, visited or not, of a given node from a dictionary.
+    Utility function which fetches the edges, visited or not, of a given node from the state graph.
         Parameters:
-            node (SearchState): node state which child nodes will be returned.
+            state_graph (StateGraph):  line-expanded station graph
+            node        (SearchState): node state which child nodes will be returned.
 
         Returns:
-            (list[tuple[str, int, str]]): All connected nodes, of the node provided
+            (range): Positions in the state graph's edge arrays of all edges from the node provided
     """
-    if node.station not in station_dict:
-        # something has gone wrong -- trying to expand unknown node
-        raise ValueError(f'Invalid station {node.station} not found in station data')
-
-    # filter out child nodes not found in the list of already explored nodes
-    return station_dict[node.station]
+    return range(state_graph.offsets[node.state], state_graph.offsets[node.state + 1])
 
 
 def filter_child_data(
-    child_data: list,
+    state_graph: StateGraph,
+    child_edges: range,
     current_node: SearchState,
-    explored_nodes: dict
+    closed: bytearray
 ) -> list:
     """
-    Utility function to filter child nodes which have not already been visited along the current line.
+    Utility function to filter child nodes whose (station, line) state has not already been explored,
+    along open connections.
 
         Parameters:
-            child_data     (list[tuple[str, int, str]]): child nodes to be tested
-            current_node   (SearchState):                current node
-            explored_nodes (dict[str, int]):             a dictionary of previously explored nodes together with
-                                                         minimum path costs to the nodes from the start
+            state_graph  (StateGraph):  line-expanded station graph
+            child_edges  (range):       positions of the child edges in the edge arrays
+            current_node (SearchState): current node
+            closed       (bytearray):   non-zero for each state id already explored
 
         Returns:
-            (list[tuple[str, int, str, str, set]]): Filtered list of child nodes
+            (list[tuple[int, int, SearchState]]): Filtered list of child nodes
     """
+    targets = state_graph.targets
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+
     enriched_data = []
-    for (station, cost, line) in child_data:
-        if (station not in explored_nodes) or (line not in explored_nodes[station]):
-            enriched_data.append((station, cost, current_node, line, zone_dict[station]))
+    for edge in child_edges:
+        state = targets[edge]
+        if not closed[state] and open_edges[edge]:
+            enriched_data.append((state, costs[edge], current_node))
 
     return enriched_data
 
 
 def generic_search(
-    start: str,
-    goal: str,
+    state_graph: StateGraph,
+    start: int,
+    goal: int,
     create_queue_fn: Callable,
     enqueue_node_fn: Callable,
     reverse: bool = False,
-    line_change_cost: int = 0
+    stats: SearchStats = None,
+    budget: SearchBudget = None
 ) -> tuple:
     """
     Generic search algorithm: given a function 'enqueue_node_fn' to add nodes to a queue object, this function
-    implements a search algorithm using this queue to fetch the next node to explore.
+    implements a search algorithm using this queue to fetch the next node to explore.  The search runs over
+    the (station, line) states of 'state_graph', whose edge costs already include the line change cost.
 
         Parameters:
-            start            (str):      start station for search
-            goal             (str):      goal station for search
-            create_queue_fn  (Callable): function to initialize the queue
-            enqueue_node_fn  (Callable): function to enqueue a list of nodes
-            reverse          (bool):     reverse order of nodes before adding to the queue
-            line_change_cost (bool):     cost of changing from one line to another
+            state_graph     (StateGraph): line-expanded station graph
+            start           (int):        start station id for search
+            goal            (int):        goal station id for search
+            create_queue_fn (Callable):   function to initialize the queue
+            enqueue_node_fn (Callable):   function to enqueue a list of nodes
+            reverse         (bool):       reverse order of nodes before adding to the queue
+            stats           (SearchStats): collector for counts and timings, or None
+            budget          (SearchBudget): limit on time and expansions, or None; SearchBudgetExceeded is
+                raised if it runs out before the goal is reached
 
         Returns:
-            (tuple[list[str], int, int]): Path of station names from the start to the goal, the cost, in minutes,
-                of the path and the total number of nodes explored before the goal is reached
+            (tuple[list[tuple[int, int]], int, int]): Path of station and line ids from the start to the goal,
+                the cost, in minutes, of the path and the total number of stations explored before the goal is reached
     """
+    if stats is not None:
+        stats.begin(state_graph.state_count)
+        search_start = perf_counter()
+
     if start == goal:
         # already at goal, nothing to do
+        if stats is not None:
+            stats.explored_nodes = 0
+            stats.total_time = perf_counter() - search_start
         return [], 0, 0
 
-    explored_nodes = dict()
-    queue = create_queue_fn((start, 0, None, None, zone_dict[start]), zone_dict[goal])
+    state_stations = state_graph.state_stations
+    closed = bytearray(state_graph.state_count)
+    explored_stations = bytearray(state_graph.graph.station_count)
+    explored_nodes = 0
+
+    # the start state of each station has the same id as the station
+    queue = create_queue_fn((start, 0, None), state_graph, goal)
+    if stats is not None:
+        stats.push(start)
+        stats.peak_frontier = len(queue)
 
     while not queue.empty():
-        # fetch next node from the queue
-        _, current_node = queue.get()
+        if budget is not None:
+            budget.spend()
 
-        # add to explored nodes, if not already present
-        # (may already be present if we visited via a different line)
-        if current_node.station not in explored_nodes:
-            explored_nodes[current_node.station] = [current_node.line]
-        elif current_node.line not in explored_nodes[current_node.station]:
-            explored_nodes[current_node.station].append(current_node.line)
+        # fetch next node from the queue
+        current_node = queue.get()
+        if stats is not None:
+            stats.expansions += 1
+            if closed[current_node.state]:
+                stats.reexpansions += 1
+
+        # add to explored states; the station may already be explored if we visited via a different line
+        closed[current_node.state] = 1
+        station = state_stations[current_node.state]
+        if not explored_stations[station]:
+            explored_stations[station] = 1
+            explored_nodes += 1
 
         # if we are at the goal, return the path and costs
-        if current_node.station == goal:
-            return current_node.to_path(), current_node.cost, len(explored_nodes)
+        if station == goal:
+            if stats is not None:
+                stats.explored_nodes = explored_nodes
+                stats.total_time = perf_counter() - search_start
+            return state_graph.path(current_node.to_path()), current_node.cost, explored_nodes
 
         # expand child nodes and add these to the queue
-        child_data = expand_children(current_node)
-        non_visited_child_data = filter_child_data(
-            child_data,
-            current_node,
-            explored_nodes
-        )
-
-        enqueue_node_fn(queue, non_visited_child_data, reverse, line_change_cost, zone_dict[goal])
+        if stats is None:
+            child_edges = expand_children(state_graph, current_node)
+            non_visited_child_data = filter_child_data(
+                state_graph,
+                child_edges,
+                current_node,
+                closed
+            )
+
+            enqueue_node_fn(queue, non_visited_child_data, reverse)
+        else:
+            phase_start = perf_counter()
+            child_edges = expand_children(state_graph, current_node)
+            expanded = perf_counter()
+            non_visited_child_data = filter_child_data(
+                state_graph,
+                child_edges,
+                current_node,
+                closed
+            )
+            filtered = perf_counter()
+            enqueue_node_fn(queue, non_visited_child_data, reverse, stats)
+            enqueued = perf_counter()
+
+            stats.expand_time += expanded - phase_start
+            stats.filter_time += filtered - expanded
+            stats.enqueue_time += enqueued - filtered
+            stats.generated += len(child_edges)
+            stats.filtered += len(non_visited_child_data)
+            stats.peak_frontier = max(stats.peak_frontier, len(queue))
+
+    if stats is not None:
+        stats.explored_nodes = explored_nodes
+        stats.total_time = perf_counter() - search_start
 
     # no path from start to goal, raise an error
-    raise ValueError(f'Unable to find path from start [{start}] to goal [{goal}]')
+    station_names = state_graph.graph.station_names
+    raise ValueError(
+        f'Unable to find path from start [{station_names[start]}] to goal [{station_names[goal]}]'
+    )
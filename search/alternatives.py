@@ -0,0 +1,236 @@
+from heapq import heappush, heappop
+from itertools import count
+from .state_graph import StateGraph
+
+# remaining cost from states which cannot reach the goal, and next state from the goal itself
+UNREACHABLE = -1
+NO_STATE = -1
+
+
+def goal_tree(state_graph: StateGraph, goal: int) -> tuple:
+    """
+    Calculate the cheapest route from every state to a goal station, with one uniform cost search backward
+    from each line state of the goal.
+        Parameters:
+            state_graph (StateGraph): line-expanded station graph
+            goal        (int):        goal station id
+
+        Returns:
+            (tuple[list[int], list[int]]): remaining cost from each state, or UNREACHABLE, and the next state on
+                the cheapest route from each state, or NO_STATE
+    """
+    offsets, sources, forward_edges = state_graph.reverse_edges()
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+    distances = [UNREACHABLE] * state_graph.state_count
+    successors = [NO_STATE] * state_graph.state_count
+    heap = []
+    for state in state_graph.line_states(goal):
+        distances[state] = 0
+        heap.append((0, state))
+
+    while heap:
+        distance, state = heappop(heap)
+        if distance > distances[state]:
+            continue
+
+        for edge in range(offsets[state], offsets[state + 1]):
+            forward_edge = forward_edges[edge]
+            if not open_edges[forward_edge]:
+                continue
+
+            source = sources[edge]
+            source_distance = distance + costs[forward_edge]
+            if distances[source] == UNREACHABLE or source_distance < distances[source]:
+                distances[source] = source_distance
+                successors[source] = state
+                heappush(heap, (source_distance, source))
+
+    return distances, successors
+
+
+def spur_search(
+    state_graph: StateGraph,
+    spur: int,
+    distances: list,
+    successors: list,
+    blocked_stations: bytearray,
+    removed_targets: set
+):
+    """
+    A* search from a state to the goal of a goal tree, avoiding blocked stations and some of the edges from
+    the state.  The remaining costs in 'distances' are exact on the whole graph, and blocking stations or
+    edges can only make routes dearer, so they are a consistent heuristic.  They are also exact for any state
+    whose route in the goal tree is not blocked, so the search finishes as soon as it takes such a state from
+    the frontier, following the goal tree from there.  Where the spur's own route is not blocked this is the
+    first state taken.
+        Parameters:
+            state_graph      (StateGraph): line-expanded station graph
+            spur             (int):        state to search from
+            distances        (list[int]):  remaining cost from each state on the whole graph
+            successors       (list[int]):  next state on the cheapest route from each state on the whole graph
+            blocked_stations (bytearray):  non-zero for each station the route may not enter
+            removed_targets  (set[int]):   states the route may not take from the spur
+
+        Returns:
+            (tuple[list[int], list[int]] | None): states from the spur to the goal and the cost of reaching
+                each from the spur, or None if the goal cannot be reached
+    """
+    if distances[spur] == UNREACHABLE:
+        return None
+
+    offsets = state_graph.offsets
+    targets = state_graph.targets
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+    state_stations = state_graph.state_stations
+
+    # whether the route in the goal tree from each state checked is free of blocked stations
+    clear_routes = dict()
+
+    labels = {spur: 0}
+    parents = {spur: None}
+    # ties are broken towards the costlier state, which is further along a route to the goal
+    heap = [(distances[spur], 0, spur)]
+    while heap:
+        _, negative_cost, state = heappop(heap)
+        cost = -negative_cost
+        if cost > labels[state]:
+            continue
+
+        if state != spur or successors[spur] not in removed_targets:
+            route = []
+            next_state = successors[state]
+            clear = True
+            while next_state != NO_STATE:
+                if next_state in clear_routes:
+                    clear = clear_routes[next_state]
+                    break
+                if blocked_stations[state_stations[next_state]]:
+                    clear = False
+                    break
+                route.append(next_state)
+                next_state = successors[next_state]
+            for route_state in route:
+                clear_routes[route_state] = clear
+
+            if clear:
+                states = []
+                while state is not None:
+                    states.append(state)
+                    state = parents[state]
+                states.reverse()
+                state_costs = [labels[state] for state in states]
+
+                # follow the goal tree to the goal
+                route_cost = cost + distances[states[-1]]
+                state = successors[states[-1]]
+                while state != NO_STATE:
+                    state_costs.append(route_cost - distances[state])
+                    states.append(state)
+                    state = successors[state]
+
+                return states, state_costs
+
+        for edge in range(offsets[state], offsets[state + 1]):
+            if not open_edges[edge]:
+                continue
+
+            target = targets[edge]
+            if blocked_stations[state_stations[target]] or distances[target] == UNREACHABLE:
+                continue
+            if state == spur and target in removed_targets:
+                continue
+
+            target_cost = cost + costs[edge]
+            if target_cost < labels.get(target, target_cost + 1):
+                labels[target] = target_cost
+                parents[target] = state
+                heappush(heap, (target_cost + distances[target], -target_cost, target))
+
+    return None
+
+
+def k_shortest_paths(state_graph: StateGraph, start: int, goal: int, route_count: int) -> list:
+    """
+    Find the cheapest routes between two stations which do not visit any station twice, cheapest first, by
+    Yen's algorithm.  Each new route leaves an earlier route at some stop (the spur) and takes the cheapest
+    way on to the goal that avoids the stations up to the spur and the next stop of every earlier route
+    sharing the same stops up to the spur.  Routes are only branched from the stop where they left the route
+    they were found from onward (Lawler's refinement), as earlier spurs have already been searched.
+
+    One backward search from the goal gives the cheapest route from every state, which all spur searches
+    share: the spur search takes it directly where it is not blocked, and otherwise uses its cost as an
+    exact heuristic, so each spur search costs little more than walking its route.
+
+        Parameters:
+            state_graph (StateGraph): line-expanded station graph
+            start       (int):        start station id
+            goal        (int):        goal station id
+            route_count (int):        number of routes to find
+
+        Returns:
+            (list[tuple[list[tuple[int, int]], int]]): Path of station and line ids from the start to the goal and
+                the cost, in minutes, of the path for up to 'route_count' routes, cheapest first
+    """
+    if start == goal:
+        return [([], 0)]
+
+    station_names = state_graph.graph.station_names
+    distances, successors = goal_tree(state_graph, goal)
+    blocked_stations = bytearray(state_graph.graph.station_count)
+    first = spur_search(state_graph, start, distances, successors, blocked_stations, set())
+    if first is None:
+        # no path from start to goal, raise an error
+        raise ValueError(f'Unable to find path from start [{station_names[start]}] to goal [{station_names[goal]}]')
+
+    state_stations = state_graph.state_stations
+
+    # routes found, as (states, cost of reaching each state, stop the route left its parent at)
+    routes = [(first[0], first[1], 0)]
+    candidates = []
+    candidate_order = count()
+    seen = {tuple(first[0])}
+    while len(routes) < route_count:
+        states, state_costs, deviation = routes[-1]
+        for spur_index in range(deviation, len(states) - 1):
+            root = states[:spur_index + 1]
+            removed_targets = {
+                route[spur_index + 1]
+                for (route, _, _) in routes
+                if len(route) > spur_index + 1 and route[:spur_index + 1] == root
+            }
+            for state in root:
+                blocked_stations[state_stations[state]] = 1
+            spur = spur_search(
+                state_graph,
+                states[spur_index],
+                distances,
+                successors,
+                blocked_stations,
+                removed_targets
+            )
+            for state in root:
+                blocked_stations[state_stations[state]] = 0
+
+            if spur is None:
+                continue
+
+            spur_states, spur_costs = spur
+            candidate = root + spur_states[1:]
+            if tuple(candidate) in seen:
+                continue
+
+            root_cost = state_costs[spur_index]
+            candidate_costs = state_costs[:spur_index + 1] + [root_cost + cost for cost in spur_costs[1:]]
+            seen.add(tuple(candidate))
+            heappush(candidates, (candidate_costs[-1], next(candidate_order), candidate, candidate_costs, spur_index))
+
+        if not candidates:
+            # fewer loopless routes than requested
+            break
+
+        _, _, states, state_costs, deviation = heappop(candidates)
+        routes.append((states, state_costs, deviation))
+
+    return [(state_graph.path(states), state_costs[-1]) for (states, state_costs, _) in routes]
@@ -0,0 +1,136 @@
+from collections import namedtuple
+from .algorithm import generic_search
+from .budget import SearchBudget, SearchBudgetExceeded
+from .frontier import WeightedFrontier
+from .heuristics import get_landmark_heuristic
+from .state import SearchState
+from .state_graph import StateGraph
+from .stats import SearchStats
+
+# weights of the passes of an anytime search; each pass only looks for routes cheaper than the best found
+# so far, and the last pass, with weight one, finds the cheapest route
+DEFAULT_WEIGHTS = (3.0, 2.0, 1.5, 1.25, 1.0)
+
+# route found by one pass of an anytime search: path of (station id, line id) pairs, its cost, the number of
+# stations explored by all passes so far, the weight of the pass and whether the route is known to be cheapest
+AnytimeRoute = namedtuple('AnytimeRoute', ['path', 'cost', 'explored_nodes', 'weight', 'optimal'])
+
+
+def create_queue_weighted_a_star(
+    initial_entry: tuple,
+    state_graph: StateGraph,
+    goal: int,
+    weight: float = 1.0,
+    bound: int = None
+) -> WeightedFrontier:
+    """
+    Create weighted frontier for weighted A* search, with landmark lower bounds to the goal.
+    """
+    station_estimate = get_landmark_heuristic(state_graph.graph).estimate_to(goal, state_graph.line_change_cost)
+    state_stations = state_graph.state_stations
+    state_lines = state_graph.state_lines
+    queue = WeightedFrontier(
+        lambda state: station_estimate(state_stations[state], state_lines[state]),
+        weight,
+        bound
+    )
+    enqueue_node_weighted_a_star(queue, [initial_entry])
+    return queue
+
+
+def enqueue_node_weighted_a_star(
+    queue: WeightedFrontier,
+    child_data: list,
+    reverse: bool = False,
+    stats: SearchStats = None
+):
+    """
+    Add items to weighted frontier for weighted A* search, ordered by cost plus the weighted estimate of the
+    remaining cost.  Nodes whose cost plus the unweighted estimate is not below the frontier's bound cannot
+    lead to a cheaper route and are not added.  A (station, line) state already added at a lower or equal
+    cost is not added again.
+    """
+    estimate = queue.estimate
+    weight = queue.weight
+    bound = queue.bound
+    for (state, step_cost, parent) in (child_data if reverse else reversed(child_data)):
+        cost = step_cost
+        if parent:
+            cost = cost + parent.cost
+
+        remaining = estimate(state)
+        if bound is not None and cost + remaining >= bound:
+            continue
+
+        if queue.reach(state, cost):
+            queue.put(cost + weight * remaining, SearchState(state=state, cost=cost, parent=parent))
+            if stats is not None:
+                stats.push(state)
+
+
+def anytime_routes(
+    state_graph: StateGraph,
+    start: int,
+    goal: int,
+    budget: SearchBudget = None,
+    weights: tuple = DEFAULT_WEIGHTS
+):
+    """
+    Anytime search by restarting weighted A*: passes with decreasing weights each look for a route cheaper
+    than the best found so far, yielding each improvement as it is found.  A pass with weight w finds a
+    route costing at most w times the cheapest, so early passes give a usable route quickly and the pass
+    with weight one proves the last route optimal.  If that pass finds nothing cheaper, the best route is
+    yielded again, flagged optimal.  When the budget runs out the generator stops, and the last route
+    yielded is the best known.
+        Parameters:
+            state_graph (StateGraph):   line-expanded station graph
+            start       (int):          start station id
+            goal        (int):          goal station id
+            budget      (SearchBudget): limit on time and expansions shared by all passes, or None
+            weights     (tuple[float]): weight of each pass, decreasing and ending with 1.0
+
+        Returns:
+            (Iterator[AnytimeRoute]): routes, each cheaper than the last, except for the final route repeated
+                once it is proven optimal
+    """
+    if start == goal:
+        # already at goal, nothing to do
+        yield AnytimeRoute([], 0, 0, 1.0, True)
+        return
+
+    best = None
+    explored_nodes = 0
+    for weight in weights:
+        bound = None if best is None else best.cost
+
+        def create_queue(initial_entry: tuple, state_graph: StateGraph, goal: int, *_) -> WeightedFrontier:
+            return create_queue_weighted_a_star(initial_entry, state_graph, goal, weight, bound)
+
+        optimal = weight <= 1.0
+        try:
+            path, cost, explored = generic_search(
+                state_graph,
+                start,
+                goal,
+                create_queue,
+                enqueue_node_weighted_a_star,
+                budget=budget
+            )
+        except SearchBudgetExceeded:
+            return
+        except ValueError:
+            if best is None:
+                # no route at all
+                raise
+
+            # no route cheaper than the best one; a pass with weight one proves it is the cheapest
+            if optimal:
+                yield best._replace(optimal=True)
+                return
+            continue
+
+        explored_nodes += explored
+        best = AnytimeRoute(path, cost, explored_nodes, weight, optimal)
+        yield best
+        if optimal:
+            return
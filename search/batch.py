@@ -0,0 +1,182 @@
+import csv
+import json
+from collections import namedtuple
+from itertools import islice
+from .loader import get_graph
+from .names import get_station_index
+from .tree import shortest_path_tree
+from .variants import Algorithm, variant_search
+
+# number of pairs read and grouped by origin at a time; memory use is bounded by this
+# rather than by the total number of pairs
+DEFAULT_CHUNK_SIZE = 10000
+
+# algorithms which always return a cheapest route, so one uniform cost search per origin
+# can answer all of that origin's pairs
+SINGLE_SOURCE_ALGORITHMS = (Algorithm.UniformCost, Algorithm.AStar)
+
+# result for one (start, goal) pair: either path, cost and explored_nodes, or an error message
+BatchResult = namedtuple('BatchResult', ['start', 'goal', 'path', 'cost', 'explored_nodes', 'error'])
+
+
+def read_pairs(path: str):
+    """
+    Read (start, goal) pairs from a file, one pair per line.  Files ending in '.jsonl' or '.json' hold one
+    JSON object ({"start": ..., "goal": ...}) or array ([start, goal]) per line, any other file is read as CSV
+    with the start and goal in the first two columns.
+        Parameters:
+            path (str): path to the file
+
+        Returns:
+            (Iterator[tuple[str, str]]): (start, goal) pairs, read lazily
+    """
+    with open(path, newline='') as pairs_file:
+        if path.endswith(('.jsonl', '.json')):
+            for line in pairs_file:
+                if not line.strip():
+                    continue
+
+                pair = json.loads(line)
+                if isinstance(pair, dict):
+                    yield pair['start'], pair['goal']
+                else:
+                    yield pair[0], pair[1]
+        else:
+            for row in csv.reader(pairs_file):
+                if row:
+                    yield row[0], row[1]
+
+
+def resolve_names(graph, pairs: list) -> dict:
+    """
+    Resolve every station name in a list of pairs once, before any search runs, so that names written with
+    other case, punctuation or '&' for 'and' are matched to stations (see StationIndex.resolve).  Searches
+    then only see the station names in the data.
+        Parameters:
+            graph (Graph):                   compiled station graph
+            pairs (list[tuple[str, str]]):   (start, goal) station names
+
+        Returns:
+            (dict[str, tuple[str, str]]): station name, or None, and error message, or None, for each name
+    """
+    index = get_station_index(graph)
+    resolved = dict()
+    for pair in pairs:
+        for name in pair:
+            if name in resolved:
+                continue
+
+            try:
+                resolved[name] = (graph.station_names[index.resolve(name)], None)
+            except ValueError as value_error:
+                resolved[name] = (None, str(value_error))
+
+    return resolved
+
+
+def search_from_origin(graph, start: str, goals: list, line_change_cost: int) -> dict:
+    """
+    Answer every pair from one origin with a single uniform cost search, which stops once all the goals
+    have been explored.
+        Parameters:
+            graph            (Graph):     compiled station graph
+            start            (str):       start station shared by the pairs
+            goals            (list[str]): goal station of each pair
+            line_change_cost (int):       line change cost in minutes
+
+        Returns:
+            (dict[str, BatchResult]): result for each goal
+    """
+    try:
+        start_id = graph.station_id(start)
+    except ValueError as value_error:
+        return {goal: BatchResult(start, goal, None, None, None, str(value_error)) for goal in goals}
+
+    results = dict()
+    goal_ids = dict()
+    for goal in goals:
+        try:
+            goal_ids[goal] = graph.station_id(goal)
+        except ValueError as value_error:
+            results[goal] = BatchResult(start, goal, None, None, None, str(value_error))
+
+    tree = shortest_path_tree(graph, start_id, line_change_cost, set(goal_ids.values()))
+    for (goal, goal_id) in goal_ids.items():
+        try:
+            path, cost = tree.path_to(goal_id)
+        except ValueError as value_error:
+            results[goal] = BatchResult(start, goal, None, None, None, str(value_error))
+            continue
+
+        explored_nodes = tree.explored_counts[goal_id] if path else 0
+        results[goal] = BatchResult(start, goal, graph.path_names(path), cost, explored_nodes, None)
+
+    return results
+
+
+def batch_search(
+    pairs,
+    algorithm: Algorithm = Algorithm.UniformCost,
+    line_change_cost: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+):
+    """
+    Search for routes between many (start, goal) pairs.  Pairs are read in chunks, and the station names of
+    each chunk are resolved before any of its pairs are searched; results give the resolved names, or the
+    names as given if they could not be resolved.  Pairs are then grouped by start station:
+    for UniformCost and AStar one search per start station answers all of its pairs in the chunk, other
+    algorithms search each pair separately.  A pair which cannot be answered (e.g. an unknown station) gives
+    a result with an error rather than stopping the batch.
+        Parameters:
+            pairs            (Iterable[tuple[str, str]]): (start, goal) station names
+            algorithm        (Algorithm):                 enum selection of the algorithm
+            line_change_cost (int):                       line change cost in minutes
+            chunk_size       (int):                       number of pairs grouped at a time
+
+        Returns:
+            (Iterator[BatchResult]): result for each pair, in the same order as the pairs
+    """
+    graph = get_graph()
+    pairs = iter(pairs)
+    while True:
+        chunk = list(islice(pairs, chunk_size))
+        if not chunk:
+            return
+
+        resolved = resolve_names(graph, chunk)
+        if algorithm not in SINGLE_SOURCE_ALGORITHMS:
+            for (start, goal) in chunk:
+                (start_name, start_error), (goal_name, goal_error) = resolved[start], resolved[goal]
+                if start_error or goal_error:
+                    yield BatchResult(start, goal, None, None, None, start_error or goal_error)
+                    continue
+
+                try:
+                    path, cost, explored_nodes = variant_search(
+                        start_name,
+                        goal_name,
+                        algorithm,
+                        False,
+                        line_change_cost
+                    )
+                    yield BatchResult(start_name, goal_name, path, cost, explored_nodes, None)
+                except Exception as error:
+                    yield BatchResult(start_name, goal_name, None, None, None, str(error))
+            continue
+
+        goals_by_origin = dict()
+        for (start, goal) in chunk:
+            (start_name, start_error), (goal_name, goal_error) = resolved[start], resolved[goal]
+            if not start_error and not goal_error:
+                goals_by_origin.setdefault(start_name, []).append(goal_name)
+
+        results = {
+            start_name: search_from_origin(graph, start_name, goal_names, line_change_cost)
+            for (start_name, goal_names) in goals_by_origin.items()
+        }
+        for (start, goal) in chunk:
+            (start_name, start_error), (goal_name, goal_error) = resolved[start], resolved[goal]
+            if start_error or goal_error:
+                yield BatchResult(start, goal, None, None, None, start_error or goal_error)
+            else:
+                yield results[start_name][goal_name]
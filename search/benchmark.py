@@ -0,0 +1,255 @@
+import json
+import platform
+import random
+import sys
+import time
+from itertools import permutations
+from .loader import get_graph
+from .service import percentile
+from .variants import Algorithm, variant_search
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, where peak memory is not recorded
+    resource = None
+
+# settings benchmarked unless others are given
+DEFAULT_SAMPLE_SIZE = 200
+DEFAULT_SEED = 0
+DEFAULT_LINE_CHANGE_COSTS = (0, 2, 5)
+DEFAULT_REVERSE_SETTINGS = (False, True)
+
+# version of the layout of benchmark results, incremented whenever it changes
+BENCHMARK_FORMAT_VERSION = 1
+
+
+def sample_pairs(station_names: list, sample_size: int, seed: int) -> list:
+    """
+    Draw a reproducible sample of (start, goal) pairs of distinct stations.  Positions in the ordered list of
+    all pairs are sampled rather than the pairs themselves, so that large networks do not need every pair in
+    memory.
+        Parameters:
+            station_names (list[str]): names of all stations
+            sample_size   (int):       number of pairs, or 0 for every pair
+            seed          (int):       seed for the random sample
+
+        Returns:
+            (list[tuple[str, str]]): sampled pairs, the same for the same stations, size and seed
+    """
+    names = sorted(station_names)
+    others = len(names) - 1
+    if sample_size <= 0 or sample_size >= len(names) * others:
+        return list(permutations(names, 2))
+
+    pairs = []
+    for position in random.Random(seed).sample(range(len(names) * others), sample_size):
+        # position of the pair in permutations(names, 2)
+        (start, goal) = divmod(position, others)
+        pairs.append((names[start], names[goal if goal < start else goal + 1]))
+
+    return pairs
+
+
+def summarise(values: list) -> dict:
+    """
+    Mean, percentiles and maximum of a list of values.
+    """
+    if not values:
+        return {'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    sorted_values = sorted(values)
+    return {
+        'mean': sum(sorted_values) / len(sorted_values),
+        'p50': percentile(sorted_values, 0.5),
+        'p90': percentile(sorted_values, 0.9),
+        'p99': percentile(sorted_values, 0.99),
+        'max': sorted_values[-1]
+    }
+
+
+def benchmark_setting(
+    pairs: list,
+    algorithm: Algorithm,
+    line_change_cost: int,
+    reverse: bool,
+    optimal_costs: dict
+) -> dict:
+    """
+    Run every pair through one algorithm and setting, timing each search.
+        Parameters:
+            pairs            (list[tuple[str, str]]):      (start, goal) pairs
+            algorithm        (Algorithm):                  algorithm to benchmark
+            line_change_cost (int):                        line change cost in minutes
+            reverse          (bool):                       reverse order of nodes before adding to the queue
+            optimal_costs    (dict[tuple[str, str], int]): UniformCost cost of each pair which has a route
+
+        Returns:
+            (dict): latency in milliseconds, nodes explored, failures and cost gaps to UniformCost
+    """
+    # the first search builds any preprocessed data (state graph, landmarks, hierarchy) and is not timed
+    try:
+        variant_search(*pairs[0], algorithm, reverse, line_change_cost)
+    except Exception:
+        pass
+
+    latencies = []
+    explored = []
+    gaps = []
+    relative_gaps = []
+    failures = dict()
+    for (start, goal) in pairs:
+        search_start = time.perf_counter()
+        try:
+            _, cost, explored_nodes = variant_search(start, goal, algorithm, reverse, line_change_cost)
+        except Exception as error:
+            # BestFirst gives up when it runs out of nodes, other algorithms fail only if there is no route
+            latencies.append((time.perf_counter() - search_start) * 1000)
+            failures[str(error)] = failures.get(str(error), 0) + 1
+            continue
+
+        latencies.append((time.perf_counter() - search_start) * 1000)
+        explored.append(explored_nodes)
+        optimal_cost = optimal_costs.get((start, goal))
+        if optimal_cost is not None:
+            gaps.append(cost - optimal_cost)
+            relative_gaps.append((cost - optimal_cost) / optimal_cost if optimal_cost else 0.0)
+
+    return {
+        'algorithm': algorithm.name,
+        'line_change_cost': line_change_cost,
+        'reverse': reverse,
+        'queries': len(pairs),
+        'successes': len(pairs) - sum(failures.values()),
+        'failures': sum(failures.values()),
+        'failure_reasons': failures,
+        'latency_ms': summarise(latencies),
+        'explored_nodes': summarise(explored),
+        'optimal': sum(1 for gap in gaps if gap == 0),
+        'cost_gap': summarise(gaps),
+        'relative_cost_gap': summarise(relative_gaps)
+    }
+
+
+def run_benchmark(
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    seed: int = DEFAULT_SEED,
+    algorithms: list = None,
+    line_change_costs: tuple = DEFAULT_LINE_CHANGE_COSTS,
+    reverse_settings: tuple = DEFAULT_REVERSE_SETTINGS
+) -> dict:
+    """
+    Benchmark every algorithm with every line change cost and reverse setting over a sample of station
+    pairs.  Costs are compared with UniformCost, which is always optimal, so the gap shows how far other
+    algorithms are from the cheapest route.
+        Parameters:
+            sample_size       (int):             number of pairs to search, or 0 for every pair
+            seed              (int):             seed for the sample of pairs
+            algorithms        (list[Algorithm]): algorithms to benchmark, or None for all of them
+            line_change_costs (tuple[int]):      line change costs to benchmark
+            reverse_settings  (tuple[bool]):     reverse settings to benchmark
+
+        Returns:
+            (dict): description of the run and one result per algorithm and setting, ready for JSON
+    """
+    graph = get_graph()
+    pairs = sample_pairs(graph.station_names, sample_size, seed)
+    algorithms = list(Algorithm) if algorithms is None else algorithms
+
+    results = []
+    for line_change_cost in line_change_costs:
+        optimal_costs = dict()
+        for (start, goal) in pairs:
+            try:
+                _, cost, _ = variant_search(start, goal, Algorithm.UniformCost, False, line_change_cost)
+                optimal_costs[(start, goal)] = cost
+            except ValueError:
+                pass
+
+        for algorithm in algorithms:
+            for reverse in reverse_settings:
+                results.append(benchmark_setting(pairs, algorithm, line_change_cost, reverse, optimal_costs))
+
+    return {
+        'format_version': BENCHMARK_FORMAT_VERSION,
+        'graph_fingerprint': graph.fingerprint(),
+        'stations': graph.station_count,
+        'connections': len(graph.neighbours),
+        'pairs': len(pairs),
+        'sample_size': sample_size,
+        'seed': seed,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+        'peak_memory_kb': peak_memory_kb()
+    }
+
+
+def compare_benchmarks(baseline: dict, current: dict) -> list:
+    """
+    Compare two benchmark runs setting by setting.
+        Parameters:
+            baseline (dict): earlier run, as returned by run_benchmark
+            current  (dict): later run
+
+        Returns:
+            (list[dict]): for each setting in both runs, the ratio of median and p99 latencies (current over
+                baseline) and the change in failures, mean nodes explored and mean cost gap
+    """
+    def key(result: dict) -> tuple:
+        return result['algorithm'], result['line_change_cost'], result['reverse']
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    comparisons = []
+    for result in current['results']:
+        previous = baseline_results.get(key(result))
+        if previous is None:
+            continue
+
+        comparisons.append({
+            'algorithm': result['algorithm'],
+            'line_change_cost': result['line_change_cost'],
+            'reverse': result['reverse'],
+            'p50_ratio': ratio(result['latency_ms']['p50'], previous['latency_ms']['p50']),
+            'p99_ratio': ratio(result['latency_ms']['p99'], previous['latency_ms']['p99']),
+            'failures_change': result['failures'] - previous['failures'],
+            'explored_change': result['explored_nodes']['mean'] - previous['explored_nodes']['mean'],
+            'cost_gap_change': result['cost_gap']['mean'] - previous['cost_gap']['mean']
+        })
+
+    return comparisons
+
+
+def peak_memory_kb():
+    """
+    Peak resident memory of this process so far, in kilobytes, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and in kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def ratio(value: float, baseline: float) -> float:
+    """
+    Ratio of a value to a baseline, 1.0 when both are zero.
+    """
+    if baseline == 0:
+        return 1.0 if value == 0 else float('inf')
+
+    return value / baseline
+
+
+def write_benchmark(results: dict, path: str = None):
+    """
+    Write benchmark results as JSON to a file, or to standard output if no path is given.
+    """
+    if path is None:
+        print(json.dumps(results, indent=2))
+        return
+
+    with open(path, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
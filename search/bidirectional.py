@@ -0,0 +1,151 @@
+from heapq import heappush, heappop
+from typing import Callable
+from .graph import Graph, NO_LINE, change_cost
+
+
+def bidirectional_search(
+    graph: Graph,
+    start: int,
+    goal: int,
+    line_change_cost: int = 0,
+    potential: Callable = None
+) -> tuple:
+    """
+    Uniform cost search from both ends at once, meeting in the middle.  Every connection in the network
+    runs in both directions, and is closed or changes cost in both directions, so the backward search
+    expands the same edges as the forward one.
+
+    Forward states are (station, line arrived on) with the cost from the start; backward states are
+    (station, line departed on) with the cost to the goal.  Where the two searches meet at a station the
+    route cost is the sum of both costs plus the line change cost if the lines differ.  The search stops
+    once the smallest keys on the two frontiers add up to at least the best route found, which is then
+    optimal.
+
+    Without a potential the keys are the costs.  With one, the search is bidirectional A*: forward keys are
+    the cost plus the potential of the station and backward keys the cost minus it, so both searches run
+    on the same reduced costs and the stopping rule is unchanged.  The potential must be consistent in both
+    directions, as half the difference of lower bounds to the goal and from the start is (see
+    landmark_potential).
+
+        Parameters:
+            graph            (Graph):    compiled station graph
+            start            (int):      start station id for search
+            goal             (int):      goal station id for search
+            line_change_cost (int):      cost of changing from one line to another
+            potential        (Callable): potential of a station id, or None for uniform cost search
+
+        Returns:
+            (tuple[list[tuple[int, int]], int, int]): Path of station and line ids from the start to the goal,
+                the cost, in minutes, of the path and the total number of stations explored by either search
+    """
+    if start == goal:
+        # already at goal, nothing to do
+        return [], 0, 0
+
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    costs = graph.costs
+    lines = graph.lines
+    open_edges = graph.open_edges
+
+    if potential is None:
+        potential = lambda station: 0
+
+    # per direction: cost of each state, its parent state, states reached per station, the frontier of
+    # (key, cost, station, line) and the sign of the potential in its keys
+    forward = (
+        {(start, NO_LINE): 0},
+        {(start, NO_LINE): None},
+        {start: {NO_LINE: 0}},
+        [(potential(start), 0, start, NO_LINE)],
+        1
+    )
+    backward = (
+        {(goal, NO_LINE): 0},
+        {(goal, NO_LINE): None},
+        {goal: {NO_LINE: 0}},
+        [(-potential(goal), 0, goal, NO_LINE)],
+        -1
+    )
+    explored_stations = set()
+
+    best_cost = None
+    meeting = None
+    while forward[3] and backward[3]:
+        if best_cost is not None and forward[3][0][0] + backward[3][0][0] >= best_cost:
+            break
+
+        # expand the direction with the smaller frontier, so that a search starting in the dense centre
+        # of the network does not outgrow one starting at the end of a line
+        is_forward = len(forward[3]) <= len(backward[3])
+        labels, parents, station_labels, heap, sign = forward if is_forward else backward
+        _, _, other_station_labels, _, _ = backward if is_forward else forward
+
+        _, cost, station, line = heappop(heap)
+        if labels[(station, line)] < cost:
+            # already expanded at a lower cost
+            continue
+
+        explored_stations.add(station)
+        for edge in range(offsets[station], offsets[station + 1]):
+            if not open_edges[edge]:
+                continue
+
+            neighbour = neighbours[edge]
+            neighbour_line = lines[edge]
+            neighbour_cost = cost + costs[edge] + change_cost(line, neighbour_line, line_change_cost)
+
+            key = (neighbour, neighbour_line)
+            if key in labels and labels[key] <= neighbour_cost:
+                continue
+
+            labels[key] = neighbour_cost
+            parents[key] = (station, line)
+            station_labels.setdefault(neighbour, {})[neighbour_line] = neighbour_cost
+            heappush(heap, (neighbour_cost + sign * potential(neighbour), neighbour_cost, neighbour, neighbour_line))
+
+            # check for a better route through the other search's states at this station
+            for (other_line, other_cost) in other_station_labels.get(neighbour, {}).items():
+                route_cost = neighbour_cost + other_cost + change_cost(neighbour_line, other_line, line_change_cost)
+                if best_cost is None or route_cost < best_cost:
+                    best_cost = route_cost
+                    meeting = (key, (neighbour, other_line)) if is_forward else ((neighbour, other_line), key)
+
+    if meeting is None:
+        # no path from start to goal, raise an error
+        raise ValueError(
+            f'Unable to find path from start [{graph.station_names[start]}] to goal [{graph.station_names[goal]}]'
+        )
+
+    # walk back to the start from the meeting point, then on to the goal
+    forward_state, backward_state = meeting
+    path = []
+    state = forward_state
+    while state is not None:
+        path.append(state)
+        state = forward[1][state]
+    path.reverse()
+
+    state = backward_state
+    while backward[1][state] is not None:
+        next_state = backward[1][state]
+        path.append((next_state[0], state[1]))
+        state = next_state
+
+    return path, best_cost, len(explored_stations)
+
+
+def landmark_potential(to_goal: Callable, from_start: Callable) -> Callable:
+    """
+    Average potential for bidirectional A*: half the difference between a lower bound on the cost from a
+    station to the goal and one on the cost from the start to it.  Connections cost the same both ways, so
+    the landmark estimate to the start bounds the cost from it.  Line change costs are left out, since the
+    bounds must hold for a station whichever line it is reached on.
+        Parameters:
+            to_goal    (Callable): landmark estimate to the goal, for a station id and line id
+            from_start (Callable): landmark estimate to the start, for a station id and line id
+
+        Returns:
+            (Callable[[int], float]): potential of a station id
+    """
+    return lambda station: (to_goal(station, NO_LINE) - from_start(station, NO_LINE)) / 2
@@ -0,0 +1,66 @@
+from time import perf_counter
+
+
+class SearchBudgetExceeded(ValueError):
+    """
+    Raised by a search which runs out of time or expansions before it finds a route.
+    """
+
+
+class SearchBudget:
+    """
+    A class used to limit the time and the number of node expansions searches may use.  The clock starts
+    at the first expansion, and one budget may be shared by several searches, e.g. the passes of an anytime
+    search, which then stop together.  Searches record whether the budget ran out and whether the route they
+    return is known to be optimal.
+
+    Attributes:
+        time_limit : float
+            Seconds the searches may run for, or None for no limit
+        max_expansions : int
+            Nodes the searches may expand, or None for no limit
+        expansions : int
+            Nodes expanded so far
+        exhausted : bool
+            True once a search has run out of budget
+        optimal : bool
+            True if the route returned is known to be the cheapest
+
+    Methods:
+        spend():
+            Account for one node expansion
+        elapsed():
+            Seconds since the first expansion
+    """
+
+    def __init__(self, time_limit: float = None, max_expansions: int = None):
+        self.time_limit = time_limit
+        self.max_expansions = max_expansions
+        self.expansions = 0
+        self.exhausted = False
+        self.optimal = False
+        self.started = None
+        self.deadline = None
+
+    def spend(self):
+        """
+        Account for one node expansion, raising SearchBudgetExceeded if it goes over the budget.
+        """
+        if self.started is None:
+            self.started = perf_counter()
+            if self.time_limit is not None:
+                self.deadline = self.started + self.time_limit
+
+        self.expansions += 1
+        if (
+            self.max_expansions is not None and self.expansions > self.max_expansions
+            or self.deadline is not None and perf_counter() > self.deadline
+        ):
+            self.exhausted = True
+            raise SearchBudgetExceeded('Search budget exhausted before a route was found')
+
+    def elapsed(self) -> float:
+        """
+        Seconds since the first expansion.
+        """
+        return 0.0 if self.started is None else perf_counter() - self.started
@@ -0,0 +1,300 @@
+from collections import OrderedDict
+from weakref import WeakSet
+from .graph import Graph, add_update_listener, change_cost
+from .loader import get_graph
+from .tree import NO_STATE, ShortestPathTree, shortest_path_tree
+from .variants import Algorithm, route_search
+
+# default number of routes and shortest path trees kept by a cache
+DEFAULT_ROUTE_CAPACITY = 1024
+DEFAULT_TREE_CAPACITY = 64
+
+# algorithms which always return a cheapest route (AnytimeAStar does when it has no budget, as in the cache);
+# the others explore in an order which depends on which connections are open but not on their costs
+OPTIMAL_ALGORITHMS = (
+    Algorithm.UniformCost,
+    Algorithm.AStar,
+    Algorithm.ContractionHierarchy,
+    Algorithm.AnytimeAStar
+)
+
+# every cache created, so that all of them see changes to the graph
+_route_caches = WeakSet()
+
+
+class RouteCache:
+    """
+    A class used to cache search results, evicting the least recently used entries once full.
+
+    Routes are keyed by (start, goal, algorithm, reverse, line_change_cost), and kept with the connections
+    they travel along so that changes to the graph are matched to routes by edge id.  UniformCost routes are
+    walked from the shortest path tree from the start, which is also cached, keyed by (start,
+    line_change_cost), so a route to any other goal from the same start is a walk up the tree rather than a
+    search.  A tree does not depend on 'reverse', so it is always False in the keys of UniformCost routes.
+
+    Entries are only valid for the graph they were computed on: the cache is cleared whenever the
+    graph is reloaded.  When connections of the graph change, only the entries they can affect are removed.
+
+    Attributes:
+        capacity : int
+            Maximum number of routes kept
+        tree_capacity : int
+            Maximum number of shortest path trees kept
+        hits : int
+            Number of searches answered from a cached route
+        tree_hits : int
+            Number of searches answered by walking a cached tree
+        misses : int
+            Number of searches which were not cached
+        evictions : int
+            Number of routes and trees evicted to make space
+        invalidations : int
+            Number of routes and trees removed because the graph changed
+
+    Methods:
+        search(start, goal, algorithm, reverse, line_change_cost):
+            Search for a route, using cached results where possible
+        clear():
+            Remove all cached routes and trees
+        invalidate(changes):
+            Remove the routes and trees which changes to connections of the graph can affect
+        stats():
+            Counts of cache hits and misses and the number of entries
+    """
+
+    def __init__(self, capacity: int = DEFAULT_ROUTE_CAPACITY, tree_capacity: int = DEFAULT_TREE_CAPACITY):
+        self.capacity = capacity
+        self.tree_capacity = tree_capacity
+        self.routes = OrderedDict()
+        self.trees = OrderedDict()
+        self.graph = None
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        _route_caches.add(self)
+
+    def search(
+        self,
+        start: str,
+        goal: str,
+        algorithm: Algorithm,
+        reverse: bool = False,
+        line_change_cost: int = 0
+    ) -> tuple:
+        """
+        Search for a route as variant_search does, using cached results where possible.  UniformCost routes
+        are walked from a shortest path tree instead: each is a cheapest route, but where several routes cost
+        the same it may not be the one variant_search returns, and 'reverse', which only breaks such ties,
+        is ignored.
+            Parameters:
+                start            (str):       start station for search
+                goal             (str):       goal station for search
+                algorithm        (Algorithm): enum selection of the algorithm
+                reverse          (bool):      reverse order of nodes before adding to the queue
+                line_change_cost (int):       line change cost in minutes
+
+            Returns:
+                (tuple[list[str], int, int]): Path of station names from the start to the goal, the cost, in
+                    minutes, of the path and the number of nodes explored to find it.  For UniformCost this is
+                    not the count variant_search gives: it is the number of states the tree explored when it
+                    was built, and zero when the route is walked from a cached tree
+        """
+        graph = get_graph()
+        if graph is not self.graph:
+            # graph has been reloaded since the cache was filled
+            self.clear()
+            self.graph = graph
+
+        # UniformCost routes come from trees, which do not depend on 'reverse'
+        key = (start, goal, algorithm, reverse and algorithm != Algorithm.UniformCost, line_change_cost)
+        route = self.routes.get(key)
+        if route is not None:
+            self.routes.move_to_end(key)
+            self.hits += 1
+        elif algorithm == Algorithm.UniformCost:
+            route = self.search_tree(graph.station_id(start), graph.station_id(goal), line_change_cost)
+            self.store(self.routes, key, route, self.capacity)
+        else:
+            self.misses += 1
+            path, cost, explored_nodes = route_search(
+                graph,
+                graph.station_id(start),
+                graph.station_id(goal),
+                algorithm,
+                reverse,
+                line_change_cost
+            )
+            route = tuple(graph.path_names(path)), cost, explored_nodes, route_edges(graph, path)
+            self.store(self.routes, key, route, self.capacity)
+
+        path, cost, explored_nodes, _ = route
+        return list(path), cost, explored_nodes
+
+    def search_tree(self, start: int, goal: int, line_change_cost: int) -> tuple:
+        """
+        Walk the shortest path tree from a start station to a goal, building the tree if it is not cached.
+        """
+        tree_key = (start, line_change_cost)
+        tree = self.trees.get(tree_key)
+        if tree is not None:
+            self.trees.move_to_end(tree_key)
+            self.tree_hits += 1
+            explored_nodes = 0
+        else:
+            self.misses += 1
+            tree = shortest_path_tree(self.graph, start, line_change_cost)
+            self.store(self.trees, tree_key, tree, self.tree_capacity)
+            explored_nodes = tree.explored_nodes
+
+        path, cost = tree.path_to(goal)
+        return tuple(self.graph.path_names(path)), cost, explored_nodes, route_edges(self.graph, path)
+
+    def store(self, entries: OrderedDict, key, value, capacity: int):
+        """
+        Add an entry, evicting the least recently used entries beyond the capacity.
+        """
+        entries[key] = value
+        while len(entries) > capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all cached routes and trees.
+        """
+        self.routes.clear()
+        self.trees.clear()
+
+    def invalidate(self, changes: list):
+        """
+        Remove the routes and trees which changes to connections of the graph can affect:
+          - routes which use a connection whose cost changed or which closed
+          - every route of an algorithm which always finds a cheapest route, if a connection got cheaper
+            or opened, since any of them might now be beaten
+          - every route of the other algorithms if a connection closed or opened, since they may now
+            explore in a different order
+          - trees which arrive at a state over a connection which got dearer or closed, or in which a
+            connection which got cheaper or opened leads to a state for less than the tree's cost for it
+
+            Parameters:
+                changes (list[EdgeChange]): connections of the graph which changed
+        """
+        # connections routes may have used
+        used_edges = {change.edge for change in changes if change.was_open}
+        improved = any(change.improved for change in changes)
+        opened_or_closed = any(change.was_open != change.is_open for change in changes)
+
+        def route_affected(key, route) -> bool:
+            if improved and key[2] in OPTIMAL_ALGORITHMS or opened_or_closed and key[2] not in OPTIMAL_ALGORITHMS:
+                return True
+
+            return not used_edges.isdisjoint(route[3])
+
+        for key in [key for (key, route) in self.routes.items() if route_affected(key, route)]:
+            del self.routes[key]
+            self.invalidations += 1
+
+        for key in [key for (key, tree) in self.trees.items() if tree_affected(tree, changes)]:
+            del self.trees[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """
+        Counts of cache hits and misses and the number of entries.
+        """
+        lookups = self.hits + self.tree_hits + self.misses
+        return {
+            'hits': self.hits,
+            'tree_hits': self.tree_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.tree_hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'routes': len(self.routes),
+            'trees': len(self.trees)
+        }
+
+
+def route_edges(graph: Graph, path: list) -> frozenset:
+    """
+    Find the connections a route travels along.
+        Parameters:
+            graph (Graph):                   compiled station graph
+            path  (list[tuple[int, int]]):   station id and line id for each stop
+
+        Returns:
+            (frozenset[int]): positions of the connections in the edge arrays
+    """
+    edges = set()
+    for ((station, _), (neighbour, line)) in zip(path, path[1:]):
+        for edge in range(graph.offsets[station], graph.offsets[station + 1]):
+            if graph.neighbours[edge] == neighbour and graph.lines[edge] == line:
+                edges.add(edge)
+
+    return frozenset(edges)
+
+
+def tree_affected(tree: ShortestPathTree, changes: list) -> bool:
+    """
+    Check whether changes to connections can change the cheapest route to any state of a tree.
+        Parameters:
+            tree    (ShortestPathTree): tree of cheapest routes from one station
+            changes (list[EdgeChange]): connections of the graph which changed
+
+        Returns:
+            (bool): True if the tree arrives at a state over a connection which got dearer or closed, or a
+                connection which got cheaper or opened leads to a state for less than its cost in the tree
+    """
+    state_graph = tree.state_graph
+    labels = tree.labels
+    for change in changes:
+        target = state_graph.state_ids[(change.neighbour, change.line)]
+        sources = (change.station, *state_graph.line_states(change.station))
+        if change.worsened and labels[target] != NO_STATE and tree.parents[target] in sources:
+            return True
+
+        if change.improved:
+            for source in sources:
+                if labels[source] == NO_STATE:
+                    continue
+
+                cost = labels[source] + change.cost + change_cost(
+                    state_graph.state_lines[source],
+                    change.line,
+                    tree.line_change_cost
+                )
+                if labels[target] == NO_STATE or cost < labels[target]:
+                    return True
+
+    return False
+
+
+def invalidate_route_caches(graph: Graph, changes: list):
+    """
+    Remove the entries of every cache filled from a graph which changes to its connections can affect.
+    """
+    for cache in _route_caches:
+        if cache.graph is graph:
+            cache.invalidate(changes)
+
+
+add_update_listener(invalidate_route_caches)
+
+
+# cache shared by callers of cached_search
+route_cache = RouteCache()
+
+
+def cached_search(
+    start: str,
+    goal: str,
+    algorithm: Algorithm,
+    reverse: bool = False,
+    line_change_cost: int = 0
+) -> tuple:
+    """
+    Search for a route as variant_search does, using the shared route cache.
+    """
+    return route_cache.search(start, goal, algorithm, reverse, line_change_cost)
@@ -0,0 +1,162 @@
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from typing import Callable
+
+
+class FifoFrontier:
+    """
+    First-in first-out frontier for breadth-first search, backed by a deque.  Search is
+    single-threaded so no locking is needed, unlike queue.Queue.
+
+    Attributes:
+        reached : set
+            Keys of all nodes ever added to the frontier, for use by enqueue functions which
+            add each node at most once
+        estimate : Callable
+            Heuristic estimate of the remaining cost to the goal, for informed search
+
+    Methods:
+        put(node):
+            Add a node to the back of the frontier
+        extend(nodes):
+            Add several nodes, in order, to the back of the frontier
+        get():
+            Remove and return the node at the front of the frontier
+        empty():
+            Test whether the frontier has no more nodes
+    """
+
+    def __init__(self, estimate: Callable = None):
+        self.nodes = deque()
+        self.reached = set()
+        self.estimate = estimate
+
+    def put(self, node):
+        self.nodes.append(node)
+
+    def extend(self, nodes):
+        self.nodes.extend(nodes)
+
+    def get(self):
+        return self.nodes.popleft()
+
+    def empty(self) -> bool:
+        return not self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+class LifoFrontier:
+    """
+    Last-in first-out frontier for depth-first search, backed by a list.
+
+    Methods:
+        put(node):
+            Add a node to the top of the frontier
+        extend(nodes):
+            Add several nodes, in order, to the top of the frontier
+        get():
+            Remove and return the node at the top of the frontier
+        empty():
+            Test whether the frontier has no more nodes
+    """
+
+    def __init__(self):
+        self.nodes = []
+
+    def put(self, node):
+        self.nodes.append(node)
+
+    def extend(self, nodes):
+        self.nodes.extend(nodes)
+
+    def get(self):
+        return self.nodes.pop()
+
+    def empty(self) -> bool:
+        return not self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+class PriorityFrontier:
+    """
+    Priority frontier backed by a binary heap.  Entries are stored as (priority, counter, node)
+    tuples: the insertion counter breaks ties between equal priorities in first-in first-out
+    order, so nodes themselves are never compared.
+
+    Attributes:
+        reached : dict
+            Lowest cost each key has been added with, used for dominance pruning
+        estimate : Callable
+            Heuristic estimate of the remaining cost to the goal, for informed search
+
+    Methods:
+        put(priority, node):
+            Add a node with a given priority
+        reach(key, cost):
+            Test whether a node is not dominated by one with the same key and a lower or equal cost
+        get():
+            Remove and return the node with the lowest priority
+        empty():
+            Test whether the frontier has no more nodes
+    """
+
+    def __init__(self, estimate: Callable = None):
+        self.heap = []
+        self.counter = count()
+        self.reached = dict()
+        self.estimate = estimate
+
+    def put(self, priority, node):
+        heappush(self.heap, (priority, next(self.counter), node))
+
+    def reach(self, key, cost) -> bool:
+        """
+        Record that a node with a given key is about to be added, unless it is dominated: a node with the
+        same key has already been added with a lower or equal cost.
+            Parameters:
+                key  (Hashable): key identifying equivalent nodes
+                cost (int):      cost of reaching the node from the start
+
+            Returns:
+                (bool): True if the node should be added
+        """
+        best = self.reached.get(key)
+        if best is not None and best <= cost:
+            return False
+
+        self.reached[key] = cost
+        return True
+
+    def get(self):
+        return heappop(self.heap)[2]
+
+    def empty(self) -> bool:
+        return not self.heap
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class WeightedFrontier(PriorityFrontier):
+    """
+    Priority frontier for weighted A* search.  Nodes are ordered by cost plus the estimate times a weight of
+    at least one, which reaches the goal sooner at the price of a route costing up to 'weight' times the
+    cheapest.  Nodes which cannot lead to a route cheaper than 'bound', by the unweighted estimate, are not
+    added.
+
+    Attributes:
+        weight : float
+            Factor applied to the estimate in priorities
+        bound : int
+            Cost of the best route already known, or None
+    """
+
+    def __init__(self, estimate: Callable, weight: float = 1.0, bound: int = None):
+        super().__init__(estimate)
+        self.weight = weight
+        self.bound = bound
@@ -0,0 +1,391 @@
+import hashlib
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+# line id used for the start node of a search, which has not been reached along any line
+NO_LINE = -1
+
+# map each zone to an integer position; a station's zones are stored as a bitmask with
+# bit n set when the station is in the zone at position n
+ZONE_POSITIONS = {
+    '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6,
+    'a': 7, 'b': 8, 'c': 9, 'd': 10
+}
+
+
+def change_cost(first_line: int, second_line: int, line_change_cost: int) -> int:
+    """
+    Cost of continuing on 'second_line' after arriving on 'first_line'; there is no change at the
+    start or the end of a path.
+    """
+    if first_line != NO_LINE and second_line != NO_LINE and first_line != second_line:
+        return line_change_cost
+
+    return 0
+
+
+class EdgeChange(namedtuple(
+    'EdgeChange',
+    ['edge', 'station', 'neighbour', 'line', 'old_cost', 'cost', 'was_open', 'is_open']
+)):
+    """
+    A change to one connection of a graph: its cost, whether it is open, or both.
+    """
+    __slots__ = ()
+
+    @property
+    def worsened(self) -> bool:
+        """
+        True if routes using the connection have become dearer or impossible.
+        """
+        return self.was_open and (not self.is_open or self.cost > self.old_cost)
+
+    @property
+    def improved(self) -> bool:
+        """
+        True if routes using the connection have become cheaper or possible.
+        """
+        return self.is_open and (not self.was_open or self.cost < self.old_cost)
+
+
+# functions called with (graph, changes) after connections of a graph change, registered by modules
+# which hold data derived from graphs so that they can repair it
+_update_listeners = []
+
+
+def add_update_listener(listener):
+    """
+    Register a function to be called with (graph, list[EdgeChange]) whenever connections of a graph are
+    closed, reopened or change cost.
+    """
+    _update_listeners.append(listener)
+
+
+class Graph:
+    """
+    A class used to represent the station network in compiled form.  Station and line names are
+    interned as integers and adjacency is stored in CSR style arrays: the connections leaving
+    station i are found at positions offsets[i] to offsets[i + 1] of the neighbours, costs and
+    lines arrays.
+
+    Attributes:
+        station_names : list[str]
+            Name of each station, indexed by station id
+        station_ids : dict[str, int]
+            Map from station name to station id
+        line_names : list[str]
+            Name of each line, indexed by line id
+        line_ids : dict[str, int]
+            Map from line name to line id
+        offsets : array[int]
+            Start of each station's connections in the edge arrays, with one trailing entry; this and the
+            other edge arrays may instead be memoryviews of a mapped network file
+        neighbours : array[int]
+            Station id at the other end of each connection
+        costs : array[int]
+            Cost, in minutes, of each connection
+        lines : array[int]
+            Line id of each connection
+        zones : array[int]
+            Bitmask of the primary and secondary zones for each station
+        open_edges : bytearray
+            Non-zero for each connection which is open; a connection is closed if it has been closed
+            itself or either of its stations has been closed
+        closed_stations : set[int]
+            Ids of stations which have been closed
+        closed_edges : set[int]
+            Positions of connections which have been closed
+        update_count : int
+            Number of updates which changed connections since the graph was loaded
+
+    Methods:
+        from_rows(rows):
+            Compile a graph from rows of station data
+        station_id(name):
+            Resolve a station name to its id
+        path_names(path):
+            Convert a path of (station id, line id) pairs to display strings
+        connection_edges(start, end, line):
+            Find the connections, in both directions, between two stations
+        close_station(station), reopen_station(station):
+            Close or reopen every connection to and from a station
+        close_edges(edges), reopen_edges(edges):
+            Close or reopen connections
+        set_edge_costs(edges, costs):
+            Change the cost of connections
+        fingerprint():
+            Digest of the graph's contents, to match derived data to the graph it was built from
+    """
+
+    def __init__(
+        self,
+        station_names: list,
+        line_names: list,
+        offsets: array,
+        neighbours: array,
+        costs: array,
+        lines: array,
+        zones: array
+    ):
+        self.station_names = station_names
+        self.station_ids = {name: index for index, name in enumerate(station_names)}
+        self.line_names = line_names
+        self.line_ids = {name: index for index, name in enumerate(line_names)}
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.costs = costs
+        self.lines = lines
+        self.zones = zones
+        self.open_edges = bytearray(b'\x01') * len(neighbours)
+        self.closed_stations = set()
+        self.closed_edges = set()
+        self.update_count = 0
+
+    @staticmethod
+    def from_rows(rows) -> 'Graph':
+        """
+        Compile a graph from rows of station data.  Each connection is added in both directions, in the
+        order the rows are given.
+            Parameters:
+                rows (Iterable[tuple[str, str, str, int, str, str]]): start station, end station, line,
+                    cost in minutes, main zone and secondary zone ("0" if there is no secondary zone)
+
+            Returns:
+                (Graph): compiled graph
+        """
+        station_ids = {}
+        line_ids = {}
+        adjacency = []
+        zone_masks = []
+
+        def intern_station(name: str) -> int:
+            if name not in station_ids:
+                station_ids[name] = len(station_ids)
+                adjacency.append([])
+                zone_masks.append(0)
+            return station_ids[name]
+
+        for (start_station, end_station, line, cost, zone1, zone2) in rows:
+            start = intern_station(start_station)
+            end = intern_station(end_station)
+            if line not in line_ids:
+                line_ids[line] = len(line_ids)
+            line_id = line_ids[line]
+
+            # add both directions of the tube "step"
+            adjacency[start].append((end, int(cost), line_id))
+            adjacency[end].append((start, int(cost), line_id))
+
+            # we add the main zone
+            zone_masks[start] |= 1 << ZONE_POSITIONS[zone1]
+            if zone2 != '0':
+                # the secondary zone is also the main zone for the ending station
+                zone_masks[start] |= 1 << ZONE_POSITIONS[zone2]
+                zone_masks[end] |= 1 << ZONE_POSITIONS[zone2]
+            else:
+                # otherwise the main zone for the ending station is the same as for the starting station
+                zone_masks[end] |= 1 << ZONE_POSITIONS[zone1]
+
+        offsets = array('i', [0])
+        neighbours = array('i')
+        costs = array('i')
+        lines = array('i')
+        for connections in adjacency:
+            for (neighbour, cost, line_id) in connections:
+                neighbours.append(neighbour)
+                costs.append(cost)
+                lines.append(line_id)
+            offsets.append(len(neighbours))
+
+        return Graph(
+            list(station_ids),
+            list(line_ids),
+            offsets,
+            neighbours,
+            costs,
+            lines,
+            array('i', zone_masks)
+        )
+
+    def __getstate__(self) -> dict:
+        """
+        Copy edge arrays mapped from a network file when pickling, e.g. to send the graph to a worker process.
+        """
+        state = dict(self.__dict__)
+        for name in ('offsets', 'neighbours', 'costs', 'lines', 'zones'):
+            if isinstance(state[name], memoryview):
+                state[name] = array('i', state[name])
+
+        return state
+
+    @property
+    def station_count(self) -> int:
+        return len(self.station_names)
+
+    def station_id(self, name: str) -> int:
+        """
+        Resolve a station name to its id.  Only exact names are accepted; names as people type them are
+        resolved by StationIndex.resolve where they are read.
+            Parameters:
+                name (str): station name
+
+            Returns:
+                (int): station id
+        """
+        station = self.station_ids.get(name)
+        if station is None:
+            raise ValueError(f'Invalid station {name} not found in station data')
+
+        return station
+
+    def line_name(self, line: int):
+        """
+        Resolve a line id to its name, or None for the start of a path.
+        """
+        return None if line == NO_LINE else self.line_names[line]
+
+    def path_names(self, path: list) -> list:
+        """
+        Convert a path of ids to display strings.
+            Parameters:
+                path (list[tuple[int, int]]): station id and line id for each stop
+
+            Returns:
+                (list[str]): station name and line name for each stop
+        """
+        return [f'{self.station_names[station]} ({self.line_name(line)})' for (station, line) in path]
+
+    def edge_station(self, edge: int) -> int:
+        """
+        Station id a connection leaves from.
+        """
+        return bisect_right(self.offsets, edge) - 1
+
+    def connection_edges(self, start: int, end: int, line: int = None) -> list:
+        """
+        Find the connections between two stations, in both directions.
+            Parameters:
+                start (int): station id at one end
+                end   (int): station id at the other end
+                line  (int): line id of the connections, or None for connections on any line
+
+            Returns:
+                (list[int]): positions of the connections in the edge arrays
+        """
+        edges = []
+        for (station, neighbour) in ((start, end), (end, start)):
+            for edge in range(self.offsets[station], self.offsets[station + 1]):
+                if self.neighbours[edge] == neighbour and (line is None or self.lines[edge] == line):
+                    edges.append(edge)
+
+        if not edges:
+            raise ValueError(
+                f'No connection between {self.station_names[start]} and {self.station_names[end]}'
+                + ('' if line is None else f' on line {self.line_names[line]}')
+            )
+
+        return edges
+
+    def close_station(self, station: int) -> list:
+        """
+        Close every connection to and from a station.
+        """
+        self.closed_stations.add(station)
+        return self.update_edges(self.station_edges(station))
+
+    def reopen_station(self, station: int) -> list:
+        """
+        Reopen the connections to and from a station, except those which are closed themselves or lead
+        to another closed station.
+        """
+        self.closed_stations.discard(station)
+        return self.update_edges(self.station_edges(station))
+
+    def close_edges(self, edges: list) -> list:
+        """
+        Close connections.
+        """
+        self.closed_edges.update(edges)
+        return self.update_edges(edges)
+
+    def reopen_edges(self, edges: list) -> list:
+        """
+        Reopen connections, except those to or from a closed station.
+        """
+        self.closed_edges.difference_update(edges)
+        return self.update_edges(edges)
+
+    def set_edge_costs(self, edges: list, costs: list) -> list:
+        """
+        Change the cost of connections, whether they are open or closed.
+        """
+        return self.update_edges(edges, costs)
+
+    def station_edges(self, station: int) -> list:
+        """
+        Positions of every connection to and from a station.
+        """
+        edges = list(range(self.offsets[station], self.offsets[station + 1]))
+        for edge in range(self.offsets[station], self.offsets[station + 1]):
+            neighbour = self.neighbours[edge]
+            edges.extend(
+                reverse_edge
+                for reverse_edge in range(self.offsets[neighbour], self.offsets[neighbour + 1])
+                if self.neighbours[reverse_edge] == station
+            )
+
+        return sorted(set(edges))
+
+    def update_edges(self, edges: list, costs: list = None) -> list:
+        """
+        Bring connections up to date with the closed stations and connections and, optionally, set new costs,
+        then pass the connections which changed to every update listener.
+            Parameters:
+                edges (list[int]): positions of connections in the edge arrays
+                costs (list[int]): new cost of each connection, or None to keep the current costs
+
+            Returns:
+                (list[EdgeChange]): connections which changed
+        """
+        changes = []
+        for (index, edge) in enumerate(edges):
+            station = self.edge_station(edge)
+            neighbour = self.neighbours[edge]
+            old_cost = self.costs[edge]
+            cost = old_cost if costs is None else costs[index]
+            was_open = bool(self.open_edges[edge])
+            is_open = (
+                edge not in self.closed_edges
+                and station not in self.closed_stations
+                and neighbour not in self.closed_stations
+            )
+            if cost == old_cost and is_open == was_open:
+                continue
+
+            self.costs[edge] = cost
+            self.open_edges[edge] = is_open
+            changes.append(EdgeChange(edge, station, neighbour, self.lines[edge], old_cost, cost, was_open, is_open))
+
+        if changes:
+            self.update_count += 1
+            for listener in _update_listeners:
+                listener(self, changes)
+
+        return changes
+
+    def fingerprint(self) -> str:
+        """
+        Digest of the graph's contents, to match derived data stored on disk to the graph it was built from.
+            Returns:
+                (str): hex sha256 digest of the station and line names and the edge arrays
+        """
+        digest = hashlib.sha256()
+        digest.update('\n'.join(self.station_names).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update('\n'.join(self.line_names).encode('utf-8'))
+        for values in (self.offsets, self.neighbours, self.costs, self.lines, self.zones):
+            digest.update(values.tobytes())
+        digest.update(bytes(self.open_edges))
+
+        return digest.hexdigest()
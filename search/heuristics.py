@@ -0,0 +1,308 @@
+from array import array
+from heapq import heappush, heappop
+from typing import Callable
+from weakref import WeakKeyDictionary
+from .graph import Graph, NO_LINE, add_update_listener
+
+# number of landmarks used for lower bounds; more landmarks give tighter bounds at the
+# cost of memory and time per estimate
+DEFAULT_LANDMARK_COUNT = 8
+
+# distance to stations which cannot be reached from a landmark
+UNREACHABLE = -1
+
+# minutes added per zone between two stations by the zone heuristic
+MINUTES_PER_ZONE = 10
+
+# landmark and zone heuristics already built, per graph
+_landmark_heuristics = WeakKeyDictionary()
+_zone_heuristics = WeakKeyDictionary()
+
+
+def station_distances(graph: Graph, source: int) -> array:
+    """
+    Calculate the cost in minutes of the shortest path from a station to every other station, ignoring
+    line changes and closed connections.
+        Parameters:
+            graph  (Graph): compiled station graph
+            source (int):   id of the station to measure from
+
+        Returns:
+            (array[int]): distance to each station, or UNREACHABLE
+    """
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    costs = graph.costs
+
+    distances = array('i', [UNREACHABLE]) * graph.station_count
+    distances[source] = 0
+    heap = [(0, source)]
+    while heap:
+        distance, station = heappop(heap)
+        if distance > distances[station]:
+            continue
+
+        for edge in range(offsets[station], offsets[station + 1]):
+            neighbour = neighbours[edge]
+            neighbour_distance = distance + costs[edge]
+            if distances[neighbour] == UNREACHABLE or neighbour_distance < distances[neighbour]:
+                distances[neighbour] = neighbour_distance
+                heappush(heap, (neighbour_distance, neighbour))
+
+    return distances
+
+
+class LandmarkHeuristic:
+    """
+    A class used to calculate admissible lower bounds on the cost between two stations from the
+    triangle inequality over a handful of landmark stations (ALT).  The network is symmetric so, for
+    every landmark l, |d(l, goal) - d(l, station)| never exceeds d(station, goal).
+
+    The bounds hold for distances measured on any copy of the network whose connections cost no more than
+    the real ones.  Closing a connection or raising its cost therefore leaves the landmark distances valid,
+    if a little looser; only a cost below the one they were measured with has to be repaired, and then only
+    the distances which fall.
+
+    Attributes:
+        landmarks : list[int]
+            Station ids of the landmarks
+        distances : list[array[int]]
+            Distance from each landmark to every station
+        station_lines : list[int]
+            Bitmask of the lines serving each station
+        edge_costs : array[int]
+            Cost of each connection the distances were measured with, never more than its current cost
+
+    Methods:
+        build(graph, landmark_count):
+            Select landmarks and calculate their distances
+        estimate_to(goal, line_change_cost):
+            Create an estimate of the remaining cost to a goal station
+        lower_costs(graph, changes):
+            Repair the landmark distances after connections become cheaper
+    """
+
+    def __init__(self, landmarks: list, distances: list, station_lines: list, edge_costs: array):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.station_lines = station_lines
+        self.edge_costs = edge_costs
+
+    @staticmethod
+    def build(graph: Graph, landmark_count: int = DEFAULT_LANDMARK_COUNT) -> 'LandmarkHeuristic':
+        """
+        Select landmarks by farthest-point selection, so that they lie around the edge of the network, and
+        calculate their distances to every station.
+            Parameters:
+                graph          (Graph): compiled station graph
+                landmark_count (int):   number of landmarks to select
+
+            Returns:
+                (LandmarkHeuristic): landmarks and their distances
+        """
+        station_count = graph.station_count
+        landmarks = []
+        distances = []
+        if station_count > 0:
+            # the station farthest from an arbitrary station is the first landmark, after that
+            # take the station with the greatest distance to its nearest landmark
+            nearest = station_distances(graph, 0)
+            for _ in range(min(landmark_count, station_count)):
+                landmark = max(range(station_count), key=lambda station: nearest[station])
+                if landmark in landmarks:
+                    break
+
+                landmark_distances = station_distances(graph, landmark)
+                landmarks.append(landmark)
+                distances.append(landmark_distances)
+                for station in range(station_count):
+                    if landmark_distances[station] != UNREACHABLE and (
+                        len(landmarks) == 1 or landmark_distances[station] < nearest[station]
+                    ):
+                        nearest[station] = landmark_distances[station]
+
+        station_lines = []
+        for station in range(station_count):
+            lines = 0
+            for edge in range(graph.offsets[station], graph.offsets[station + 1]):
+                lines |= 1 << graph.lines[edge]
+            station_lines.append(lines)
+
+        return LandmarkHeuristic(landmarks, distances, station_lines, array('i', graph.costs))
+
+    def estimate_to(self, goal: int, line_change_cost: int = 0) -> Callable:
+        """
+        Create an estimate of the remaining cost from any (station, line) to a goal station.  The estimate
+        is the landmark lower bound plus the line change cost when the current line does not serve the
+        goal, since at least one more change is then needed.  It never overestimates and is consistent,
+        so A* returns optimal routes.
+            Parameters:
+                goal             (int): id of the goal station
+                line_change_cost (int): cost of changing from one line to another
+
+            Returns:
+                (Callable[[int, int], int]): estimate for a station id and the id of the line it was reached on
+        """
+        landmark_distances = [
+            (distances, distances[goal]) for distances in self.distances if distances[goal] != UNREACHABLE
+        ]
+        goal_lines = self.station_lines[goal]
+        station_bounds = dict()
+
+        def estimate(station: int, line: int) -> int:
+            bound = station_bounds.get(station)
+            if bound is None:
+                bound = 0
+                for (distances, goal_distance) in landmark_distances:
+                    distance = distances[station]
+                    if distance != UNREACHABLE and abs(goal_distance - distance) > bound:
+                        bound = abs(goal_distance - distance)
+                station_bounds[station] = bound
+
+            if line != NO_LINE and not (goal_lines >> line) & 1:
+                return bound + line_change_cost
+
+            return bound
+
+        return estimate
+
+    def lower_costs(self, graph: Graph, changes: list):
+        """
+        Repair the landmark distances after connections change.  Connections which became cheaper than the
+        cost the distances were measured with are lowered, and each landmark's distances are corrected by a
+        search from the stations whose distance falls, which stops where distances no longer change.
+            Parameters:
+                graph   (Graph):             compiled station graph the heuristic was built from
+                changes (list[EdgeChange]):  connections which changed
+        """
+        lowered = [change for change in changes if change.cost < self.edge_costs[change.edge]]
+        if not lowered:
+            return
+
+        for change in lowered:
+            self.edge_costs[change.edge] = change.cost
+
+        offsets = graph.offsets
+        neighbours = graph.neighbours
+        edge_costs = self.edge_costs
+        for distances in self.distances:
+            heap = []
+            for change in lowered:
+                distance = distances[change.station]
+                if distance == UNREACHABLE:
+                    continue
+
+                neighbour_distance = distance + change.cost
+                if distances[change.neighbour] == UNREACHABLE or neighbour_distance < distances[change.neighbour]:
+                    distances[change.neighbour] = neighbour_distance
+                    heappush(heap, (neighbour_distance, change.neighbour))
+
+            while heap:
+                distance, station = heappop(heap)
+                if distance > distances[station]:
+                    continue
+
+                for edge in range(offsets[station], offsets[station + 1]):
+                    neighbour = neighbours[edge]
+                    neighbour_distance = distance + edge_costs[edge]
+                    if distances[neighbour] == UNREACHABLE or neighbour_distance < distances[neighbour]:
+                        distances[neighbour] = neighbour_distance
+                        heappush(heap, (neighbour_distance, neighbour))
+
+
+def repair_landmark_heuristic(graph: Graph, changes: list):
+    """
+    Repair the landmark heuristic of a graph, if built, after its connections change.
+    """
+    heuristic = _landmark_heuristics.get(graph)
+    if heuristic is not None:
+        heuristic.lower_costs(graph, changes)
+
+
+add_update_listener(repair_landmark_heuristic)
+
+
+class ZoneHeuristic:
+    """
+    A class used to estimate the cost between stations from the number of zones between them, as
+    best-first search does: 10 minutes per zone between the nearest zones of the two stations.  Each
+    station's zones are converted to the lowest and highest zone once per graph, and the estimates from
+    every station to a goal are then calculated in one vectorised pass per query, so that looking one up is
+    a single index into an array.
+
+    Attributes:
+        min_zones : numpy.ndarray
+            Lowest zone position of each station
+        max_zones : numpy.ndarray
+            Highest zone position of each station
+
+    Methods:
+        build(graph):
+            Convert the zone bitmask of each station to its lowest and highest zone
+        station_estimates(goal):
+            Calculate the estimate from every station to a goal station
+    """
+
+    def __init__(self, min_zones, max_zones):
+        self.min_zones = min_zones
+        self.max_zones = max_zones
+
+    @staticmethod
+    def build(graph: Graph) -> 'ZoneHeuristic':
+        """
+        Convert the zone bitmask of each station to its lowest and highest zone.  Each zone is stored as the
+        bit at its integer position (see ZONE_POSITIONS), so these are the lowest and highest set bits.
+            Parameters:
+                graph (Graph): compiled station graph
+
+            Returns:
+                (ZoneHeuristic): zone bounds of each station
+        """
+        # imported here so that searches which do not use zones do not pay for importing numpy
+        import numpy as np
+
+        return ZoneHeuristic(
+            np.array([(zones & -zones).bit_length() for zones in graph.zones], dtype=np.int32),
+            np.array([zones.bit_length() for zones in graph.zones], dtype=np.int32)
+        )
+
+    def station_estimates(self, goal: int) -> memoryview:
+        """
+        Calculate the estimate from every station to a goal station: 10 minutes per zone between the
+        highest zone of one station and the lowest zone of the other, whichever is fewer.
+            Parameters:
+                goal (int): id of the goal station
+
+            Returns:
+                (memoryview): estimate in minutes from each station, indexed by station id to give an int
+        """
+        import numpy as np
+
+        estimates = np.abs(self.min_zones[goal] - self.max_zones)
+        np.minimum(estimates, np.abs(self.min_zones - self.max_zones[goal]), out=estimates)
+        estimates *= MINUTES_PER_ZONE
+        return memoryview(estimates)
+
+
+def get_zone_heuristic(graph: Graph) -> ZoneHeuristic:
+    """
+    Fetch the zone heuristic for a graph, building it on first use.
+    """
+    heuristic = _zone_heuristics.get(graph)
+    if heuristic is None:
+        heuristic = ZoneHeuristic.build(graph)
+        _zone_heuristics[graph] = heuristic
+
+    return heuristic
+
+
+def get_landmark_heuristic(graph: Graph) -> LandmarkHeuristic:
+    """
+    Fetch the landmark heuristic for a graph, building it on first use.
+    """
+    heuristic = _landmark_heuristics.get(graph)
+    if heuristic is None:
+        heuristic = LandmarkHeuristic.build(graph)
+        _landmark_heuristics[graph] = heuristic
+
+    return heuristic
@@ -0,0 +1,534 @@
+import os
+import struct
+from array import array
+from heapq import heappush, heappop
+from weakref import WeakKeyDictionary
+from .graph import Graph, add_update_listener
+from .loader import DEFAULT_DATA_PATH, array_to_bytes, array_from_bytes
+from .state_graph import StateGraph, get_state_graph
+
+# hierarchies are stored in a directory next to the data file, in a subdirectory per graph fingerprint
+# so that hierarchies built from older data are never used
+DEFAULT_HIERARCHY_DIRECTORY = os.path.splitext(DEFAULT_DATA_PATH)[0] + '.hierarchies'
+
+# hierarchy files start with a magic string and a version number; the version must be
+# incremented whenever the layout below changes so that old files are rebuilt
+HIERARCHY_MAGIC = b'TUBEHIER'
+HIERARCHY_VERSION = 1
+
+# magic, version, line change cost, graph sha256, state count, upward edge count, downward edge count
+HIERARCHY_HEADER = struct.Struct('<8sIq32sIII')
+
+# middle state of an edge which is not a shortcut
+NO_MIDDLE = -1
+
+# number of states a witness search may settle before giving up; a witness search which gives up
+# only adds a shortcut which was not needed, so this trades preprocessing time for query time
+WITNESS_SETTLE_LIMIT = 200
+
+# hierarchies already loaded or built, per graph and line change cost
+_hierarchies = WeakKeyDictionary()
+
+
+class ContractionHierarchy:
+    """
+    A class used to represent a contraction hierarchy over the (station, line) states of a StateGraph.
+    States are contracted one at a time, least important first; contracting a state removes it and adds
+    shortcut edges between its neighbours wherever the only cheapest route between them ran through it.
+    Each state's rank is its position in that order.
+
+    A query searches upward from the start, over edges to higher ranked states, and upward from the goal
+    over reversed edges.  Every cheapest route has a highest ranked state, where the two searches meet,
+    so only a small part of the network is explored.
+
+    Edges are stored in CSR style arrays.  Upward edges leave each state for higher ranked states;
+    downward edges arrive at each state from higher ranked states, and are searched backward from the
+    goal.  Shortcuts record the state they bypass, so that routes can be expanded to the original edges.
+
+    Attributes:
+        state_graph : StateGraph
+            Line-expanded graph the hierarchy was built on
+        ranks : array[int]
+            Contraction order of each state
+        up_offsets, up_targets, up_costs, up_middles : array[int]
+            Upward edges from each state, their cost and the state a shortcut bypasses, or NO_MIDDLE
+        down_offsets, down_sources, down_costs, down_middles : array[int]
+            Downward edges into each state, their cost and the state a shortcut bypasses, or NO_MIDDLE
+
+    Methods:
+        build(state_graph):
+            Contract every state of a state graph
+        route(start, goal):
+            Find the cheapest route between two stations
+    """
+
+    def __init__(
+        self,
+        state_graph: StateGraph,
+        ranks: array,
+        up_offsets: array,
+        up_targets: array,
+        up_costs: array,
+        up_middles: array,
+        down_offsets: array,
+        down_sources: array,
+        down_costs: array,
+        down_middles: array
+    ):
+        self.state_graph = state_graph
+        self.ranks = ranks
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_costs = up_costs
+        self.up_middles = up_middles
+        self.down_offsets = down_offsets
+        self.down_sources = down_sources
+        self.down_costs = down_costs
+        self.down_middles = down_middles
+
+        # middle state of each shortcut, to expand routes
+        self.middles = dict()
+        for state in range(len(ranks)):
+            for edge in range(up_offsets[state], up_offsets[state + 1]):
+                if up_middles[edge] != NO_MIDDLE:
+                    self.middles[(state, up_targets[edge])] = up_middles[edge]
+            for edge in range(down_offsets[state], down_offsets[state + 1]):
+                if down_middles[edge] != NO_MIDDLE:
+                    self.middles[(down_sources[edge], state)] = down_middles[edge]
+
+    @staticmethod
+    def build(state_graph: StateGraph) -> 'ContractionHierarchy':
+        """
+        Contract every state of a state graph.  States are ordered by edge difference (shortcuts added less
+        edges removed) plus the number of neighbours already contracted, which spreads contraction evenly
+        over the network.  Priorities are updated lazily: a state is only contracted if its priority, when
+        recalculated, is still the lowest.
+            Parameters:
+                state_graph (StateGraph): line-expanded station graph
+
+            Returns:
+                (ContractionHierarchy): hierarchy over the states of the graph
+        """
+        state_count = state_graph.state_count
+
+        # remaining graph, with the cheapest edge between each pair of states
+        out_edges = [dict() for _ in range(state_count)]
+        in_edges = [dict() for _ in range(state_count)]
+        for state in range(state_count):
+            for edge in range(state_graph.offsets[state], state_graph.offsets[state + 1]):
+                if not state_graph.open_edges[edge]:
+                    continue
+
+                target = state_graph.targets[edge]
+                cost = state_graph.costs[edge]
+                if target != state and cost < out_edges[state].get(target, cost + 1):
+                    out_edges[state][target] = cost
+                    in_edges[target][state] = cost
+
+        middles = dict()
+        contracted_neighbours = [0] * state_count
+
+        def find_shortcuts(state: int) -> list:
+            shortcuts = []
+            for (source, in_cost) in in_edges[state].items():
+                route_costs = {
+                    target: in_cost + out_cost for (target, out_cost) in out_edges[state].items() if target != source
+                }
+                if not route_costs:
+                    continue
+
+                witness_costs = witness_search(out_edges, source, state, route_costs, max(route_costs.values()))
+                for (target, route_cost) in route_costs.items():
+                    if witness_costs.get(target, route_cost + 1) > route_cost:
+                        shortcuts.append((source, target, route_cost))
+
+            return shortcuts
+
+        def priority(state: int, shortcuts: list) -> int:
+            return (
+                len(shortcuts) - len(in_edges[state]) - len(out_edges[state]) + contracted_neighbours[state]
+            )
+
+        heap = []
+        for state in range(state_count):
+            heappush(heap, (priority(state, find_shortcuts(state)), state))
+
+        ranks = array('i', [0]) * state_count
+        up_edges = [None] * state_count
+        down_edges = [None] * state_count
+        rank = 0
+        while heap:
+            _, state = heappop(heap)
+            shortcuts = find_shortcuts(state)
+            state_priority = priority(state, shortcuts)
+            if heap and state_priority > heap[0][0]:
+                heappush(heap, (state_priority, state))
+                continue
+
+            ranks[state] = rank
+            rank += 1
+
+            for (source, target, cost) in shortcuts:
+                if cost < out_edges[source].get(target, cost + 1):
+                    out_edges[source][target] = cost
+                    in_edges[target][source] = cost
+                    middles[(source, target)] = state
+
+            # every remaining neighbour is contracted later, so has a higher rank
+            up_edges[state] = out_edges[state]
+            down_edges[state] = in_edges[state]
+            for source in in_edges[state]:
+                del out_edges[source][state]
+                contracted_neighbours[source] += 1
+            for target in out_edges[state]:
+                del in_edges[target][state]
+                contracted_neighbours[target] += 1
+            out_edges[state] = dict()
+            in_edges[state] = dict()
+
+        up_offsets = array('i', [0])
+        up_targets = array('i')
+        up_costs = array('i')
+        up_middles = array('i')
+        down_offsets = array('i', [0])
+        down_sources = array('i')
+        down_costs = array('i')
+        down_middles = array('i')
+        for state in range(state_count):
+            for (target, cost) in up_edges[state].items():
+                up_targets.append(target)
+                up_costs.append(cost)
+                up_middles.append(middles.get((state, target), NO_MIDDLE))
+            up_offsets.append(len(up_targets))
+
+            for (source, cost) in down_edges[state].items():
+                down_sources.append(source)
+                down_costs.append(cost)
+                down_middles.append(middles.get((source, state), NO_MIDDLE))
+            down_offsets.append(len(down_sources))
+
+        return ContractionHierarchy(
+            state_graph,
+            ranks,
+            up_offsets,
+            up_targets,
+            up_costs,
+            up_middles,
+            down_offsets,
+            down_sources,
+            down_costs,
+            down_middles
+        )
+
+    def route(self, start: int, goal: int) -> tuple:
+        """
+        Find the cheapest route between two stations, searching upward from the start state of the start
+        station and upward over reversed edges from every line state of the goal station.  Each search stops
+        once the lowest cost on its frontier is at least the cheapest route found.
+            Parameters:
+                start (int): start station id
+                goal  (int): goal station id
+
+            Returns:
+                (tuple[list[tuple[int, int]], int, int] | None): Path of station and line ids from the start to
+                    the goal, the cost, in minutes, of the path and the number of stations explored by either
+                    search, or None if the goal cannot be reached
+        """
+        if start == goal:
+            return [], 0, 0
+
+        state_stations = self.state_graph.state_stations
+
+        # per direction: cost of each state, its parent state, the frontier, the edges to search and the
+        # edges in the opposite direction, used to stall states
+        forward = (
+            {start: 0},
+            {start: None},
+            [(0, start)],
+            (self.up_offsets, self.up_targets, self.up_costs),
+            (self.down_offsets, self.down_sources, self.down_costs)
+        )
+        goal_states = self.state_graph.line_states(goal)
+        backward = (
+            {state: 0 for state in goal_states},
+            {state: None for state in goal_states},
+            [(0, state) for state in goal_states],
+            (self.down_offsets, self.down_sources, self.down_costs),
+            (self.up_offsets, self.up_targets, self.up_costs)
+        )
+        explored_stations = set()
+
+        best_cost = None
+        meeting = None
+        is_forward = False
+        while forward[2] or backward[2]:
+            # alternate between directions while both have states cheaper than the best route
+            is_forward = not is_forward
+            labels, parents, heap, (offsets, targets, costs), (stall_offsets, stall_targets, stall_costs) = (
+                forward if is_forward else backward
+            )
+            other_labels = backward[0] if is_forward else forward[0]
+            if not heap or (best_cost is not None and heap[0][0] >= best_cost):
+                heap.clear()
+                continue
+
+            cost, state = heappop(heap)
+            if labels[state] < cost:
+                # already explored at a lower cost
+                continue
+
+            explored_stations.add(state_stations[state])
+            if state in other_labels and (best_cost is None or cost + other_labels[state] < best_cost):
+                best_cost = cost + other_labels[state]
+                meeting = state
+
+            # stall on demand: a state reached more cheaply from a higher ranked state, by an edge this search
+            # does not use, cannot be on a cheapest route through the top of the hierarchy, so is not expanded
+            stalled = False
+            for edge in range(stall_offsets[state], stall_offsets[state + 1]):
+                higher_cost = labels.get(stall_targets[edge])
+                if higher_cost is not None and higher_cost + stall_costs[edge] < cost:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+
+            for edge in range(offsets[state], offsets[state + 1]):
+                target = targets[edge]
+                target_cost = cost + costs[edge]
+                if target in labels and labels[target] <= target_cost:
+                    continue
+
+                labels[target] = target_cost
+                parents[target] = state
+                heappush(heap, (target_cost, target))
+
+        if meeting is None:
+            return None
+
+        # hierarchy states from the start up to the meeting state and back down to the goal
+        states = []
+        state = meeting
+        while state is not None:
+            states.append(state)
+            state = forward[1][state]
+        states.reverse()
+        state = backward[1][meeting]
+        while state is not None:
+            states.append(state)
+            state = backward[1][state]
+
+        return self.state_graph.path(self.expand(states)), best_cost, len(explored_stations)
+
+    def expand(self, states: list) -> list:
+        """
+        Replace every shortcut between consecutive states with the states it bypasses.
+        """
+        expanded = [states[0]]
+        for (source, target) in zip(states, states[1:]):
+            # expand the edge depth first, leftmost part first, with an explicit stack
+            stack = [(source, target)]
+            while stack:
+                (edge_source, edge_target) = stack.pop()
+                middle = self.middles.get((edge_source, edge_target))
+                if middle is None:
+                    expanded.append(edge_target)
+                else:
+                    stack.append((middle, edge_target))
+                    stack.append((edge_source, middle))
+
+        return expanded
+
+
+def witness_search(out_edges: list, source: int, excluded: int, route_costs: dict, limit: int) -> dict:
+    """
+    Search from a state for routes which avoid a state being contracted and cost no more than the routes
+    through it.  The search stops once every target has such a route, costs exceed 'limit' or
+    WITNESS_SETTLE_LIMIT states have been settled.
+        Parameters:
+            out_edges   (list[dict[int, int]]): remaining edges from each state and their costs
+            source      (int):                  state to search from
+            excluded    (int):                  state being contracted
+            route_costs (dict[int, int]):       cost of the route through the excluded state to each target
+            limit       (int):                  highest cost worth searching to
+
+        Returns:
+            (dict[int, int]): cost of the cheapest route found to each state reached
+    """
+    unwitnessed = set(route_costs)
+    labels = {source: 0}
+    heap = [(0, source)]
+    settled_count = 0
+    while heap and settled_count < WITNESS_SETTLE_LIMIT:
+        cost, state = heappop(heap)
+        if cost > labels[state]:
+            continue
+
+        settled_count += 1
+        for (target, edge_cost) in out_edges[state].items():
+            target_cost = cost + edge_cost
+            if target == excluded or target_cost > limit or target_cost >= labels.get(target, target_cost + 1):
+                continue
+
+            labels[target] = target_cost
+            heappush(heap, (target_cost, target))
+
+            # any route at least as cheap as the one through the excluded state is a witness
+            if target in unwitnessed and target_cost <= route_costs[target]:
+                unwitnessed.discard(target)
+                if not unwitnessed:
+                    return labels
+
+    return labels
+
+
+def get_hierarchy_path(graph: Graph, line_change_cost: int, directory: str = DEFAULT_HIERARCHY_DIRECTORY) -> str:
+    """
+    Path of the hierarchy file for a graph and line change cost.
+    """
+    return os.path.join(directory, graph.fingerprint()[:16], f'line-change-{line_change_cost}.hierarchy')
+
+
+def save_hierarchy(graph: Graph, hierarchy: ContractionHierarchy, directory: str = DEFAULT_HIERARCHY_DIRECTORY):
+    """
+    Save a hierarchy to a binary file, stamped with the fingerprint of the graph it was built from.  The
+    file is written to a temporary path and moved into place so that readers never see a partial file.
+        Parameters:
+            graph     (Graph):                graph the hierarchy was built from
+            hierarchy (ContractionHierarchy): hierarchy to save
+            directory (str):                  directory holding all hierarchies
+    """
+    hierarchy_path = get_hierarchy_path(graph, hierarchy.state_graph.line_change_cost, directory)
+    os.makedirs(os.path.dirname(hierarchy_path), exist_ok=True)
+    header = HIERARCHY_HEADER.pack(
+        HIERARCHY_MAGIC,
+        HIERARCHY_VERSION,
+        hierarchy.state_graph.line_change_cost,
+        bytes.fromhex(graph.fingerprint()),
+        len(hierarchy.ranks),
+        len(hierarchy.up_targets),
+        len(hierarchy.down_sources)
+    )
+
+    temporary_path = f'{hierarchy_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as hierarchy_file:
+        hierarchy_file.write(header)
+        for values in (
+            hierarchy.ranks,
+            hierarchy.up_offsets,
+            hierarchy.up_targets,
+            hierarchy.up_costs,
+            hierarchy.up_middles,
+            hierarchy.down_offsets,
+            hierarchy.down_sources,
+            hierarchy.down_costs,
+            hierarchy.down_middles
+        ):
+            hierarchy_file.write(array_to_bytes(values))
+
+    os.replace(temporary_path, hierarchy_path)
+
+
+def load_hierarchy(graph: Graph, line_change_cost: int, directory: str = DEFAULT_HIERARCHY_DIRECTORY):
+    """
+    Load a hierarchy from its binary file, if it exists, has the current version and was built from the graph.
+        Parameters:
+            graph            (Graph): graph the hierarchy was built from
+            line_change_cost (int):   cost of changing from one line to another
+            directory        (str):   directory holding all hierarchies
+
+        Returns:
+            (ContractionHierarchy | None): the hierarchy, or None if it is missing or out of date
+    """
+    try:
+        with open(get_hierarchy_path(graph, line_change_cost, directory), 'rb') as hierarchy_file:
+            data = hierarchy_file.read()
+    except OSError:
+        return None
+
+    if len(data) < HIERARCHY_HEADER.size:
+        return None
+
+    magic, version, stored_line_change_cost, fingerprint, state_count, up_count, down_count = (
+        HIERARCHY_HEADER.unpack_from(data)
+    )
+    if (
+        magic != HIERARCHY_MAGIC
+        or version != HIERARCHY_VERSION
+        or stored_line_change_cost != line_change_cost
+        or fingerprint.hex() != graph.fingerprint()
+    ):
+        return None
+
+    sizes = [state_count]
+    sizes += [state_count + 1, up_count, up_count, up_count]
+    sizes += [state_count + 1, down_count, down_count, down_count]
+    if len(data) != HIERARCHY_HEADER.size + 4 * sum(sizes):
+        return None
+
+    sections = []
+    position = HIERARCHY_HEADER.size
+    for size in sizes:
+        sections.append(array_from_bytes(data[position:position + 4 * size]))
+        position += 4 * size
+
+    return ContractionHierarchy(get_state_graph(graph, line_change_cost), *sections)
+
+
+def get_hierarchy(graph: Graph, line_change_cost: int = 0) -> ContractionHierarchy:
+    """
+    Fetch the hierarchy for a graph and line change cost, loading it from disk or, failing that, building
+    and saving it on first use.  Failure to save (e.g. a read-only directory) is not an error, the
+    hierarchy is then built again by the next process.  Hierarchies built after connections of the graph
+    have changed are not saved, as the changes themselves are not.
+    """
+    graph_hierarchies = _hierarchies.setdefault(graph, dict())
+    hierarchy = graph_hierarchies.get(line_change_cost)
+    if hierarchy is None:
+        hierarchy = load_hierarchy(graph, line_change_cost)
+        if hierarchy is None:
+            hierarchy = ContractionHierarchy.build(get_state_graph(graph, line_change_cost))
+            if graph.update_count == 0:
+                try:
+                    save_hierarchy(graph, hierarchy)
+                except OSError:
+                    pass
+        graph_hierarchies[line_change_cost] = hierarchy
+
+    return hierarchy
+
+
+def discard_hierarchies(graph: Graph, changes: list):
+    """
+    Drop the hierarchies of a graph after its connections change, to be loaded or built again on next use.
+    Shortcuts were left out wherever a witness route was at least as cheap, and any change of cost can
+    invalidate a witness, so a hierarchy cannot be repaired in place.  Hierarchies saved for the graph as
+    it was stay on disk, under its old fingerprint, and are used again if the changes are undone.
+    """
+    _hierarchies.pop(graph, None)
+
+
+add_update_listener(discard_hierarchies)
+
+
+def hierarchy_search(graph: Graph, start: int, goal: int, line_change_cost: int = 0) -> tuple:
+    """
+    Find the cheapest route between two stations with the contraction hierarchy for the line change cost.
+        Parameters:
+            graph            (Graph): compiled station graph
+            start            (int):   start station id for search
+            goal             (int):   goal station id for search
+            line_change_cost (int):   cost of changing from one line to another
+
+        Returns:
+            (tuple[list[tuple[int, int]], int, int]): Path of station and line ids from the start to the goal,
+                the cost, in minutes, of the path and the total number of stations explored by either search
+    """
+    route = get_hierarchy(graph, line_change_cost).route(start, goal)
+    if route is None:
+        # no path from start to goal, raise an error
+        raise ValueError(
+            f'Unable to find path from start [{graph.station_names[start]}] to goal [{graph.station_names[goal]}]'
+        )
+
+    return route
@@ -0,0 +1,69 @@
+from heapq import heapify, heappush, heappop
+from .graph import Graph
+from .state_graph import get_state_graph
+
+
+def isochrone(graph: Graph, origins: list, max_cost: int, line_change_cost: int = 0) -> dict:
+    """
+    Run a uniform cost search from one or more stations at once over (station, line) states, finding every
+    station which can be reached for at most 'max_cost'.  States dearer than the cutoff are never added to
+    the frontier, so the search only explores the area in range.  With several origins each station is
+    reached from the nearest one, which gives the catchment of each origin.  Each state's label carries the
+    origin its route started from, as the cheapest state of a station before it need not be on the route.
+        Parameters:
+            graph            (Graph):     compiled station graph
+            origins          (list[int]): origin station ids
+            max_cost         (int):       greatest cost, in minutes, of a route to include
+            line_change_cost (int):       cost of changing from one line to another
+
+        Returns:
+            (dict[int, tuple[int, int, int]]): cost of the cheapest route to each station in range, the station
+                before it on the route, None for the origins, and the origin the route starts from
+    """
+    state_graph = get_state_graph(graph, line_change_cost)
+    offsets = state_graph.offsets
+    targets = state_graph.targets
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+    state_stations = state_graph.state_stations
+
+    # labels, parents and origins of the states reached, kept in dicts so that the work done depends only on
+    # the size of the area in range; the start state of each station has the same id as the station
+    labels = {origin: 0 for origin in origins}
+    parents = {origin: None for origin in origins}
+    state_origins = {origin: origin for origin in origins}
+    heap = [(0, origin) for origin in labels]
+    heapify(heap)
+    reached = dict()
+    while heap:
+        cost, state = heappop(heap)
+        if labels[state] < cost:
+            # already explored at a lower cost
+            continue
+
+        # states are explored in order of cost, so the first state explored for a station is the cheapest
+        station = state_stations[state]
+        if station not in reached:
+            parent = parents[state]
+            reached[station] = (cost, None if parent is None else state_stations[parent], state_origins[state])
+
+        for edge in range(offsets[state], offsets[state + 1]):
+            if not open_edges[edge]:
+                continue
+
+            target_cost = cost + costs[edge]
+            if target_cost > max_cost:
+                continue
+
+            target = targets[edge]
+            label = labels.get(target)
+            if label is not None and label <= target_cost:
+                continue
+
+            labels[target] = target_cost
+            parents[target] = state
+            state_origins[target] = state_origins[state]
+            heappush(heap, (target_cost, target))
+
+    return reached
+
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from .graph import Graph
+from import_underground_data import import_underground_data
+
+# default data file, found in the root directory next to this package
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tubedata.csv')
+
+# cache files start with a magic string and a version number; the version must be
+# incremented whenever the layout below changes so that old caches are rebuilt
+CACHE_MAGIC = b'TUBEGRPH'
+CACHE_VERSION = 1
+
+# magic, version, source size, source modification time (ns), source sha256,
+# station count, line count, edge count, station names size, line names size
+CACHE_HEADER = struct.Struct('<8sIqq32sIIIII')
+
+# graph loaded on first use by get_graph
+_graph = None
+
+
+def get_cache_path(data_path: str) -> str:
+    """
+    Path of the binary cache for a given data file.
+    """
+    return os.path.splitext(data_path)[0] + '.cache'
+
+
+def hash_file(path: str) -> bytes:
+    """
+    Calculate the sha256 digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1 << 16), b''):
+            digest.update(block)
+
+    return digest.digest()
+
+
+def array_to_bytes(values: array) -> bytes:
+    """
+    Serialise an array of ints as little-endian bytes.
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def array_from_bytes(data: bytes) -> array:
+    """
+    Deserialise little-endian bytes to an array of ints.
+    """
+    values = array('i')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return values
+
+
+def write_cache(graph: Graph, cache_path: str, source_stat: os.stat_result, source_hash: bytes):
+    """
+    Write a compiled graph to a binary cache file, stamped with the size, modification time and hash of
+    the data file it was compiled from.  The file is written to a temporary path and moved into place
+    so that readers never see a partially written cache.
+        Parameters:
+            graph        (Graph):          compiled graph
+            cache_path   (str):            path of the cache file
+            source_stat  (os.stat_result): stat of the data file
+            source_hash  (bytes):          sha256 digest of the data file
+    """
+    station_names = '\n'.join(graph.station_names).encode('utf-8')
+    line_names = '\n'.join(graph.line_names).encode('utf-8')
+    header = CACHE_HEADER.pack(
+        CACHE_MAGIC,
+        CACHE_VERSION,
+        source_stat.st_size,
+        source_stat.st_mtime_ns,
+        source_hash,
+        graph.station_count,
+        len(graph.line_names),
+        len(graph.neighbours),
+        len(station_names),
+        len(line_names)
+    )
+
+    temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as cache_file:
+        cache_file.write(header)
+        cache_file.write(station_names)
+        cache_file.write(line_names)
+        for values in (graph.offsets, graph.neighbours, graph.costs, graph.lines, graph.zones):
+            cache_file.write(array_to_bytes(values))
+
+    os.replace(temporary_path, cache_path)
+
+
+def read_cache(cache_path: str, source_path: str):
+    """
+    Read a compiled graph from a binary cache file, if the cache exists, has the current version and was
+    compiled from the data file as it is now.  The data file is only hashed when its size or modification
+    time differ from the values in the cache.
+        Parameters:
+            cache_path  (str): path of the cache file
+            source_path (str): path of the data file
+
+        Returns:
+            (Graph | None): the cached graph, or None if the cache is missing or out of date
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            data = cache_file.read()
+    except OSError:
+        return None
+
+    if len(data) < CACHE_HEADER.size:
+        return None
+
+    (
+        magic,
+        version,
+        source_size,
+        source_mtime,
+        source_hash,
+        station_count,
+        line_count,
+        edge_count,
+        station_names_size,
+        line_names_size
+    ) = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+
+    source_stat = os.stat(source_path)
+    if source_stat.st_size != source_size or source_stat.st_mtime_ns != source_mtime:
+        # data file touched or replaced: only stale if the content has changed
+        if source_stat.st_size != source_size or hash_file(source_path) != source_hash:
+            return None
+
+    sizes = [station_names_size, line_names_size]
+    sizes += [4 * (station_count + 1), 4 * edge_count, 4 * edge_count, 4 * edge_count, 4 * station_count]
+    if len(data) != CACHE_HEADER.size + sum(sizes):
+        return None
+
+    sections = []
+    position = CACHE_HEADER.size
+    for size in sizes:
+        sections.append(data[position:position + size])
+        position += size
+
+    station_names_data, line_names_data, offsets, neighbours, costs, lines, zones = sections
+    station_names = station_names_data.decode('utf-8').split('\n') if station_count else []
+    line_names = line_names_data.decode('utf-8').split('\n') if line_count else []
+
+    return Graph(
+        station_names,
+        line_names,
+        array_from_bytes(offsets),
+        array_from_bytes(neighbours),
+        array_from_bytes(costs),
+        array_from_bytes(lines),
+        array_from_bytes(zones)
+    )
+
+
+def load_graph(data_path: str = DEFAULT_DATA_PATH, use_cache: bool = True) -> Graph:
+    """
+    Load the graph for a data file, from its binary cache if it is up to date, otherwise by compiling the
+    data file and refreshing the cache.  Failure to write the cache (e.g. a read-only directory) is not an
+    error, the graph is then compiled on every load.  Network files, as written by write_network, are
+    memory-mapped instead.
+        Parameters:
+            data_path (str):  path of the CSV data file or network file
+            use_cache (bool): read and write the binary cache
+
+        Returns:
+            (Graph): compiled graph
+    """
+    # imported here as the network module builds on this one
+    from .network import NETWORK_EXTENSION, map_network
+
+    if data_path.endswith(NETWORK_EXTENSION):
+        return map_network(data_path)
+
+    if not use_cache:
+        return import_underground_data(data_path)
+
+    cache_path = get_cache_path(data_path)
+    graph = read_cache(cache_path, data_path)
+    if graph is not None:
+        return graph
+
+    source_stat = os.stat(data_path)
+    source_hash = hash_file(data_path)
+    graph = import_underground_data(data_path)
+    try:
+        write_cache(graph, cache_path, source_stat, source_hash)
+    except OSError:
+        pass
+
+    return graph
+
+
+def get_graph() -> Graph:
+    """
+    Fetch the graph for the default data file, loading it on first use.
+    """
+    global _graph
+    if _graph is None:
+        _graph = load_graph()
+
+    return _graph
+
+
+def set_graph(graph: Graph) -> Graph:
+    """
+    Use an already loaded graph for subsequent searches, e.g. one passed to a worker process.
+    """
+    global _graph
+    _graph = graph
+
+    return _graph
+
+
+def reload_graph(data_path: str = DEFAULT_DATA_PATH) -> Graph:
+    """
+    Load the graph again, e.g. after the data file has changed, and use it for subsequent searches.
+    """
+    global _graph
+    _graph = load_graph(data_path)
+
+    return _graph
@@ -0,0 +1,230 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from weakref import WeakKeyDictionary
+from .graph import Graph
+
+# words written in more than one way in station names, mapped to the form used in normalised names
+WORD_ALIASES = {'saint': 'st'}
+
+# largest number of edits between a name and a station name for the station to be suggested, by name length
+MAX_EDITS_SHORT = 1
+MAX_EDITS_LONG = 2
+LONG_NAME_LENGTH = 6
+
+# number of completions returned unless another limit is given
+DEFAULT_COMPLETION_LIMIT = 10
+
+APOSTROPHES = re.compile(r"['‘’`]")
+SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+# station indexes already built, per graph
+_station_indexes = WeakKeyDictionary()
+
+
+def normalise_name(name: str) -> str:
+    """
+    Normalise a station name for matching: accents removed, lower case, '&' as 'and', apostrophes dropped
+    and any other run of punctuation or spaces as a single space, so that "St. John's Wood", "st johns wood"
+    and "ST JOHNS  WOOD" are the same.
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(character for character in name if not unicodedata.combining(character)).lower()
+    name = APOSTROPHES.sub('', name.replace('&', ' and '))
+    return ' '.join(WORD_ALIASES.get(word, word) for word in SEPARATORS.sub(' ', name).split())
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """
+    Levenshtein distance between two strings, or limit + 1 if it is more than 'limit'.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+
+    previous = list(range(len(second) + 1))
+    for (row, first_character) in enumerate(first, 1):
+        current = [row]
+        for (column, second_character) in enumerate(second, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_character != second_character)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+
+    return previous[-1]
+
+
+class StationIndex:
+    """
+    A class used to resolve station names as people type them.  Names are normalised (see normalise_name)
+    and indexed three ways: an exact map, a sorted list of normalised names which serves prefix lookups like
+    a trie, by bisection, with far less memory, and an index of the trigrams of each name which narrows
+    down the stations to compare by edit distance when a name is misspelt.  The trigram index is only built
+    the first time a name does not match.
+
+    Attributes:
+        graph : Graph
+            Graph whose stations are indexed
+        exact : dict[str, list[int]]
+            Station ids for each normalised name
+        keys : list[str]
+            Normalised names, sorted
+        key_stations : list[int]
+            Station id for each normalised name in 'keys'
+        trigrams : dict[str, list[int]]
+            Positions in 'keys' of the names containing each trigram, built on first use
+
+    Methods:
+        build(graph):
+            Index the station names of a graph
+        resolve(name):
+            Resolve a name to a station id, exactly, by a unique prefix or by a unique close spelling
+        complete(prefix, limit):
+            Station names starting with a prefix, for autocomplete
+        suggest(name, limit):
+            Station names closest in spelling to a name
+    """
+
+    def __init__(self, graph: Graph, exact: dict, keys: list, key_stations: list):
+        self.graph = graph
+        self.exact = exact
+        self.keys = keys
+        self.key_stations = key_stations
+        self.trigrams = None
+
+    @staticmethod
+    def build(graph: Graph) -> 'StationIndex':
+        """
+        Index the station names of a graph.
+            Parameters:
+                graph (Graph): compiled station graph
+
+            Returns:
+                (StationIndex): index of the graph's station names
+        """
+        exact = dict()
+        for (station, name) in enumerate(graph.station_names):
+            exact.setdefault(normalise_name(name), []).append(station)
+
+        entries = sorted((key, station) for (key, stations) in exact.items() for station in stations)
+        return StationIndex(graph, exact, [key for (key, _) in entries], [station for (_, station) in entries])
+
+    def prefix_range(self, prefix: str) -> range:
+        """
+        Positions in 'keys' of the normalised names starting with a normalised prefix.
+        """
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        return range(start, end)
+
+    def resolve(self, name: str) -> int:
+        """
+        Resolve a name to a station id: the station with exactly that name, else the station whose normalised
+        name matches, else the only station whose normalised name starts with it, else the only station
+        closest in spelling.
+            Parameters:
+                name (str): station name as given
+
+            Returns:
+                (int): station id
+        """
+        station = self.graph.station_ids.get(name)
+        if station is not None:
+            return station
+
+        key = normalise_name(name)
+        stations = self.exact.get(key)
+        if stations is None and key:
+            stations = [self.key_stations[position] for position in self.prefix_range(key)]
+            if not stations:
+                stations = self.candidates(key)
+
+        if stations and len(stations) == 1:
+            return stations[0]
+
+        if not stations:
+            raise ValueError(f'Invalid station {name} not found in station data')
+
+        names = sorted(self.graph.station_names[station] for station in stations)[:DEFAULT_COMPLETION_LIMIT]
+        raise ValueError(f'Ambiguous station {name}, which could be any of: {", ".join(names)}')
+
+    def complete(self, prefix: str, limit: int = DEFAULT_COMPLETION_LIMIT) -> list:
+        """
+        Station names whose normalised names start with the normalised prefix, in order of normalised name.
+            Parameters:
+                prefix (str): start of a station name as typed
+                limit  (int): greatest number of names to return
+
+            Returns:
+                (list[str]): matching station names
+        """
+        positions = self.prefix_range(normalise_name(prefix))
+        station_names = self.graph.station_names
+        return [station_names[self.key_stations[position]] for position in positions[:limit]]
+
+    def suggest(self, name: str, limit: int = DEFAULT_COMPLETION_LIMIT) -> list:
+        """
+        Station names closest in spelling to a name, within the edit distance allowed for its length.
+        """
+        station_names = self.graph.station_names
+        return [station_names[station] for station in self.candidates(normalise_name(name))[:limit]]
+
+    def candidates(self, key: str) -> list:
+        """
+        Stations whose normalised names are the fewest edits from a normalised name, if within the edit
+        distance allowed for its length.  Only names sharing enough trigrams with it to be that close are compared.
+            Parameters:
+                key (str): normalised name
+
+            Returns:
+                (list[int]): station ids of the closest names, in order of normalised name
+        """
+        if self.trigrams is None:
+            self.trigrams = dict()
+            for (position, indexed_key) in enumerate(self.keys):
+                for trigram in set(name_trigrams(indexed_key)):
+                    self.trigrams.setdefault(trigram, []).append(position)
+
+        limit = MAX_EDITS_LONG if len(key) >= LONG_NAME_LENGTH else MAX_EDITS_SHORT
+        shared = dict()
+        trigrams = set(name_trigrams(key))
+        for trigram in trigrams:
+            for position in self.trigrams.get(trigram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        # each edit changes at most three trigrams, so a name within the limit shares at least this many
+        least_shared = max(1, len(trigrams) - 3 * limit)
+        best = limit + 1
+        closest = []
+        for position in sorted(position for (position, count) in shared.items() if count >= least_shared):
+            distance = edit_distance(key, self.keys[position], min(limit, best))
+            if distance < best:
+                best = distance
+                closest = [position]
+            elif distance == best and distance <= limit:
+                closest.append(position)
+
+        return [self.key_stations[position] for position in closest] if best <= limit else []
+
+
+def name_trigrams(key: str) -> list:
+    """
+    Trigrams of a normalised name, padded so that short names and the ends of names have trigrams too.
+    """
+    padded = f'  {key} '
+    return [padded[index:index + 3] for index in range(len(padded) - 2)]
+
+
+def get_station_index(graph: Graph) -> StationIndex:
+    """
+    Fetch the station name index for a graph, building it on first use.
+    """
+    index = _station_indexes.get(graph)
+    if index is None:
+        index = StationIndex.build(graph)
+        _station_indexes[graph] = index
+
+    return index
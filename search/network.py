@@ -0,0 +1,104 @@
+import mmap
+import os
+import struct
+import sys
+from .graph import Graph
+from .loader import array_from_bytes, array_to_bytes
+
+# extension of network files, which the loader maps instead of compiling
+NETWORK_EXTENSION = '.network'
+
+# network files start with a magic string and a version number, which must be incremented whenever the
+# layout below changes
+NETWORK_MAGIC = b'TUBENETW'
+NETWORK_VERSION = 1
+
+# magic, version, station count, line count, edge count, station names size, line names size; the header
+# is a multiple of four bytes long so that the edge arrays which follow it are aligned
+NETWORK_HEADER = struct.Struct('<8sIIIIII')
+
+# edge arrays stored after the header, in order, as little-endian 32 bit ints: offsets has one entry per
+# station plus a trailing entry, zones one entry per station and the others one entry per connection
+NETWORK_ARRAYS = ('offsets', 'neighbours', 'costs', 'lines', 'zones')
+
+
+def write_network(graph: Graph, path: str):
+    """
+    Write a graph to a network file: the header, the edge arrays, then the station and line names, each
+    joined by newlines.  The file is written to a temporary path and moved into place so that readers
+    never map a partially written file.
+        Parameters:
+            graph (Graph): compiled graph
+            path  (str):   path of the network file
+    """
+    station_names = '\n'.join(graph.station_names).encode('utf-8')
+    line_names = '\n'.join(graph.line_names).encode('utf-8')
+    header = NETWORK_HEADER.pack(
+        NETWORK_MAGIC,
+        NETWORK_VERSION,
+        graph.station_count,
+        len(graph.line_names),
+        len(graph.neighbours),
+        len(station_names),
+        len(line_names)
+    )
+
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as network_file:
+        network_file.write(header)
+        for name in NETWORK_ARRAYS:
+            network_file.write(array_to_bytes(getattr(graph, name)))
+        network_file.write(station_names)
+        network_file.write(line_names)
+
+    os.replace(temporary_path, path)
+
+
+def map_network(path: str) -> Graph:
+    """
+    Map a network file into memory and use its edge arrays in place.  The mapping is copy-on-write, so
+    closing connections or changing their costs only copies the pages touched and never changes the file.
+    Only the names and the maps from names to ids are built in memory; edge arrays are read from disk as
+    searches touch them.  On big-endian platforms the arrays are copied and byte swapped instead.
+        Parameters:
+            path (str): path of the network file
+
+        Returns:
+            (Graph): graph whose edge arrays are views of the mapped file
+    """
+    with open(path, 'rb') as network_file:
+        mapped = mmap.mmap(network_file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapped) < NETWORK_HEADER.size:
+        raise ValueError(f'Invalid network file {path}: too short')
+
+    (
+        magic,
+        version,
+        station_count,
+        line_count,
+        edge_count,
+        station_names_size,
+        line_names_size
+    ) = NETWORK_HEADER.unpack_from(mapped)
+    if magic != NETWORK_MAGIC or version != NETWORK_VERSION:
+        raise ValueError(f'Invalid network file {path}: not a version {NETWORK_VERSION} network')
+
+    lengths = [station_count + 1, edge_count, edge_count, edge_count, station_count]
+    if len(mapped) != NETWORK_HEADER.size + 4 * sum(lengths) + station_names_size + line_names_size:
+        raise ValueError(f'Invalid network file {path}: wrong size')
+
+    view = memoryview(mapped)
+    arrays = []
+    position = NETWORK_HEADER.size
+    for length in lengths:
+        section = view[position:position + 4 * length]
+        arrays.append(array_from_bytes(section) if sys.byteorder == 'big' else section.cast('i'))
+        position += 4 * length
+
+    station_names = str(view[position:position + station_names_size], 'utf-8').split('\n') if station_count else []
+    position += station_names_size
+    line_names = str(view[position:position + line_names_size], 'utf-8').split('\n') if line_count else []
+
+    offsets, neighbours, costs, lines, zones = arrays
+    return Graph(station_names, line_names, offsets, neighbours, costs, lines, zones)
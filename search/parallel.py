@@ -0,0 +1,200 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from .batch import batch_search
+from .graph import Graph
+from .loader import get_graph, set_graph
+from .variants import Algorithm
+
+# number of pairs sent to a worker at a time; a multiple of the number of stations keeps
+# all pairs from one origin together when searching all pairs
+DEFAULT_SHARD_SIZE = 5000
+
+
+def initialise_worker(graph: Graph):
+    """
+    Use the graph from the parent process in a worker process.  With the 'fork' start method the graph
+    is inherited and None is passed here; otherwise the parent's graph is sent once per worker.
+    """
+    if graph is not None:
+        set_graph(graph)
+
+
+def worker_ready() -> int:
+    """
+    Task which does nothing, sent to start worker processes.
+    """
+    return os.getpid()
+
+
+def search_shard(pairs: list, algorithm: Algorithm, line_change_cost: int) -> list:
+    """
+    Search a shard of pairs in a worker process.
+    """
+    return list(batch_search(pairs, algorithm, line_change_cost))
+
+
+def create_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers share the graph loaded in this process.  Where the platform
+    supports it workers are forked, so the graph is shared copy-on-write rather than loaded again.
+        Parameters:
+            workers (int): number of worker processes
+
+        Returns:
+            (ProcessPoolExecutor): process pool
+    """
+    graph = get_graph()
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        graph = None
+    else:
+        context = multiprocessing.get_context()
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=initialise_worker,
+        initargs=(graph,)
+    )
+
+
+def start_workers(pool: ProcessPoolExecutor, workers: int):
+    """
+    Start the worker processes of a pool now rather than at the first search, by sending each a task and
+    waiting for them.  Forked workers inherit every file descriptor open in this process when they start,
+    so a pool used by a server must be started before it opens any sockets: a worker which inherited a
+    client's connection would keep it open after the server closes it.
+        Parameters:
+            pool    (ProcessPoolExecutor): process pool, as created by create_pool
+            workers (int):                 number of worker processes in the pool
+    """
+    for future in [pool.submit(worker_ready) for _ in range(workers)]:
+        future.result()
+
+
+def parallel_batch_search(
+    pairs,
+    algorithm: Algorithm = Algorithm.UniformCost,
+    line_change_cost: int = 0,
+    workers: int = None,
+    shard_size: int = DEFAULT_SHARD_SIZE
+):
+    """
+    Search for routes between many (start, goal) pairs as batch_search does, with shards of pairs searched
+    in parallel by a pool of worker processes.  Only a few shards per worker are in flight at a time, so
+    memory use does not grow with the number of pairs.
+        Parameters:
+            pairs            (Iterable[tuple[str, str]]): (start, goal) station names
+            algorithm        (Algorithm):                 enum selection of the algorithm
+            line_change_cost (int):                       line change cost in minutes
+            workers          (int):                       number of worker processes, defaults to the number of CPUs
+            shard_size       (int):                       number of pairs sent to a worker at a time
+
+        Returns:
+            (Iterator[BatchResult]): result for each pair, in the same order as the pairs
+    """
+    workers = workers or os.cpu_count()
+    max_in_flight = 2 * workers
+    pairs = iter(pairs)
+    with create_pool(workers) as pool:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < max_in_flight:
+                shard = list(islice(pairs, shard_size))
+                if not shard:
+                    break
+                in_flight.append(pool.submit(search_shard, shard, algorithm, line_change_cost))
+
+            if not in_flight:
+                return
+
+            # results are taken in submission order, so the output order does not depend on timing
+            yield from in_flight.popleft().result()
+
+
+def all_pairs():
+    """
+    Every (start, goal) pair of distinct stations, grouped by start station.
+    """
+    station_names = get_graph().station_names
+    for start in station_names:
+        for goal in station_names:
+            if start != goal:
+                yield start, goal
+
+
+def parallel_all_pairs_search(
+    algorithm: Algorithm = Algorithm.UniformCost,
+    line_change_cost: int = 0,
+    workers: int = None
+):
+    """
+    Search for routes between every pair of distinct stations in parallel.
+        Parameters:
+            algorithm        (Algorithm): enum selection of the algorithm
+            line_change_cost (int):       line change cost in minutes
+            workers          (int):       number of worker processes, defaults to the number of CPUs
+
+        Returns:
+            (Iterator[BatchResult]): result for each pair, grouped by start station
+    """
+    pairs_per_origin = max(get_graph().station_count - 1, 1)
+    shard_size = max(DEFAULT_SHARD_SIZE // pairs_per_origin, 1) * pairs_per_origin
+    return parallel_batch_search(all_pairs(), algorithm, line_change_cost, workers, shard_size)
+
+
+def scaling_worker_counts(max_workers: int) -> list:
+    """
+    Worker counts to measure scaling with: 1 and each power of two up to 'max_workers', and 'max_workers'.
+    """
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    return counts
+
+
+def measure_scaling(
+    worker_counts: list,
+    algorithm: Algorithm = Algorithm.UniformCost,
+    line_change_cost: int = 0
+) -> list:
+    """
+    Measure the wall-clock time to search every pair of stations with each number of workers.  One worker
+    searches in this process, as an --all-pairs search with one worker does, so its time is the serial
+    baseline; more workers search in parallel_all_pairs_search's pool, including the cost of starting it.
+        Parameters:
+            worker_counts    (list[int]): numbers of workers to measure
+            algorithm        (Algorithm): enum selection of the algorithm
+            line_change_cost (int):       line change cost in minutes
+
+        Returns:
+            (list[dict]): workers, pairs searched, seconds and speedup over one worker for each worker count
+    """
+    measurements = []
+    serial_seconds = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        if workers <= 1:
+            results = batch_search(all_pairs(), algorithm, line_change_cost)
+        else:
+            results = parallel_all_pairs_search(algorithm, line_change_cost, workers)
+        pairs = sum(1 for _ in results)
+        seconds = time.perf_counter() - start
+
+        if workers <= 1:
+            serial_seconds = seconds
+        measurements.append({
+            'workers': workers,
+            'pairs': pairs,
+            'seconds': seconds,
+            'speedup': serial_seconds / seconds if serial_seconds else None
+        })
+
+    return measurements
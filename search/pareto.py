@@ -0,0 +1,93 @@
+from collections import namedtuple
+from heapq import heappush, heappop
+from itertools import count
+from .algorithm import expand_children, filter_child_data
+from .graph import NO_LINE
+from .state import SearchState
+from .state_graph import StateGraph
+
+# route on the Pareto front: path of (station id, line id) pairs, its journey time in minutes and the
+# number of times it changes line
+ParetoRoute = namedtuple('ParetoRoute', ['path', 'minutes', 'changes'])
+
+
+def pareto_routes(state_graph: StateGraph, start: int, goal: int, max_changes: int = None) -> list:
+    """
+    Multi-criteria label-setting search for every route between two stations which is not dominated in
+    journey time and line changes: no other route is at least as quick with at most as many changes.  One
+    search replaces a uniform cost search per line change cost, since the cheapest route for any line change
+    cost c is the route on the front with the least minutes + c * changes.
+
+    Labels are (minutes, changes) pairs on the (station, line) states of a state graph built with no line
+    change cost, expanded as generic_search expands nodes, and settled in order of minutes then changes.  A
+    state therefore keeps only the fewest changes of any label settled there: a later label is dominated
+    unless it has fewer.  Labels are pruned before they are queued, and so are labels with at least as many
+    changes as a route already found, since changes never decrease along a route.
+        Parameters:
+            state_graph (StateGraph): line-expanded station graph with a line change cost of zero
+            start       (int):        start station id
+            goal        (int):        goal station id
+            max_changes (int):        greatest number of line changes of a route to include, or None
+
+        Returns:
+            (list[ParetoRoute]): routes on the Pareto front, quickest (and so with the most changes) first
+    """
+    if state_graph.line_change_cost != 0:
+        raise ValueError(
+            f'Pareto search needs a state graph without line change cost, not {state_graph.line_change_cost}'
+        )
+
+    if start == goal:
+        return [ParetoRoute([], 0, 0)]
+
+    state_stations = state_graph.state_stations
+    state_lines = state_graph.state_lines
+
+    # fewest changes of a label settled at each state, and of a route found to the goal; no label is ever
+    # closed, as a state may be settled again with fewer changes
+    fewest_changes = dict()
+    goal_changes = (max_changes + 1) if max_changes is not None else None
+    never_closed = bytearray(state_graph.state_count)
+
+    routes = []
+    counter = count()
+    heap = [(0, 0, next(counter), SearchState(state=start, cost=0, parent=None))]
+    while heap:
+        minutes, changes, _, node = heappop(heap)
+        if goal_changes is not None and changes >= goal_changes:
+            continue
+
+        settled_changes = fewest_changes.get(node.state)
+        if settled_changes is not None and settled_changes <= changes:
+            # dominated by a label settled before, which is no slower
+            continue
+
+        fewest_changes[node.state] = changes
+        if state_stations[node.state] == goal:
+            routes.append(ParetoRoute(state_graph.path(node.to_path()), minutes, changes))
+            goal_changes = changes
+            continue
+
+        line = state_lines[node.state]
+        for (state, step_cost, parent) in filter_child_data(
+            state_graph,
+            expand_children(state_graph, node),
+            node,
+            never_closed
+        ):
+            child_changes = changes + (line != NO_LINE and state_lines[state] != line)
+            if goal_changes is not None and child_changes >= goal_changes:
+                continue
+
+            settled_changes = fewest_changes.get(state)
+            if settled_changes is not None and settled_changes <= child_changes:
+                continue
+
+            child_minutes = minutes + step_cost
+            heappush(heap, (child_minutes, child_changes, next(counter), SearchState(state, child_minutes, parent)))
+
+    if not routes:
+        station_names = state_graph.graph.station_names
+        raise ValueError(f'Unable to find path from start [{station_names[start]}] to goal [{station_names[goal]}]')
+
+    return routes
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor
+from .cache import cached_search
+from .loader import get_graph
+from .names import DEFAULT_COMPLETION_LIMIT, get_station_index
+from .parallel import create_pool, start_workers
+from .variants import Algorithm
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# number of most recent searches used for latency percentiles
+LATENCY_WINDOW = 10000
+
+
+def answer_query(query: dict) -> dict:
+    """
+    Answer one routing query.  Runs in a worker process, each of which keeps its own route cache.
+        Parameters:
+            query (dict): start, goal and optionally algorithm (default BreadthFirst), reverse and line_change_cost
+
+        Returns:
+            (dict): start and goal, as resolved to station names, path, cost and explored_nodes, or an error
+                message
+    """
+    try:
+        graph = get_graph()
+        index = get_station_index(graph)
+        start = graph.station_names[index.resolve(str(query['start']))]
+        goal = graph.station_names[index.resolve(str(query['goal']))]
+        path, cost, explored_nodes = cached_search(
+            start,
+            goal,
+            Algorithm.from_string(query.get('algorithm', 'BreadthFirst')),
+            bool(query.get('reverse', False)),
+            int(query.get('line_change_cost', 0))
+        )
+    except KeyError as key_error:
+        return {'error': f'Missing field {key_error}'}
+    except NotImplementedError:
+        return {'error': f'Algorithm not known: [{query.get("algorithm")}]'}
+    except Exception as error:
+        return {'error': str(error)}
+
+    return {'start': start, 'goal': goal, 'path': path, 'cost': cost, 'explored_nodes': explored_nodes}
+
+
+def answer_completion(query: dict) -> dict:
+    """
+    Answer one autocomplete query from the station name index, which is fast enough to run on the event loop.
+        Parameters:
+            query (dict): complete, the start of a station name, and optionally limit (default 10)
+
+        Returns:
+            (dict): completions, the station names starting with the text given, or an error message
+    """
+    try:
+        index = get_station_index(get_graph())
+        limit = int(query.get('limit', DEFAULT_COMPLETION_LIMIT))
+        return {'completions': index.complete(str(query['complete']), limit)}
+    except Exception as error:
+        return {'error': str(error)}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Value below which a given fraction of a sorted list of values falls, by the nearest rank method.
+    """
+    if not sorted_values:
+        return 0.0
+
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class RoutingService:
+    """
+    A class used to answer routing queries sent as newline-delimited JSON over a socket.  The graph is
+    loaded once, before the service starts, and searches run in an executor so that the event loop keeps
+    reading queries while slow searches are in progress.
+
+    Each line sent to the service is a JSON object, either a query such as
+    {"id": 1, "start": "Euston", "goal": "Victoria", "algorithm": "UniformCost", "line_change_cost": 2},
+    {"complete": "bak"} to autocomplete a station name or {"stats": true}.  One JSON object is written back
+    per line received.  Queries on one connection are answered concurrently, so responses may arrive out of
+    order: any "id" in the query is copied to its response.
+
+    Attributes:
+        executor : Executor
+            Executor which runs searches
+        request_count : int
+            Number of searches answered
+        error_count : int
+            Number of searches answered with an error
+        latencies : deque[float]
+            Time taken, in seconds, to answer the most recent searches
+
+    Methods:
+        handle_connection(reader, writer):
+            Read queries from a connection and write responses
+        stats():
+            Request counts and latency percentiles
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self.request_count = 0
+        self.error_count = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Read queries from a connection until it is closed, answering each query as a separate task.
+        """
+        tasks = set()
+        async for line in reader:
+            if not line.strip():
+                continue
+
+            task = asyncio.create_task(self.respond(line, writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+        writer.close()
+        await writer.wait_closed()
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter):
+        """
+        Answer one line and write the response.
+        """
+        started = time.perf_counter()
+        try:
+            query = json.loads(line)
+        except ValueError:
+            query = None
+
+        if not isinstance(query, dict):
+            response = {'error': 'Query must be a JSON object'}
+        elif query.get('stats'):
+            response = self.stats()
+        elif 'complete' in query:
+            response = answer_completion(query)
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, answer_query, query)
+            self.request_count += 1
+            if 'error' in response:
+                self.error_count += 1
+            self.latencies.append(time.perf_counter() - started)
+
+        if isinstance(query, dict) and 'id' in query:
+            response['id'] = query['id']
+
+        writer.write((json.dumps(response) + '\n').encode('utf-8'))
+        await writer.drain()
+
+    def stats(self) -> dict:
+        """
+        Request counts and latency percentiles, in milliseconds, over the most recent searches.
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.request_count,
+            'errors': self.error_count,
+            'latency_ms': {
+                'p50': 1000 * percentile(latencies, 0.5),
+                'p90': 1000 * percentile(latencies, 0.9),
+                'p99': 1000 * percentile(latencies, 0.99),
+                'max': 1000 * latencies[-1] if latencies else 0.0
+            }
+        }
+
+
+async def serve(service: RoutingService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None):
+    """
+    Accept connections on a TCP port, or on a Unix socket if a path is given, until cancelled.
+    """
+    if socket_path is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=socket_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host=host, port=port)
+
+    async with server:
+        await server.serve_forever()
+
+
+def run_service(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str = None,
+    workers: int = None
+):
+    """
+    Load the graph and answer routing queries until interrupted.
+        Parameters:
+            host        (str): address to listen on
+            port        (int): TCP port to listen on
+            socket_path (str): path of a Unix socket to listen on instead of a TCP port
+            workers     (int): number of worker processes for searches, defaults to the number of CPUs
+    """
+    # load the graph before the workers are created, so that they share it, and start them before
+    # the server opens any sockets, so that they do not inherit them
+    get_graph()
+    workers = workers or os.cpu_count()
+    with create_pool(workers) as pool:
+        start_workers(pool, workers)
+        asyncio.run(serve(RoutingService(pool), host, port, socket_path))
@@ -1,54 +1,53 @@
-from dataclasses import dataclass, field
-from typing import Any
-
-
-@dataclass(order=True)
 class SearchState:
     """
-    A class used to represent state in a search algorithm. The @dataclass annotation
-    is used to auto-generate __init__ and __repr__ methods.
+    A class used to represent state in a search algorithm.  Searches create very many
+    states, so the class declares __slots__: instances have no per-instance __dict__
+    and hold only the id of a (station, line) state of the StateGraph, the cost and a
+    reference to the parent.  Stations, lines and zones are looked up in the graphs
+    when needed rather than stored per state.
 
-    The 'order' annotation is set to true to auto-generate comparison methods for this
-    class to enable use with the python PriorityQueue implementation.  Two SearchState
-    objects are compared by priority only; objects with equal priority may be retrieved
-    in any order.
+    States are never compared with each other: priority frontiers order them by cost
+    and then by insertion order.
 
     Attributes:
-        station : str
-            Name of the station
+        state : int
+            Id of the (station, line) state in the state graph
         cost : int
-            Cost of reaching this station from the start station
-        line : str
-            Line taken from the parent station to this station
+            Cost of reaching this state from the start state
         parent : SearchState
-            The previous station in the steps to reach this station from
+            The previous state in the steps to reach this state from
             the start state
-        zones : set[str]
-            Primary and secondary zones for the station
 
     Methods:
         to_path():
             Convert the node to a path by iterating through its parents
     """
 
-    station: str = field(compare=False)
-    cost: int
-    parent: Any = field(compare=False)
-    line: str = field(compare=False)
-    zones: set = field(compare=False)
+    __slots__ = ('state', 'cost', 'parent')
+
+    def __init__(self, state: int, cost: int, parent):
+        self.state = state
+        self.cost = cost
+        self.parent = parent
+
+    def __repr__(self) -> str:
+        return f'SearchState(state={self.state}, cost={self.cost})'
 
     def to_path(self):
         """
-        Convert the node to a path by iterating recursively through the parent property.
+        Convert the node to a path by iterating through the parent property.  States are
+        collected from the destination back to the start and reversed once, so this takes
+        time linear in the length of the path.
 
         Returns:
-            list[str]: List of station names for each stop from the start to the destination
+            list[int]: State id for each stop from the start to the destination
         """
-        path = [f'{self.station} ({self.line})']
+        path = []
         current_node = self
 
-        while current_node.parent:
+        while current_node is not None:
+            path.append(current_node.state)
             current_node = current_node.parent
-            path.insert(0, f'{current_node.station} ({current_node.line})')
 
+        path.reverse()
         return path
@@ -0,0 +1,211 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from weakref import WeakKeyDictionary
+from .graph import Graph, NO_LINE, add_update_listener, change_cost
+
+# state graphs already built, per graph and line change cost
+_state_graphs = WeakKeyDictionary()
+
+
+class StateGraph:
+    """
+    A class used to represent the line-expanded station network for one line change cost.  Each node
+    is a (station, line) state: the station together with the line it was reached on.  Each station
+    also has a start state with NO_LINE, whose id is the station id, for routes starting there.
+
+    Edges are stored in CSR style arrays like the station graph.  The edge from state (s, L) along a
+    connection to station t on line M leads to state (t, M).  Its cost is the journey time plus the
+    line change cost when M differs from L, so each interchange is an explicit, weighted part of the
+    edge that follows it.  Searches then need no knowledge of lines, and a flat array indexed by state
+    id serves as the closed set.
+
+    The edges from each state follow the station's connections one for one, so the state edges of a
+    connection are found by its position, and closing a connection or changing its cost is repaired in
+    place on every state graph built from the station graph.
+
+    Attributes:
+        graph : Graph
+            Station graph the states were expanded from
+        line_change_cost : int
+            Cost of changing from one line to another included in edge costs
+        state_stations : array[int]
+            Station id of each state
+        state_lines : array[int]
+            Line id of each state, NO_LINE for start states
+        state_ids : dict[tuple[int, int], int]
+            Map from (station, line) to state id
+        offsets : array[int]
+            Start of each state's edges in the edge arrays, with one trailing entry
+        targets : array[int]
+            State id at the other end of each edge
+        costs : array[int]
+            Cost, in minutes, of each edge including any line change
+        open_edges : bytearray
+            Non-zero for each edge whose connection is open
+
+    Methods:
+        build(graph, line_change_cost):
+            Expand a station graph into states
+        line_states(station):
+            State ids of a station reached along each of its lines
+        reverse_edges():
+            Edges into each state, for searches backward from a goal
+        update_edges(changes):
+            Repair edges after connections of the station graph change
+        path(states):
+            Convert a list of state ids to (station id, line id) pairs
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        line_change_cost: int,
+        state_stations: array,
+        state_lines: array,
+        offsets: array,
+        targets: array,
+        costs: array,
+        open_edges: bytearray
+    ):
+        self.graph = graph
+        self.line_change_cost = line_change_cost
+        self.state_stations = state_stations
+        self.state_lines = state_lines
+        self.state_ids = {state: index for index, state in enumerate(zip(state_stations, state_lines))}
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+        self.open_edges = open_edges
+        self._reverse_edges = None
+
+    @staticmethod
+    def build(graph: Graph, line_change_cost: int = 0) -> 'StateGraph':
+        """
+        Expand a station graph into (station, line) states.  Edges from each state follow the order of
+        the station's connections, so searches visit children in the same order as on the station graph.
+            Parameters:
+                graph            (Graph): compiled station graph
+                line_change_cost (int):   cost of changing from one line to another
+
+            Returns:
+                (StateGraph): line-expanded graph
+        """
+        graph_offsets = graph.offsets
+        graph_lines = graph.lines
+
+        states = [(station, NO_LINE) for station in range(graph.station_count)]
+        for station in range(graph.station_count):
+            lines = sorted({graph_lines[edge] for edge in range(graph_offsets[station], graph_offsets[station + 1])})
+            states.extend((station, line) for line in lines)
+        state_ids = {state: index for index, state in enumerate(states)}
+
+        offsets = array('i', [0])
+        targets = array('i')
+        costs = array('i')
+        open_edges = bytearray()
+        for (station, line) in states:
+            for edge in range(graph_offsets[station], graph_offsets[station + 1]):
+                edge_line = graph_lines[edge]
+                targets.append(state_ids[(graph.neighbours[edge], edge_line)])
+                costs.append(graph.costs[edge] + change_cost(line, edge_line, line_change_cost))
+                open_edges.append(graph.open_edges[edge])
+            offsets.append(len(targets))
+
+        return StateGraph(
+            graph,
+            line_change_cost,
+            array('i', [station for (station, _) in states]),
+            array('i', [line for (_, line) in states]),
+            offsets,
+            targets,
+            costs,
+            open_edges
+        )
+
+    @property
+    def state_count(self) -> int:
+        return len(self.state_stations)
+
+    def line_states(self, station: int) -> range:
+        """
+        State ids of a station reached along each of its lines.  These follow the start states and are
+        ordered by station, so they are found by bisection.
+        """
+        station_count = self.graph.station_count
+        return range(
+            bisect_left(self.state_stations, station, station_count),
+            bisect_right(self.state_stations, station, station_count)
+        )
+
+    def reverse_edges(self) -> tuple:
+        """
+        Edges into each state, in CSR style arrays, built on first use.  Each refers to its forward edge for
+        the cost and whether it is open, so updates to the forward edges need no repair here.
+            Returns:
+                (tuple[array[int], array[int], array[int]]): offsets of each state's edges, with one trailing
+                    entry, the state at the other end of each edge and the position of each edge in the
+                    forward edge arrays
+        """
+        if self._reverse_edges is None:
+            incoming = [[] for _ in range(self.state_count)]
+            for state in range(self.state_count):
+                for edge in range(self.offsets[state], self.offsets[state + 1]):
+                    incoming[self.targets[edge]].append((state, edge))
+
+            offsets = array('i', [0])
+            sources = array('i')
+            forward_edges = array('i')
+            for edges in incoming:
+                for (source, edge) in edges:
+                    sources.append(source)
+                    forward_edges.append(edge)
+                offsets.append(len(sources))
+            self._reverse_edges = (offsets, sources, forward_edges)
+
+        return self._reverse_edges
+
+    def update_edges(self, changes: list):
+        """
+        Repair the cost and open flag of the edges of each changed connection from every state of its
+        station.
+            Parameters:
+                changes (list[EdgeChange]): connections of the station graph which changed
+        """
+        graph_offsets = self.graph.offsets
+        for change in changes:
+            position = change.edge - graph_offsets[change.station]
+            for state in (change.station, *self.line_states(change.station)):
+                edge = self.offsets[state] + position
+                line_change = change_cost(self.state_lines[state], change.line, self.line_change_cost)
+                self.costs[edge] = change.cost + line_change
+                self.open_edges[edge] = change.is_open
+
+    def path(self, states: list) -> list:
+        """
+        Convert a list of state ids to (station id, line id) pairs.
+        """
+        return [(self.state_stations[state], self.state_lines[state]) for state in states]
+
+
+def get_state_graph(graph: Graph, line_change_cost: int = 0) -> StateGraph:
+    """
+    Fetch the state graph for a graph and line change cost, building it on first use.
+    """
+    graph_state_graphs = _state_graphs.setdefault(graph, dict())
+    state_graph = graph_state_graphs.get(line_change_cost)
+    if state_graph is None:
+        state_graph = StateGraph.build(graph, line_change_cost)
+        graph_state_graphs[line_change_cost] = state_graph
+
+    return state_graph
+
+
+def repair_state_graphs(graph: Graph, changes: list):
+    """
+    Repair every state graph built from a graph after its connections change.
+    """
+    for state_graph in _state_graphs.get(graph, dict()).values():
+        state_graph.update_edges(changes)
+
+
+add_update_listener(repair_state_graphs)
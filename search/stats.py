@@ -0,0 +1,109 @@
+class SearchStats:
+    """
+    A class used to collect counts and timings from one search, for tuning.  Searches only update a
+    collector when one is passed in, so searches without one pay a single test per phase.  Searches
+    which do not use a queue (bidirectional and ContractionHierarchy) record only the stations explored
+    and the total time.
+
+    Attributes:
+        expansions : int
+            Nodes taken from the frontier and expanded
+        reexpansions : int
+            Nodes taken from the frontier whose (station, line) state had already been expanded
+        generated : int
+            Child edges looked at while expanding nodes
+        filtered : int
+            Child nodes passed to the enqueue function after filtering out explored states
+        pushes : int
+            Nodes added to the frontier, including the start
+        duplicate_pushes : int
+            Nodes added to the frontier for a (station, line) state which had already been added
+        peak_frontier : int
+            Largest number of nodes on the frontier at once
+        explored_nodes : int
+            Number of stations explored, as the search reports
+        expand_time, filter_time, enqueue_time, total_time : float
+            Seconds spent fetching child edges, filtering them, adding them to the frontier and in the
+            whole search
+
+    Methods:
+        begin(state_count):
+            Reset the collector for a search over a number of states
+        push(state):
+            Record a node added to the frontier
+        to_dict():
+            Counts and timings as a dict, e.g. for JSON output
+        format():
+            Counts and timings as lines of text
+    """
+
+    __slots__ = (
+        'expansions', 'reexpansions', 'generated', 'filtered', 'pushes', 'duplicate_pushes', 'peak_frontier',
+        'explored_nodes', 'expand_time', 'filter_time', 'enqueue_time', 'total_time', 'pushed_states'
+    )
+
+    def __init__(self):
+        self.begin(0)
+
+    def begin(self, state_count: int):
+        """
+        Reset the collector for a search over a number of (station, line) states.
+        """
+        self.expansions = 0
+        self.reexpansions = 0
+        self.generated = 0
+        self.filtered = 0
+        self.pushes = 0
+        self.duplicate_pushes = 0
+        self.peak_frontier = 0
+        self.explored_nodes = 0
+        self.expand_time = 0.0
+        self.filter_time = 0.0
+        self.enqueue_time = 0.0
+        self.total_time = 0.0
+        self.pushed_states = bytearray(state_count)
+
+    def push(self, state: int):
+        """
+        Record a node added to the frontier for a (station, line) state.
+        """
+        self.pushes += 1
+        if self.pushed_states[state]:
+            self.duplicate_pushes += 1
+        else:
+            self.pushed_states[state] = 1
+
+    def to_dict(self) -> dict:
+        """
+        Counts and timings as a dict, with times in milliseconds.
+        """
+        return {
+            'expansions': self.expansions,
+            'reexpansions': self.reexpansions,
+            'generated': self.generated,
+            'filtered': self.filtered,
+            'pushes': self.pushes,
+            'duplicate_pushes': self.duplicate_pushes,
+            'peak_frontier': self.peak_frontier,
+            'explored_nodes': self.explored_nodes,
+            'expand_ms': self.expand_time * 1000,
+            'filter_ms': self.filter_time * 1000,
+            'enqueue_ms': self.enqueue_time * 1000,
+            'total_ms': self.total_time * 1000
+        }
+
+    def format(self) -> list:
+        """
+        Counts and timings as lines of text, aligned like the search output.
+        """
+        return [
+            f'Nodes expanded:            {self.expansions} ({self.reexpansions} already expanded)',
+            f'Child edges generated:     {self.generated} ({self.filtered} after filtering)',
+            f'Nodes pushed:              {self.pushes} ({self.duplicate_pushes} duplicates)',
+            f'Peak frontier size:        {self.peak_frontier}',
+            f'Stations explored:         {self.explored_nodes}',
+            f'Time expanding (ms):       {self.expand_time * 1000:.3f}',
+            f'Time filtering (ms):       {self.filter_time * 1000:.3f}',
+            f'Time enqueueing (ms):      {self.enqueue_time * 1000:.3f}',
+            f'Total time (ms):           {self.total_time * 1000:.3f}'
+        ]
@@ -0,0 +1,122 @@
+import math
+import random
+from .graph import Graph
+
+# size of the London Underground data in tubedata.csv, which a scale of one roughly matches: stations,
+# and stops per line, which grows with the square root of the scale as networks grow in area
+BASE_STATION_COUNT = 271
+BASE_STOPS_PER_LINE = 32
+
+# radius, in units of the distance between neighbouring stops, of the area a scale of one covers
+BASE_RADIUS = 9.3
+
+# zones from the centre outwards, as rings of equal width
+ZONE_LABELS = ('1', '2', '3', '4', '5', '6', 'a', 'b', 'c', 'd')
+
+# minutes per unit of distance travelled between stops
+MINUTES_PER_UNIT = 2.3
+
+# a stop within this distance of an existing station on another line becomes an interchange with this
+# probability, otherwise it is a new station
+INTERCHANGE_RADIUS = 0.6
+INTERCHANGE_PROBABILITY = 0.5
+
+
+def generate_rows(scale: float, seed: int = 0):
+    """
+    Generate rows of station data for a synthetic network of lines, in the format of tubedata.csv.  Lines
+    wander across a disc whose area grows with the scale, stopping about once per unit of distance; a
+    stop close to a station on another line may become an interchange.  Every line after the first starts
+    at an existing station, so the network is connected.  Zones are rings around the centre of the disc.
+        Parameters:
+            scale (float): size relative to the London Underground data, e.g. 10, 100 or 1000
+            seed  (int):   seed for the random network, which is the same for the same scale and seed
+
+        Returns:
+            (Iterator[tuple[str, str, str, int, str, str]]): start station, end station, line, cost in
+                minutes, main zone and secondary zone ("0" if there is no secondary zone) for each row
+    """
+    random_source = random.Random(seed)
+    station_target = max(2, round(BASE_STATION_COUNT * scale))
+    stops_per_line = max(2, round(BASE_STOPS_PER_LINE * math.sqrt(scale)))
+    radius = BASE_RADIUS * math.sqrt(scale)
+
+    positions = []
+    zones = []
+    grid = dict()
+
+    def add_station(x: float, y: float) -> int:
+        station = len(positions)
+        positions.append((x, y))
+        ring = int(len(ZONE_LABELS) * math.hypot(x, y) / radius)
+        zones.append(ZONE_LABELS[min(ring, len(ZONE_LABELS) - 1)])
+        grid.setdefault((math.floor(x), math.floor(y)), []).append(station)
+        return station
+
+    def nearest_station(x: float, y: float, excluded: set):
+        cell_x, cell_y = math.floor(x), math.floor(y)
+        best, best_distance = None, INTERCHANGE_RADIUS
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for station in grid.get((cell_x + dx, cell_y + dy), ()):
+                    distance = math.dist(positions[station], (x, y))
+                    if distance < best_distance and station not in excluded:
+                        best, best_distance = station, distance
+        return best
+
+    line = 0
+    while len(positions) < station_target:
+        line += 1
+        line_name = f'Line {line}'
+        if positions:
+            station = random_source.randrange(len(positions))
+        else:
+            angle = random_source.uniform(0, 2 * math.pi)
+            distance = radius * math.sqrt(random_source.random())
+            station = add_station(distance * math.cos(angle), distance * math.sin(angle))
+        (x, y) = positions[station]
+        heading = random_source.uniform(0, 2 * math.pi)
+        stops = {station}
+
+        for _ in range(stops_per_line - 1):
+            heading += random_source.gauss(0, 0.3)
+            if math.hypot(x + math.cos(heading), y + math.sin(heading)) > radius:
+                # turn back towards the centre at the edge of the network
+                heading = math.atan2(-y, -x) + random_source.gauss(0, 0.5)
+            step = random_source.uniform(0.7, 1.3)
+            x += step * math.cos(heading)
+            y += step * math.sin(heading)
+
+            next_station = nearest_station(x, y, stops)
+            if next_station is None or random_source.random() >= INTERCHANGE_PROBABILITY:
+                next_station = add_station(x, y)
+            else:
+                (x, y) = positions[next_station]
+
+            cost = max(1, round(math.dist(positions[station], positions[next_station]) * MINUTES_PER_UNIT))
+            zone1, zone2 = zones[station], zones[next_station]
+            yield (
+                f'Station {station}',
+                f'Station {next_station}',
+                line_name,
+                cost,
+                zone1,
+                '0' if zone2 == zone1 else zone2
+            )
+            stops.add(next_station)
+            station = next_station
+            if len(positions) >= station_target:
+                break
+
+
+def generate_network(scale: float, seed: int = 0) -> Graph:
+    """
+    Generate and compile a synthetic network, see generate_rows.
+        Parameters:
+            scale (float): size relative to the London Underground data, e.g. 10, 100 or 1000
+            seed  (int):   seed for the random network
+
+        Returns:
+            (Graph): compiled graph
+    """
+    return Graph.from_rows(generate_rows(scale, seed))
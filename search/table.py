@@ -0,0 +1,347 @@
+import os
+from weakref import WeakKeyDictionary
+import numpy as np
+from .graph import Graph, add_update_listener, change_cost
+from .loader import DEFAULT_DATA_PATH, get_graph
+from .state_graph import get_state_graph
+from .tree import ShortestPathTree, repair_labels, shortest_path_tree
+from .variants import Algorithm, variant_search
+
+# tables are stored in a directory next to the data file, in a subdirectory per graph fingerprint
+# so that tables built from older data are never used
+DEFAULT_TABLE_DIRECTORY = os.path.splitext(DEFAULT_DATA_PATH)[0] + '.tables'
+
+# arrays making up a table, each stored in its own .npy file so it can be memory-mapped
+TABLE_ARRAYS = ('costs', 'final_states', 'parents', 'state_costs', 'state_stations', 'state_lines')
+
+# cost of routes between stations which are not connected, and parent of a start state
+UNREACHABLE = -1
+
+# number of rows whose trees are walked at once when repairing a table, bounding the memory used
+REPAIR_BLOCK_ROWS = 256
+
+# algorithms which always return a cheapest route, and so can be answered from a table
+OPTIMAL_ALGORITHMS = (Algorithm.UniformCost, Algorithm.AStar, Algorithm.ContractionHierarchy)
+
+# tables already loaded or built, per graph and line change cost
+_tables = WeakKeyDictionary()
+
+
+class DistanceTable:
+    """
+    A class used to represent the cheapest routes between every pair of stations for one line change
+    cost, as NumPy arrays.
+
+    With a line change cost, the cheapest way on from a station depends on the line it was reached on,
+    so routes are stored over the (station, line) states of the StateGraph: for each start station, the
+    parent of every state on its shortest path tree, and the final state of the cheapest route to each goal.
+
+    The cost of every state from every start is kept too, so that when connections change only the rows
+    whose tree uses a connection which got dearer, or could be improved by one which got cheaper, are
+    repaired, and only for the states whose routes change.
+
+    Attributes:
+        line_change_cost : int
+            Cost of changing from one line to another used to build the table
+        costs : ndarray[int32]
+            Cost of the cheapest route from each start station (rows) to each goal station (columns)
+        final_states : ndarray[int32]
+            State id in which the cheapest route from each start station to each goal station ends
+        parents : ndarray[int32]
+            Parent state id of each state on the shortest path tree from each start station
+        state_costs : ndarray[int32]
+            Cost of the cheapest route from each start station to each state
+        state_stations : ndarray[int32]
+            Station id of each state
+        state_lines : ndarray[int32]
+            Line id of each state, NO_LINE for the start of a route
+
+    Methods:
+        route(start, goal):
+            Look up the cost and walk the path from a start station to a goal station
+        set_row(start, tree):
+            Store the shortest path tree from a start station
+        repair(graph, changes):
+            Repair the routes from the start stations which changes to connections can affect
+    """
+
+    def __init__(self, line_change_cost: int, costs, final_states, parents, state_costs, state_stations, state_lines):
+        self.line_change_cost = line_change_cost
+        self.costs = costs
+        self.final_states = final_states
+        self.parents = parents
+        self.state_costs = state_costs
+        self.state_stations = state_stations
+        self.state_lines = state_lines
+
+    def route(self, start: int, goal: int) -> tuple:
+        """
+        Look up the cost and walk the path from a start station to a goal station.
+            Parameters:
+                start (int): start station id
+                goal  (int): goal station id
+
+            Returns:
+                (tuple[list[tuple[int, int]], int] | None): Path of station and line ids from the start to the goal
+                    and the cost, in minutes, of the path, or None if the goal cannot be reached
+        """
+        if start == goal:
+            return [], 0
+
+        cost = int(self.costs[start, goal])
+        if cost == UNREACHABLE:
+            return None
+
+        parents = self.parents[start]
+        path = []
+        state = int(self.final_states[start, goal])
+        while state != UNREACHABLE:
+            path.append((int(self.state_stations[state]), int(self.state_lines[state])))
+            state = int(parents[state])
+        path.reverse()
+
+        return path, cost
+
+    def set_row(self, start: int, tree: ShortestPathTree):
+        """
+        Store the shortest path tree from a start station.  States not on the tree, and the start state,
+        have no parent.
+        """
+        self.costs[start] = UNREACHABLE
+        self.final_states[start] = UNREACHABLE
+        for (station, cost) in tree.station_costs.items():
+            self.costs[start, station] = cost
+            self.final_states[start, station] = tree.station_states[station]
+        self.parents[start] = tree.parents
+        self.state_costs[start] = tree.labels
+
+    def repair(self, graph: Graph, changes: list) -> int:
+        """
+        Repair the routes from the start stations which changes to connections can affect.  A connection
+        which got dearer or closed changes the routes from a start only if its tree arrives over it, and one
+        which got cheaper or opened only if it leads to some state for less than the state's current cost.
+            Parameters:
+                graph   (Graph):            compiled station graph the table was built from
+                changes (list[EdgeChange]): connections which changed
+
+            Returns:
+                (int): number of start stations repaired
+        """
+        state_graph = get_state_graph(graph, self.line_change_cost)
+        affected = np.zeros(graph.station_count, dtype=bool)
+        for change in changes:
+            target = state_graph.state_ids[(change.neighbour, change.line)]
+            sources = np.array([change.station, *state_graph.line_states(change.station)], dtype=np.int32)
+            if change.worsened:
+                affected |= np.isin(self.parents[:, target], sources)
+            elif change.improved:
+                source_costs = self.state_costs[:, sources]
+                step_costs = np.array(
+                    [
+                        change.cost + change_cost(state_graph.state_lines[source], change.line, self.line_change_cost)
+                        for source in sources
+                    ],
+                    dtype=np.int32
+                )
+                target_costs = self.state_costs[:, target, np.newaxis]
+                improves = (source_costs != UNREACHABLE) & (
+                    (target_costs == UNREACHABLE) | (source_costs + step_costs < target_costs)
+                )
+                affected |= improves.any(axis=1)
+
+        starts = np.flatnonzero(affected)
+        cleared = dict()
+        if all(change.worsened for change in changes):
+            for block in range(0, len(starts), REPAIR_BLOCK_ROWS):
+                cleared.update(self.states_below(state_graph, starts[block:block + REPAIR_BLOCK_ROWS], changes))
+
+        for start in starts.tolist():
+            labels = self.state_costs[start].tolist()
+            parents = self.parents[start].tolist()
+            repaired = repair_labels(state_graph, labels, parents, changes, cleared.get(start))
+            if repaired is None:
+                self.set_row(start, shortest_path_tree(graph, start, self.line_change_cost))
+                continue
+
+            self.state_costs[start, repaired] = [labels[state] for state in repaired]
+            self.parents[start, repaired] = [parents[state] for state in repaired]
+
+            # the cheapest state of each station whose states changed gives its cost and final state
+            for station in {state_graph.state_stations[state] for state in repaired} - {start}:
+                cost = UNREACHABLE
+                final_state = UNREACHABLE
+                for state in state_graph.line_states(station):
+                    if labels[state] != UNREACHABLE and (cost == UNREACHABLE or labels[state] < cost):
+                        cost = labels[state]
+                        final_state = state
+                self.costs[start, station] = cost
+                self.final_states[start, station] = final_state
+
+        return len(starts)
+
+    def states_below(self, state_graph, starts, changes: list) -> dict:
+        """
+        Find the states on the trees from some start stations which lie below connections which got dearer
+        or closed, for all the trees at once.  Each state is marked if it is the end of such a connection on
+        its tree or its parent is marked, and doubling the step to each state's ancestor marks every state
+        below in as many rounds as the logarithm of the tree's depth.
+            Parameters:
+                state_graph (StateGraph):       line-expanded graph the table was built on
+                starts      (ndarray[int]):     start stations of the trees
+                changes     (list[EdgeChange]): connections which changed
+
+            Returns:
+                (dict[int, list[int]]): states below the changed connections on the tree from each start
+        """
+        state_count = state_graph.state_count
+        rows = np.arange(len(starts))[:, np.newaxis]
+
+        # parents of each state, with an extra state standing in for no parent, which is its own parent
+        ancestors = np.full((len(starts), state_count + 1), state_count, dtype=np.int32)
+        ancestors[:, :state_count] = self.parents[starts]
+        ancestors[ancestors == UNREACHABLE] = state_count
+
+        below = np.zeros((len(starts), state_count + 1), dtype=bool)
+        graph_offsets = state_graph.graph.offsets
+        for change in changes:
+            for state in (change.station, *state_graph.line_states(change.station)):
+                target = state_graph.targets[state_graph.offsets[state] + change.edge - graph_offsets[change.station]]
+                below[:, target] |= ancestors[:, target] == state
+
+        while (ancestors != state_count).any():
+            below |= below[rows, ancestors]
+            ancestors = ancestors[rows, ancestors]
+
+        return {int(start): np.flatnonzero(row[:state_count]).tolist() for (start, row) in zip(starts, below)}
+
+
+def build_table(graph: Graph, line_change_cost: int = 0) -> DistanceTable:
+    """
+    Build the table of cheapest routes between every pair of stations, with one uniform cost search from
+    each station.
+        Parameters:
+            graph            (Graph): compiled station graph
+            line_change_cost (int):   cost of changing from one line to another
+
+        Returns:
+            (DistanceTable): cheapest routes between all pairs of stations
+    """
+    state_graph = get_state_graph(graph, line_change_cost)
+    station_count = graph.station_count
+
+    table = DistanceTable(
+        line_change_cost,
+        np.full((station_count, station_count), UNREACHABLE, dtype=np.int32),
+        np.full((station_count, station_count), UNREACHABLE, dtype=np.int32),
+        np.full((station_count, state_graph.state_count), UNREACHABLE, dtype=np.int32),
+        np.full((station_count, state_graph.state_count), UNREACHABLE, dtype=np.int32),
+        np.array(state_graph.state_stations, dtype=np.int32),
+        np.array(state_graph.state_lines, dtype=np.int32)
+    )
+    for start in range(station_count):
+        table.set_row(start, shortest_path_tree(graph, start, line_change_cost))
+    _tables.setdefault(graph, dict())[line_change_cost] = table
+
+    return table
+
+
+def get_table_path(graph: Graph, line_change_cost: int, directory: str = DEFAULT_TABLE_DIRECTORY) -> str:
+    """
+    Directory holding the table for a graph and line change cost.
+    """
+    return os.path.join(directory, graph.fingerprint()[:16], f'line-change-{line_change_cost}')
+
+
+def save_table(graph: Graph, table: DistanceTable, directory: str = DEFAULT_TABLE_DIRECTORY):
+    """
+    Save a table to disk, one .npy file per array.
+        Parameters:
+            graph     (Graph):         graph the table was built from
+            table     (DistanceTable): table to save
+            directory (str):           directory holding all tables
+    """
+    table_path = get_table_path(graph, table.line_change_cost, directory)
+    os.makedirs(table_path, exist_ok=True)
+    for name in TABLE_ARRAYS:
+        np.save(os.path.join(table_path, f'{name}.npy'), getattr(table, name))
+
+
+def load_table(graph: Graph, line_change_cost: int, directory: str = DEFAULT_TABLE_DIRECTORY):
+    """
+    Load a table from disk.  The arrays are memory-mapped copy-on-write, so loading is fast, the pages of
+    the table are shared between processes and repairs after updates to the graph stay in memory.
+        Parameters:
+            graph            (Graph): graph the table was built from
+            line_change_cost (int):   cost of changing from one line to another
+            directory        (str):   directory holding all tables
+
+        Returns:
+            (DistanceTable | None): the table, or None if no table has been saved for the graph and line change cost
+    """
+    table_path = get_table_path(graph, line_change_cost, directory)
+    paths = [os.path.join(table_path, f'{name}.npy') for name in TABLE_ARRAYS]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+
+    return DistanceTable(line_change_cost, *(np.load(path, mmap_mode='c') for path in paths))
+
+
+def repair_tables(graph: Graph, changes: list):
+    """
+    Repair the tables of a graph already loaded or built after its connections change.  Tables saved for
+    the graph as it was stay on disk under its old fingerprint.
+    """
+    for table in _tables.get(graph, dict()).values():
+        table.repair(graph, changes)
+
+
+add_update_listener(repair_tables)
+
+
+def get_table(graph: Graph, line_change_cost: int):
+    """
+    Fetch the table for a graph and line change cost, loading it from disk on first use.
+    """
+    graph_tables = _tables.setdefault(graph, dict())
+    table = graph_tables.get(line_change_cost)
+    if table is None:
+        table = load_table(graph, line_change_cost)
+        if table is not None:
+            graph_tables[line_change_cost] = table
+
+    return table
+
+
+def table_search(
+    start: str,
+    goal: str,
+    algorithm: Algorithm,
+    reverse: bool = False,
+    line_change_cost: int = 0
+) -> tuple:
+    """
+    Search for a route as variant_search does, answered from the table of cheapest routes if one has
+    been built for the line change cost and the algorithm always finds cheapest routes.  Otherwise this
+    falls back to variant_search.
+        Parameters:
+            start            (str):       start station for search
+            goal             (str):       goal station for search
+            algorithm        (Algorithm): enum selection of the algorithm
+            reverse          (bool):      reverse order of nodes before adding to the queue
+            line_change_cost (int):       line change cost in minutes
+
+        Returns:
+            (tuple[list[str], int, int]): Path of station names from the start to the goal, the cost, in minutes,
+                of the path and the total number of nodes explored (zero when answered from the table)
+    """
+    graph = get_graph()
+    table = get_table(graph, line_change_cost) if algorithm in OPTIMAL_ALGORITHMS else None
+    if table is None:
+        return variant_search(start, goal, algorithm, reverse, line_change_cost)
+
+    route = table.route(graph.station_id(start), graph.station_id(goal))
+    if route is None:
+        raise ValueError(f'Unable to find path from start [{start}] to goal [{goal}]')
+
+    path, cost = route
+    return graph.path_names(path), cost, 0
@@ -0,0 +1,291 @@
+from heapq import heappush, heappop
+from .graph import Graph
+from .state_graph import StateGraph, get_state_graph
+
+# parent of a start state, and label of a state not yet reached
+NO_STATE = -1
+
+
+class ShortestPathTree:
+    """
+    A class used to represent the cheapest routes from one station to every other station, as found
+    by a single uniform cost search which runs until the frontier is empty.
+
+    Attributes:
+        state_graph : StateGraph
+            Line-expanded graph the tree was built on
+        start : int
+            Id of the start station
+        line_change_cost : int
+            Cost of changing from one line to another used to build the tree
+        labels : list[int]
+            Cost of the cheapest route found to each state, NO_STATE for states not reached
+        parents : list[int]
+            Parent state id of each state reached, NO_STATE for the start and for states not reached
+        station_costs : dict[int, int]
+            Cost of the cheapest route to each station reached
+        station_states : dict[int, int]
+            Final state id of the cheapest route to each station reached
+        explored_counts : dict[int, int]
+            Number of stations explored up to and including each station reached, as a search for that
+            station alone would report
+        explored_nodes : int
+            Number of stations explored to build the tree
+
+    Methods:
+        path_to(goal):
+            Walk the tree from a goal station back to the start
+    """
+
+    def __init__(
+        self,
+        state_graph: StateGraph,
+        start: int,
+        labels: list,
+        parents: list,
+        station_costs: dict,
+        station_states: dict,
+        explored_counts: dict
+    ):
+        self.state_graph = state_graph
+        self.graph = state_graph.graph
+        self.start = start
+        self.line_change_cost = state_graph.line_change_cost
+        self.labels = labels
+        self.parents = parents
+        self.station_costs = station_costs
+        self.station_states = station_states
+        self.explored_counts = explored_counts
+        self.explored_nodes = len(station_costs)
+
+    def path_to(self, goal: int) -> tuple:
+        """
+        Walk the tree from a goal station back to the start.
+            Parameters:
+                goal (int): goal station id
+
+            Returns:
+                (tuple[list[tuple[int, int]], int]): Path of station and line ids from the start to the goal and
+                    the cost, in minutes, of the path
+        """
+        if goal == self.start:
+            return [], 0
+
+        if goal not in self.station_states:
+            raise ValueError(
+                f'Unable to find path from start [{self.graph.station_names[self.start]}] '
+                f'to goal [{self.graph.station_names[goal]}]'
+            )
+
+        states = []
+        state = self.station_states[goal]
+        while state != NO_STATE:
+            states.append(state)
+            state = self.parents[state]
+        states.reverse()
+
+        return self.state_graph.path(states), self.station_costs[goal]
+
+
+def shortest_path_tree(
+    graph: Graph,
+    start: int,
+    line_change_cost: int = 0,
+    goals: set = None
+) -> ShortestPathTree:
+    """
+    Run a uniform cost search from a station over (station, line) states until every reachable state
+    has been explored, or until every station in 'goals' has been explored.
+        Parameters:
+            graph            (Graph):    compiled station graph
+            start            (int):      start station id
+            line_change_cost (int):      cost of changing from one line to another
+            goals            (set[int]): stations to stop the search after, or None to explore every station
+
+        Returns:
+            (ShortestPathTree): cheapest routes from the start to every station explored
+    """
+    state_graph = get_state_graph(graph, line_change_cost)
+    offsets = state_graph.offsets
+    targets = state_graph.targets
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+    state_stations = state_graph.state_stations
+
+    # the start state of each station has the same id as the station
+    labels = [NO_STATE] * state_graph.state_count
+    parents = [NO_STATE] * state_graph.state_count
+    labels[start] = 0
+    station_costs = dict()
+    station_states = dict()
+    explored_counts = dict()
+    remaining_goals = set(goals) if goals is not None else None
+    heap = [(0, start)]
+    while heap:
+        cost, state = heappop(heap)
+        if labels[state] < cost:
+            # already explored at a lower cost
+            continue
+
+        # states are explored in order of cost, so the first state explored for a station is the cheapest
+        station = state_stations[state]
+        if station not in station_costs:
+            station_costs[station] = cost
+            station_states[station] = state
+            explored_counts[station] = len(station_costs)
+
+            if remaining_goals is not None:
+                remaining_goals.discard(station)
+                if not remaining_goals:
+                    break
+
+        for edge in range(offsets[state], offsets[state + 1]):
+            if not open_edges[edge]:
+                continue
+
+            target = targets[edge]
+            target_cost = cost + costs[edge]
+
+            label = labels[target]
+            if label != NO_STATE and label <= target_cost:
+                continue
+
+            labels[target] = target_cost
+            parents[target] = state
+            heappush(heap, (target_cost, target))
+
+    return ShortestPathTree(state_graph, start, labels, parents, station_costs, station_states, explored_counts)
+
+
+def states_below(labels: list, parents: list, roots: list) -> list:
+    """
+    States of a shortest path tree at or below any of a list of root states, following parents up.
+    """
+    below = bytearray(len(labels))
+    for root in roots:
+        below[root] = 1
+
+    checked = bytearray(len(labels))
+    for state in range(len(labels)):
+        if labels[state] == NO_STATE or checked[state]:
+            continue
+
+        chain = []
+        while state != NO_STATE and not checked[state] and not below[state]:
+            chain.append(state)
+            state = parents[state]
+        is_below = state != NO_STATE and below[state]
+        for chain_state in chain:
+            checked[chain_state] = 1
+            below[chain_state] = is_below
+
+    return [state for state in range(len(labels)) if below[state]]
+
+
+def repair_labels(state_graph: StateGraph, labels: list, parents: list, changes: list, cleared: list = None):
+    """
+    Repair the labels and parents of a shortest path tree in place after connections change, touching only
+    the states whose routes change.  When connections get dearer or close, the states below them on the
+    tree are cleared and settled again from the rest of the tree; when they get cheaper or open, the states
+    they now reach for less are lowered and the improvement is passed on until costs stop falling.
+        Parameters:
+            state_graph (StateGraph):       line-expanded graph the tree was built on, already repaired
+            labels      (list[int]):        cost of each state, NO_STATE for states not reached
+            parents     (list[int]):        parent of each state, NO_STATE for the start and states not reached
+            changes     (list[EdgeChange]): connections which changed
+            cleared     (list[int]):        states below the connections which got dearer, if already known
+
+        Returns:
+            (list[int] | None): states whose label or parent changed, or None if the changes both raised and
+                lowered costs, when the tree must be built again
+    """
+    worsened = [change for change in changes if change.worsened]
+    improved = [change for change in changes if change.improved]
+    if worsened and improved:
+        return None
+
+    offsets = state_graph.offsets
+    targets = state_graph.targets
+    costs = state_graph.costs
+    open_edges = state_graph.open_edges
+    graph_offsets = state_graph.graph.offsets
+
+    # state graph edges of each changed connection, from every state of its station
+    changed_edges = [
+        (state, offsets[state] + change.edge - graph_offsets[change.station])
+        for change in (worsened or improved)
+        for state in (change.station, *state_graph.line_states(change.station))
+    ]
+
+    heap = []
+    if worsened:
+        # states whose route runs through a connection which got dearer, and every state below them
+        if cleared is None:
+            roots = [
+                targets[edge] for (state, edge) in changed_edges
+                if labels[state] != NO_STATE and parents[targets[edge]] == state
+            ]
+            cleared = states_below(labels, parents, roots)
+        if not cleared:
+            return []
+
+        repaired = cleared
+        below = bytearray(state_graph.state_count)
+        for state in repaired:
+            below[state] = 1
+        for state in repaired:
+            labels[state] = NO_STATE
+            parents[state] = NO_STATE
+
+        # settle the cleared states again, starting from their cheapest edges in from the rest of the tree
+        reverse_offsets, sources, forward_edges = state_graph.reverse_edges()
+        for state in repaired:
+            for edge in range(reverse_offsets[state], reverse_offsets[state + 1]):
+                forward_edge = forward_edges[edge]
+                source = sources[edge]
+                if not open_edges[forward_edge] or below[source] or labels[source] == NO_STATE:
+                    continue
+
+                cost = labels[source] + costs[forward_edge]
+                if labels[state] == NO_STATE or cost < labels[state]:
+                    labels[state] = cost
+                    parents[state] = source
+            if labels[state] != NO_STATE:
+                heappush(heap, (labels[state], state))
+    else:
+        repaired = []
+        for (state, edge) in changed_edges:
+            target = targets[edge]
+            if labels[state] == NO_STATE or not open_edges[edge]:
+                continue
+
+            cost = labels[state] + costs[edge]
+            if labels[target] == NO_STATE or cost < labels[target]:
+                labels[target] = cost
+                parents[target] = state
+                repaired.append(target)
+                heappush(heap, (cost, target))
+
+    while heap:
+        cost, state = heappop(heap)
+        if labels[state] < cost:
+            continue
+
+        for edge in range(offsets[state], offsets[state + 1]):
+            target = targets[edge]
+            if not open_edges[edge] or (worsened and not below[target]):
+                # costs only rise when connections get dearer, so states outside the cleared part keep theirs
+                continue
+
+            target_cost = cost + costs[edge]
+            label = labels[target]
+            if label != NO_STATE and label <= target_cost:
+                continue
+
+            labels[target] = target_cost
+            parents[target] = state
+            heappush(heap, (target_cost, target))
+            if not worsened:
+                repaired.append(target)
+
+    return repaired
@@ -0,0 +1,112 @@
+from .graph import Graph
+from .loader import get_graph
+
+
+def line_id(graph: Graph, line: str):
+    """
+    Resolve a line name to its id, passing None (any line) through.
+    """
+    if line is None:
+        return None
+
+    if line not in graph.line_ids:
+        raise ValueError(f'Line not known: [{line}]')
+
+    return graph.line_ids[line]
+
+
+def close_station(station: str) -> int:
+    """
+    Close a station on the loaded graph: no route may pass through, start or end there until it reopens.
+        Parameters:
+            station (str): name of the station
+
+        Returns:
+            (int): number of connections, counting each direction, which closed
+    """
+    graph = get_graph()
+    return len(graph.close_station(graph.station_id(station)))
+
+
+def reopen_station(station: str) -> int:
+    """
+    Reopen a station on the loaded graph.  Connections to it which were closed themselves, or lead to
+    another closed station, stay closed.
+        Parameters:
+            station (str): name of the station
+
+        Returns:
+            (int): number of connections, counting each direction, which opened
+    """
+    graph = get_graph()
+    return len(graph.reopen_station(graph.station_id(station)))
+
+
+def close_connection(start: str, end: str, line: str = None) -> int:
+    """
+    Close the connections, in both directions, between two adjacent stations on the loaded graph.
+        Parameters:
+            start (str): name of the station at one end
+            end   (str): name of the station at the other end
+            line  (str): name of the line to close, or None to close the connections on every line
+
+        Returns:
+            (int): number of connections, counting each direction, which closed
+    """
+    graph = get_graph()
+    edges = graph.connection_edges(graph.station_id(start), graph.station_id(end), line_id(graph, line))
+    return len(graph.close_edges(edges))
+
+
+def reopen_connection(start: str, end: str, line: str = None) -> int:
+    """
+    Reopen the connections, in both directions, between two adjacent stations on the loaded graph.
+        Parameters:
+            start (str): name of the station at one end
+            end   (str): name of the station at the other end
+            line  (str): name of the line to reopen, or None to reopen the connections on every line
+
+        Returns:
+            (int): number of connections, counting each direction, which opened
+    """
+    graph = get_graph()
+    edges = graph.connection_edges(graph.station_id(start), graph.station_id(end), line_id(graph, line))
+    return len(graph.reopen_edges(edges))
+
+
+def set_connection_cost(start: str, end: str, cost: int, line: str = None) -> int:
+    """
+    Set the journey time, in both directions, between two adjacent stations on the loaded graph.
+        Parameters:
+            start (str): name of the station at one end
+            end   (str): name of the station at the other end
+            cost  (int): journey time in minutes
+            line  (str): name of the line to change, or None to change the connections on every line
+
+        Returns:
+            (int): number of connections, counting each direction, whose cost changed
+    """
+    if cost < 0:
+        raise ValueError(f'Journey time must not be negative, not {cost}')
+
+    graph = get_graph()
+    edges = graph.connection_edges(graph.station_id(start), graph.station_id(end), line_id(graph, line))
+    return len(graph.set_edge_costs(edges, [cost] * len(edges)))
+
+
+def delay_connection(start: str, end: str, minutes: int, line: str = None) -> int:
+    """
+    Add a delay, in both directions, to the journey time between two adjacent stations on the loaded
+    graph.  A negative delay shortens the journey, but never below zero minutes.
+        Parameters:
+            start   (str): name of the station at one end
+            end     (str): name of the station at the other end
+            minutes (int): minutes to add to the journey time
+            line    (str): name of the line to delay, or None to delay the connections on every line
+
+        Returns:
+            (int): number of connections, counting each direction, whose cost changed
+    """
+    graph = get_graph()
+    edges = graph.connection_edges(graph.station_id(start), graph.station_id(end), line_id(graph, line))
+    return len(graph.set_edge_costs(edges, [max(graph.costs[edge] + minutes, 0) for edge in edges]))
@@ -1,160 +1,135 @@
 from enum import Enum
-from queue import LifoQueue, PriorityQueue, Queue
+from time import perf_counter
+from .frontier import FifoFrontier, LifoFrontier, PriorityFrontier
+from .graph import Graph
+from .heuristics import get_landmark_heuristic, get_zone_heuristic
 from .state import SearchState
+from .state_graph import StateGraph, get_state_graph
+from .stats import SearchStats
 from .algorithm import generic_search
+from .alternatives import k_shortest_paths
+from .anytime import DEFAULT_WEIGHTS, anytime_routes, create_queue_weighted_a_star, enqueue_node_weighted_a_star
+from .bidirectional import bidirectional_search, landmark_potential
+from .budget import SearchBudget, SearchBudgetExceeded
+from .hierarchy import hierarchy_search
+from .isochrone import isochrone
+from .loader import get_graph
+from .pareto import pareto_routes
 
 
-def create_queue_bfs(initial_entry: tuple, *_) -> Queue:
+def create_queue_bfs(initial_entry: tuple, *_) -> FifoFrontier:
     """
-    Create a Filo queue for BFS.
+    Create a Fifo frontier for BFS.
     """
-    queue = Queue()
+    queue = FifoFrontier()
     enqueue_node_bfs(queue, [initial_entry])
     return queue
 
 
-def enqueue_node_bfs(queue: Queue, child_data: list, reverse=False, *_):
+def enqueue_node_bfs(queue: FifoFrontier, child_data: list, reverse=False, stats: SearchStats = None):
     """
-    Add items to Filo queue for BFS.
+    Add items to Fifo frontier for BFS.  Each (station, line) state is added at most once: a later copy
+    would be dequeued after the first and could only add nodes the first copy had already added.
     """
-    nodes = []
-    for (station, step_cost, parent, line, zones) in child_data:
+    reached = queue.reached
+    for (state, step_cost, parent) in (reversed(child_data) if reverse else child_data):
+        if state in reached:
+            continue
+
         cost = step_cost
         if parent:
             cost = cost + parent.cost
 
-        nodes.append(SearchState(station=station, cost=cost, parent=parent, line=line, zones=zones))
-
-    if reverse:
-        nodes.reverse()
+        reached.add(state)
+        queue.put(SearchState(state=state, cost=cost, parent=parent))
+        if stats is not None:
+            stats.push(state)
 
-    for node in nodes:
-        queue.put((node.cost, node))
 
-
-def create_queue_dfs(initial_entry: tuple, *_) -> Queue:
+def create_queue_dfs(initial_entry: tuple, *_) -> LifoFrontier:
     """
-    Create a Lifo queue for DFS.
+    Create a Lifo frontier for DFS.
     """
-    queue = LifoQueue()
+    queue = LifoFrontier()
     enqueue_node_dfs(queue, [initial_entry])
     return queue
 
 
-def enqueue_node_dfs(queue: LifoQueue, child_data: list, reverse: bool = False, *_):
+def enqueue_node_dfs(queue: LifoFrontier, child_data: list, reverse: bool = False, stats: SearchStats = None):
     """
-    Add items to Lifo queue for DFS.
+    Add items to Lifo frontier for DFS.
     """
     nodes = []
-    for (station, step_cost, parent, line, zones) in child_data:
+    for (state, step_cost, parent) in child_data:
         cost = step_cost
         if parent:
             cost = cost + parent.cost
 
-        nodes.append(SearchState(station=station, cost=cost, parent=parent, line=line, zones=zones))
+        nodes.append(SearchState(state=state, cost=cost, parent=parent))
+        if stats is not None:
+            stats.push(state)
 
     if not reverse:
         nodes.reverse()
 
-    for node in nodes:
-        queue.put((node.cost, node))
+    queue.extend(nodes)
 
 
-def create_queue_ucs(initial_entry: tuple, *_) -> Queue:
+def create_queue_ucs(initial_entry: tuple, *_) -> PriorityFrontier:
     """
-    Create priority queue for UCS.
+    Create priority frontier for UCS.
     """
-    queue = PriorityQueue()
+    queue = PriorityFrontier()
     enqueue_node_ucs(queue, [initial_entry])
     return queue
 
 
-def enqueue_node_ucs(
-    queue: PriorityQueue,
-    child_data: list,
-    reverse: bool = False,
-    line_change_cost: int = 0,
-    *_
-):
+def enqueue_node_ucs(queue: PriorityFrontier, child_data: list, reverse: bool = False, stats: SearchStats = None):
     """
-    Add items to priority queue for UCS.
+    Add items to priority frontier for UCS.  A (station, line) state already added at a lower or
+    equal cost is not added again.
     """
-    nodes = []
-    for (station, step_cost, parent, line, zones) in child_data:
+    for (state, step_cost, parent) in (child_data if reverse else reversed(child_data)):
         cost = step_cost
         if parent:
             cost = cost + parent.cost
 
-        if parent and parent.line and parent.line != line:
-            cost = cost + line_change_cost
+        if queue.reach(state, cost):
+            queue.put(cost, SearchState(state=state, cost=cost, parent=parent))
+            if stats is not None:
+                stats.push(state)
 
-        nodes.append(SearchState(station=station, cost=cost, parent=parent, line=line, zones=zones))
-
-    if not reverse:
-        nodes.reverse()
 
-    for node in nodes:
-        queue.put((node.cost, node))
-
-
-def create_queue_best_first(initial_entry: tuple, goal_zones: set) -> Queue:
+def create_queue_best_first(initial_entry: tuple, state_graph: StateGraph, goal: int, *_) -> FifoFrontier:
     """
-    Create queue for best-first search.
+    Create queue for best-first search.  The heuristic, see ZoneHeuristic in search/heuristics.py, is
+    calculated for every station at once, so estimating a state is a lookup.
     """
-    queue = Queue()
-    enqueue_node_best_first(queue, [initial_entry], goal_zones=goal_zones)
+    station_estimates = get_zone_heuristic(state_graph.graph).station_estimates(goal)
+    state_stations = state_graph.state_stations
+    queue = FifoFrontier(estimate=lambda state: station_estimates[state_stations[state]])
+    enqueue_node_best_first(queue, [initial_entry])
     return queue
 
 
-def best_first_heuristic(current_zones: set, goal_zones: set) -> int:
-    """
-    Heuristic function for best-first search.
-        Parameters:
-            current_zones (set): primary and secondary zones of current station
-            goal_zones (set): primary and secondary zones of goal station
-
-        Returns:
-            (int): Heuristic estimating number of minutes to the goal
-    """
-
-    # map each zone to an integer to calculate the number of zones from
-    # a station to the goal
-    zone_positions = {
-        '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6,
-        'a': 7, 'b': 8, 'c': 9, 'd': 10
-    }
-
-    # calculate the least difference between zones for the two stations
-    current_zone_positions = {zone_positions[current_zone] for current_zone in current_zones}
-    goal_zone_positions = {zone_positions[goal_zone] for goal_zone in goal_zones}
-    min_zone_difference = min(
-        abs(min(goal_zone_positions) - max(current_zone_positions)),
-        abs(min(current_zone_positions) - max(goal_zone_positions))
-    )
-
-    # add a cost of 10 minutes per zone between the two stations
-    return 10 * min_zone_difference
-
-
 def enqueue_node_best_first(
-    queue: Queue,
+    queue: FifoFrontier,
     child_data: list,
     reverse=False,
-    line_change_cost: int = 0,
-    goal_zones: set = None
+    stats: SearchStats = None
 ):
     """
     Function to enqueue items for best-first search.
     """
     nodes_with_heuristic = []
-    for (station, step_cost, parent, line, zones) in child_data:
+    for (state, step_cost, parent) in child_data:
         cost = step_cost
         if parent:
             cost = cost + parent.cost
 
         nodes_with_heuristic.append((
-            SearchState(station=station, cost=cost, parent=parent, line=line, zones=zones),
-            best_first_heuristic(zones, goal_zones)
+            SearchState(state=state, cost=cost, parent=parent),
+            queue.estimate(state)
         ))
 
     if len(nodes_with_heuristic) > 0:
@@ -166,17 +141,55 @@ def enqueue_node_best_first(
     agenda_length = 2
     for i in range(min(agenda_length, len(nodes_with_heuristic))):
         node, _ = sorted_nodes[i]
-        queue.put((node.cost, node))
+        queue.put(node)
+        if stats is not None:
+            stats.push(node.state)
+
+
+def create_queue_a_star(initial_entry: tuple, state_graph: StateGraph, goal: int, *_) -> PriorityFrontier:
+    """
+    Create priority frontier for A* search, with landmark lower bounds to the goal.
+    """
+    station_estimate = get_landmark_heuristic(state_graph.graph).estimate_to(goal, state_graph.line_change_cost)
+    state_stations = state_graph.state_stations
+    state_lines = state_graph.state_lines
+    queue = PriorityFrontier(estimate=lambda state: station_estimate(state_stations[state], state_lines[state]))
+    enqueue_node_a_star(queue, [initial_entry])
+    return queue
+
+
+def enqueue_node_a_star(queue: PriorityFrontier, child_data: list, reverse: bool = False, stats: SearchStats = None):
+    """
+    Add items to priority frontier for A* search, ordered by cost plus the estimated remaining cost.
+    A (station, line) state already added at a lower or equal cost is not added again.
+    """
+    estimate = queue.estimate
+    for (state, step_cost, parent) in (child_data if reverse else reversed(child_data)):
+        cost = step_cost
+        if parent:
+            cost = cost + parent.cost
+
+        if queue.reach(state, cost):
+            node = SearchState(state=state, cost=cost, parent=parent)
+            queue.put(cost + estimate(state), node)
+            if stats is not None:
+                stats.push(state)
 
 
 class Algorithm(Enum):
     """
-    Enum which maps the name of a search algorithm to one of the implementations above.
+    Enum which maps the name of a search algorithm to one of the implementations above.  ContractionHierarchy
+    does not use a queue: it is answered by hierarchy_search over a preprocessed hierarchy.  AnytimeAStar runs
+    weighted A* passes with decreasing weights (see anytime_routes) and returns the best route found before
+    any budget runs out.
     """
     BreadthFirst = create_queue_bfs, enqueue_node_bfs
     DepthFirst = create_queue_dfs, enqueue_node_dfs
     UniformCost = create_queue_ucs, enqueue_node_ucs
     BestFirst = create_queue_best_first, enqueue_node_best_first
+    AStar = create_queue_a_star, enqueue_node_a_star
+    ContractionHierarchy = None, None
+    AnytimeAStar = create_queue_weighted_a_star, enqueue_node_weighted_a_star
 
     def __init__(self, create_queue_fn, enqueue_node_fn):
         self.create_queue_fn = create_queue_fn
@@ -192,6 +205,12 @@ class Algorithm(Enum):
             return Algorithm.UniformCost
         elif label == 'BestFirst':
             return Algorithm.BestFirst
+        elif label == 'AStar':
+            return Algorithm.AStar
+        elif label == 'ContractionHierarchy':
+            return Algorithm.ContractionHierarchy
+        elif label == 'AnytimeAStar':
+            return Algorithm.AnytimeAStar
         else:
             raise NotImplementedError
 
@@ -201,12 +220,21 @@ def variant_search(
     goal: str,
     algorithm: Algorithm,
     reverse: bool = False,
-    line_change_cost: int = 0
+    line_change_cost: int = 0,
+    bidirectional: bool = False,
+    stats: SearchStats = None,
+    budget: SearchBudget = None
 ) -> tuple:
     """
     Search algorithm that allows selection of parameters:
       - the 'algorithm' parameter can be changed to select the search algorithm used
       - the 'line_change_cost' parameter can be changed to set a cost in minutes of changing lines
+      - the 'bidirectional' parameter can be set to search from both ends at once (UniformCost and AStar)
+      - the 'stats' parameter can be given a SearchStats collector, which is filled in by the search
+      - the 'budget' parameter can limit the time and expansions of searches which use a queue: AnytimeAStar
+        then returns the best route found in time, and records in the budget whether it is optimal, while
+        the other algorithms raise SearchBudgetExceeded; bidirectional and ContractionHierarchy searches
+        cannot be limited and raise ValueError if given a budget with a limit
 
         Parameters:
             start            (str):       start station for search
@@ -214,9 +242,232 @@ def variant_search(
             algorithm        (Algorithm): enum selection of the algorithm
             reverse          (bool):      reverse order of nodes before adding to the queue
             line_change_cost (int):       line change cost in minutes
+            bidirectional    (bool):      search forward from the start and backward from the goal
+            stats            (SearchStats): collector for counts and timings, or None
+            budget           (SearchBudget): limit on time and expansions, or None
 
         Returns:
             (tuple[list[str], int, int]): Path of station names from the start to the goal, the cost, in minutes,
                 of the path and the total number of nodes explored before the goal is reached
     """
-    return generic_search(start, goal, algorithm.create_queue_fn, algorithm.enqueue_node_fn, reverse, line_change_cost)
+    # names are resolved to ids here and the search itself runs on the compiled graph,
+    # which is loaded on first use rather than at import
+    graph = get_graph()
+    path, cost, explored_nodes = route_search(
+        graph,
+        graph.station_id(start),
+        graph.station_id(goal),
+        algorithm,
+        reverse,
+        line_change_cost,
+        bidirectional,
+        stats,
+        budget
+    )
+
+    return graph.path_names(path), cost, explored_nodes
+
+
+def route_search(
+    graph: Graph,
+    start: int,
+    goal: int,
+    algorithm: Algorithm,
+    reverse: bool = False,
+    line_change_cost: int = 0,
+    bidirectional: bool = False,
+    stats: SearchStats = None,
+    budget: SearchBudget = None
+) -> tuple:
+    """
+    Search for a route between two station ids as variant_search does, for callers which need the ids of the
+    stations and lines on the route rather than their names.
+
+        Returns:
+            (tuple[list[tuple[int, int]], int, int]): Path of station and line ids from the start to the goal,
+                the cost, in minutes, of the path and the total number of nodes explored before the goal is reached
+    """
+    limited = budget is not None and (budget.time_limit is not None or budget.max_expansions is not None)
+    if limited and (bidirectional or algorithm == Algorithm.ContractionHierarchy):
+        raise ValueError(
+            f'A search budget is not available for {"bidirectional" if bidirectional else algorithm.name} search'
+        )
+
+    if stats is not None:
+        stats.begin(0)
+        search_start = perf_counter()
+
+    if bidirectional:
+        if algorithm not in (Algorithm.UniformCost, Algorithm.AStar):
+            raise ValueError(
+                f'Bidirectional search is only available for UniformCost and AStar, not {algorithm.name}'
+            )
+
+        potential = None
+        if algorithm == Algorithm.AStar:
+            landmarks = get_landmark_heuristic(graph)
+            potential = landmark_potential(landmarks.estimate_to(goal), landmarks.estimate_to(start))
+
+        path, cost, explored_nodes = bidirectional_search(
+            graph,
+            start,
+            goal,
+            line_change_cost,
+            potential
+        )
+    elif algorithm == Algorithm.AnytimeAStar:
+        best = None
+        for best in anytime_routes(
+            get_state_graph(graph, line_change_cost),
+            start,
+            goal,
+            budget
+        ):
+            pass
+        if best is None:
+            raise SearchBudgetExceeded(
+                f'Search budget exhausted before a route from [{graph.station_names[start]}] '
+                f'to [{graph.station_names[goal]}] was found'
+            )
+
+        path, cost, explored_nodes = best.path, best.cost, best.explored_nodes
+        if budget is not None:
+            budget.optimal = best.optimal
+    elif algorithm == Algorithm.ContractionHierarchy:
+        path, cost, explored_nodes = hierarchy_search(
+            graph,
+            start,
+            goal,
+            line_change_cost
+        )
+    else:
+        path, cost, explored_nodes = generic_search(
+            get_state_graph(graph, line_change_cost),
+            start,
+            goal,
+            algorithm.create_queue_fn,
+            algorithm.enqueue_node_fn,
+            reverse,
+            stats,
+            budget
+        )
+
+    if stats is not None and (bidirectional or algorithm in (Algorithm.ContractionHierarchy, Algorithm.AnytimeAStar)):
+        stats.explored_nodes = explored_nodes
+        stats.total_time = perf_counter() - search_start
+
+    return path, cost, explored_nodes
+
+
+def alternative_search(start: str, goal: str, route_count: int, line_change_cost: int = 0) -> list:
+    """
+    Search for the cheapest routes between two stations which do not visit any station twice, ranked by
+    cost as UniformCost would rank them.  The first route is the one UniformCost finds.
+
+        Parameters:
+            start            (str): start station for search
+            goal             (str): goal station for search
+            route_count      (int): number of routes to find
+            line_change_cost (int): line change cost in minutes
+
+        Returns:
+            (list[tuple[list[str], int]]): Path of station names from the start to the goal and the cost, in
+                minutes, of the path for up to 'route_count' routes, cheapest first
+    """
+    if route_count < 1:
+        raise ValueError(f'Number of routes must be at least 1, not {route_count}')
+
+    graph = get_graph()
+    routes = k_shortest_paths(
+        get_state_graph(graph, line_change_cost),
+        graph.station_id(start),
+        graph.station_id(goal),
+        route_count
+    )
+
+    return [(graph.path_names(path), cost) for (path, cost) in routes]
+
+
+def pareto_search(start: str, goal: str, max_changes: int = None) -> list:
+    """
+    Search for every route between two stations which trades journey time against line changes: each route
+    is quicker than those with fewer changes, and no route is both as quick and has as few changes.
+
+        Parameters:
+            start       (str): start station for search
+            goal        (str): goal station for search
+            max_changes (int): greatest number of line changes of a route to include, or None
+
+        Returns:
+            (list[tuple[list[str], int, int]]): Path of station names from the start to the goal, the journey
+                time in minutes and the number of line changes of each route, quickest first
+    """
+    graph = get_graph()
+    routes = pareto_routes(get_state_graph(graph, 0), graph.station_id(start), graph.station_id(goal), max_changes)
+
+    return [(graph.path_names(path), minutes, changes) for (path, minutes, changes) in routes]
+
+
+def isochrone_search(origins: list, max_cost: int, line_change_cost: int = 0) -> dict:
+    """
+    Find every station which can be reached from any of a list of origins for at most 'max_cost', in one
+    uniform cost search which stops at the cutoff.
+
+        Parameters:
+            origins          (list[str]): origin stations
+            max_cost         (int):       greatest cost, in minutes, of a route to include
+            line_change_cost (int):       line change cost in minutes
+
+        Returns:
+            (dict[str, tuple[int, str, str]]): for each station in range, the cost of the cheapest route from
+                the nearest origin, the station before it on the route (None for the origins) and the origin,
+                cheapest first
+    """
+    if max_cost < 0:
+        raise ValueError(f'Cost cutoff must be positive or zero, not {max_cost}')
+
+    graph = get_graph()
+    reached = isochrone(graph, [graph.station_id(origin) for origin in origins], max_cost, line_change_cost)
+    station_names = graph.station_names
+
+    return {
+        station_names[station]: (
+            cost,
+            None if predecessor is None else station_names[predecessor],
+            station_names[origin]
+        )
+        for (station, (cost, predecessor, origin)) in sorted(reached.items(), key=lambda item: item[1][0])
+    }
+
+
+def anytime_search(
+    start: str,
+    goal: str,
+    line_change_cost: int = 0,
+    budget: SearchBudget = None,
+    weights: tuple = DEFAULT_WEIGHTS
+):
+    """
+    Search for routes by weighted A* with decreasing weights, yielding each cheaper route as soon as it is
+    found, until the cheapest route is proven or the budget runs out.
+        Parameters:
+            start            (str):          start station for search
+            goal             (str):          goal station for search
+            line_change_cost (int):          line change cost in minutes
+            budget           (SearchBudget): limit on time and expansions, or None
+            weights          (tuple[float]): weight of each pass, decreasing and ending with 1.0
+
+        Returns:
+            (Iterator[tuple[list[str], int, int, bool]]): Path of station names from the start to the goal, the
+                cost, in minutes, of the path, the total number of nodes explored so far and whether the route
+                is known to be the cheapest
+    """
+    graph = get_graph()
+    for route in anytime_routes(
+        get_state_graph(graph, line_change_cost),
+        graph.station_id(start),
+        graph.station_id(goal),
+        budget,
+        weights
+    ):
+        yield graph.path_names(route.path), route.cost, route.explored_nodes, route.optimal